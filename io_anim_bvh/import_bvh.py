@@ -23,12 +23,70 @@
 from __future__ import division
 from __future__ import absolute_import
 from math import radians
+from itertools import izip, chain
+import array
 
 import bpy
 from mathutils import Vector, Euler, Matrix
 from io import open
 import sys
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# size in bytes of the blocks of motion lines parsed at once
+MOTION_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class BVH_Motion(object):
+    __slots__ = (
+        'values',  # flat array of doubles, one row per frame and one column per channel, frame 0 is the rest pose (all zero)
+        'num_channels',  # number of channels, the length of a row
+        'num_frames',  # number of rows, including the rest pose
+        )
+
+    def __init__(self, num_channels):
+        self.num_channels = num_channels
+        self.num_frames = 1
+        self.values = array.array('d', [0.0]) * num_channels
+
+    def column(self, channel, start=0):
+        """Values of a channel (index in the motion data lines, -1 for zeros) for all frames from start."""
+        if channel == -1:
+            return array.array('d', [0.0]) * max(self.num_frames - start, 0)
+        return self.values[channel + start * self.num_channels::self.num_channels]
+
+    def read(self, file):
+        """Append the motion data lines remaining in file, in blocks of lines."""
+        num_channels = self.num_channels
+        while True:
+            lines = file.readlines(MOTION_BLOCK_SIZE)
+            if not lines:
+                break
+            rows = [row for row in [l.split() for l in lines] if row]
+            if map(len, rows).count(num_channels) != len(rows):
+                # some lines have a different number of values, only the first ones of each line are used
+                for row in rows:
+                    if len(row) < num_channels:
+                        raise Exception("BVH motion data line has %d values, %d expected" % (len(row), num_channels))
+                rows = [row[:num_channels] for row in rows]
+            elif numpy is not None:
+                block = numpy.fromstring("".join(lines).encode("ascii", "replace"), sep=" ")
+                if len(block) == len(rows) * num_channels:
+                    self.values.fromstring(block.tostring())
+                    self.num_frames += len(rows)
+                    continue
+            self.values.extend(array.array('d', map(float, chain.from_iterable(rows))))
+            self.num_frames += len(rows)
+
+    def convert(self, channels, func):
+        """Replace the values of the channels by func(value)."""
+        num_channels = self.num_channels
+        for channel in channels:
+            self.values[channel::num_channels] = array.array('d', map(func, self.values[channel::num_channels]))
+
 
 class BVH_Node(object):
     __slots__ = (
@@ -42,7 +100,7 @@ class BVH_Node(object):
         'channels',  # list of 6 ints, -1 for an unused channel, otherwise an index for the BVH motion data lines, loc triple then rot triple
         'rot_order',  # a triple of indices as to the order rotation is applied. [0,1,2] is x/y/z - [None, None, None] if no rotation.
         'rot_order_str',  # same as above but a string 'XYZ' format.
-        'anim_data',  # a list one tuple's one for each frame. (locx, locy, locz, rotx, roty, rotz), euler rotation ALWAYS stored xyz order, even when native used.
+        'motion',  # BVH_Motion of the file, see anim_channels()
         'has_loc',  # Convenience function, bool, same as (channels[0]!=-1 or channels[1]!=-1 or channels[2]!=-1)
         'has_rot',  # Convenience function, bool, same as (channels[3]!=-1 or channels[4]!=-1 or channels[5]!=-1)
         'index',  # index from the file, not strictly needed but nice to maintain order
@@ -77,10 +135,15 @@ class BVH_Node(object):
 
         self.children = []
 
-        # list of 6 length tuples: (lx,ly,lz, rx,ry,rz)
-        # even if the channels aren't used they will just be zero
-        #
-        self.anim_data = [(0, 0, 0, 0, 0, 0)]
+        self.motion = None
+
+    def anim_channels(self, start=0):
+        """
+        Columns (locx, locy, locz, rotx, roty, rotz) of the motion from frame start (0 is the rest pose),
+        euler rotation ALWAYS stored xyz order, even when native used.
+        Even if the channels aren't used they will just be zero.
+        """
+        return [self.motion.column(channel, start) for channel in self.channels]
 
     def __repr__(self):
         return ('BVH name:"%s", rest_loc:(%.3f,%.3f,%.3f), rest_tail:(%.3f,%.3f,%.3f)' %
@@ -100,14 +163,18 @@ def read_bvh(context, file_path, rotate_mode='XYZ', global_scale=1.0):
     # Open the file for importing
     file = open(file_path, 'rU')
 
-    # Seperate into a list of lists, each line a list of words.
-    file_lines = file.readlines()
-    # Non standard carrage returns?
-    if len(file_lines) == 1:
-        file_lines = file_lines[0].split('\r')
-
-    # Split by whitespace.
-    file_lines = [ll for ll in [l.split() for l in file_lines] if ll]
+    # Seperate the hierarchy into a list of lists, each line a list of words (split by whitespace),
+    # up to the frame time following MOTION. The motion data lines are read after it.
+    file_lines = []
+    header_end = None
+    for line in file:
+        line = line.split()
+        if line:
+            file_lines.append(line)
+            if header_end is None and len(line) == 1 and line[0].lower() == 'motion':
+                header_end = len(file_lines) + 2
+            if len(file_lines) == header_end:
+                break
 
     # Create hierarchy as empties
     if file_lines[0][0].lower() == 'hierarchy':
@@ -232,31 +299,19 @@ def read_bvh(context, file_path, rotate_mode='XYZ', global_scale=1.0):
     # second life expects it, which isn't to spec.
     bvh_nodes_list = sorted_nodes(bvh_nodes)
 
-    while lineIdx < len(file_lines):
-        line = file_lines[lineIdx]
-        for bvh_node in bvh_nodes_list:
-            #for bvh_node in bvh_nodes_serial:
-            lx = ly = lz = rx = ry = rz = 0.0
-            channels = bvh_node.channels
-            anim_data = bvh_node.anim_data
-            if channels[0] != -1:
-                lx = global_scale * float(line[channels[0]])
-
-            if channels[1] != -1:
-                ly = global_scale * float(line[channels[1]])
-
-            if channels[2] != -1:
-                lz = global_scale * float(line[channels[2]])
+    # All the frames of all the channels, in one array.
+    motion = BVH_Motion(channelIndex + 1)
+    motion.read(file)
+    file.close()
 
-            if channels[3] != -1 or channels[4] != -1 or channels[5] != -1:
+    # Convert units a channel at a time, the rest pose being zero stays unchanged.
+    loc_channels = [c for bvh_node in bvh_nodes_list for c in bvh_node.channels[:3] if c != -1]
+    rot_channels = [c for bvh_node in bvh_nodes_list for c in bvh_node.channels[3:] if c != -1]
+    motion.convert(loc_channels, float(global_scale).__mul__)
+    motion.convert(rot_channels, radians)
 
-                rx = radians(float(line[channels[3]]))
-                ry = radians(float(line[channels[4]]))
-                rz = radians(float(line[channels[5]]))
-
-            # Done importing motion data #
-            anim_data.append((lx, ly, lz, rx, ry, rz))
-        lineIdx += 1
+    for bvh_node in bvh_nodes_list:
+        bvh_node.motion = motion
 
     # Assign children
     for bvh_node in bvh_nodes_list:
@@ -299,6 +354,14 @@ def read_bvh(context, file_path, rotate_mode='XYZ', global_scale=1.0):
     return bvh_nodes, bvh_frame_time
 
 
+def keyframe_coords(time, values):
+    """Flat (frame, value) coordinates of keyframes, for foreach_set()."""
+    coords = [0.0] * (len(time) * 2)
+    coords[0::2] = time
+    coords[1::2] = values
+    return coords
+
+
 def bvh_node_dict2objects(context, bvh_name, bvh_nodes, rotate_mode='NATIVE', frame_start=1, IMPORT_LOOP=False):
 
     if frame_start < 1:
@@ -347,9 +410,7 @@ def bvh_node_dict2objects(context, bvh_name, bvh_nodes, rotate_mode='NATIVE', fr
     for name, bvh_node in bvh_nodes.items():
         obj = bvh_node.temp
 
-        for frame_current in xrange(len(bvh_node.anim_data)):
-
-            lx, ly, lz, rx, ry, rz = bvh_node.anim_data[frame_current]
+        for frame_current, (lx, ly, lz, rx, ry, rz) in enumerate(izip(*bvh_node.anim_channels())):
 
             if bvh_node.has_loc:
                 obj.delta_location = Vector((lx, ly, lz)) - bvh_node.rest_head_world
@@ -500,7 +561,7 @@ def bvh_node_dict2armature(context,
         bvh_node.temp = (pose_bone, bone, bone_rest_matrix, bone_rest_matrix_inv)
 
         if 0 == num_frame:
-            num_frame = len(bvh_node.anim_data)
+            num_frame = bvh_node.motion.num_frames
 
     # Choose to skip some frames at the beginning. Frame 0 is the rest pose
     # used internally by this importer. Frame 1, by convention, is also often
@@ -531,9 +592,8 @@ def bvh_node_dict2armature(context,
             data_path = 'pose.bones["%s"].location' % pose_bone.name
 
             location = [(0.0, 0.0, 0.0)] * num_frame
-            for frame_i in xrange(num_frame):
-                bvh_loc = bvh_node.anim_data[frame_i + skip_frame][:3]
-
+            bvh_locs = izip(*bvh_node.anim_channels(skip_frame)[:3])
+            for frame_i, bvh_loc in enumerate(bvh_locs):
                 bone_translate_matrix = Matrix.Translation(
                         Vector(bvh_loc) - bvh_node.rest_head_local)
                 location[frame_i] = (bone_rest_matrix_inv *
@@ -544,10 +604,7 @@ def bvh_node_dict2armature(context,
                 curve = action.fcurves.new(data_path=data_path, index=axis_i)
                 keyframe_points = curve.keyframe_points
                 keyframe_points.add(num_frame)
-
-                for frame_i in xrange(num_frame):
-                    keyframe_points[frame_i].co = \
-                            (time[frame_i], location[frame_i][axis_i])
+                keyframe_points.foreach_set("co", keyframe_coords(time, [loc[axis_i] for loc in location]))
 
         if bvh_node.has_rot:
             data_path = None
@@ -563,9 +620,8 @@ def bvh_node_dict2armature(context,
                              pose_bone.name)
 
             prev_euler = Euler((0.0, 0.0, 0.0))
-            for frame_i in xrange(num_frame):
-                bvh_rot = bvh_node.anim_data[frame_i + skip_frame][3:]
-
+            bvh_rots = izip(*bvh_node.anim_channels(skip_frame)[3:])
+            for frame_i, bvh_rot in enumerate(bvh_rots):
                 # apply rotation order and convert to XYZ
                 # note that the rot_order_str is reversed.
                 euler = Euler(bvh_rot, bvh_node.rot_order_str[::-1])
@@ -585,11 +641,8 @@ def bvh_node_dict2armature(context,
             for axis_i in xrange(len(rotate[0])):
                 curve = action.fcurves.new(data_path=data_path, index=axis_i)
                 keyframe_points = curve.keyframe_points
-                curve.keyframe_points.add(num_frame)
-
-                for frame_i in xrange(0, num_frame):
-                    keyframe_points[frame_i].co = \
-                            (time[frame_i], rotate[frame_i][axis_i])
+                keyframe_points.add(num_frame)
+                keyframe_points.foreach_set("co", keyframe_coords(time, [rot[axis_i] for rot in rotate]))
 
     for cu in action.fcurves:
         if IMPORT_LOOP:
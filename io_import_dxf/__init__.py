@@ -91,6 +91,7 @@ T_ImportText = True
 T_ImportLight = True
 T_ExportAcis = False
 T_MergeLines = True
+T_MergeLinesMode = 'ROUNDED'
 T_OutlinerGroups = True
 T_Bbox = True
 T_CreateNewScene = False
@@ -108,12 +109,14 @@ def is_ref_scene(scene):
 
 def read(report, filename, obj_merge=BY_LAYER, import_text=True, import_light=True, export_acis=True, merge_lines=True,
          do_bbox=True, block_rep=LINKED_OBJECTS, new_scene=None, recenter=False, projDXF=None, projSCN=None,
-         thicknessWidth=True, but_group_by_att=True, dxf_unit_scale=1.0):
+         thicknessWidth=True, but_group_by_att=True, dxf_unit_scale=1.0, layers=None, merge_lines_mode='ROUNDED',
+         merge_lines_tolerance=0.0):
     # import dxf and export nurbs types to sat/sab files
     # because that's how autocad stores nurbs types in a dxf...
     try:
         do = Do(filename, obj_merge, import_text, import_light, export_acis, merge_lines, do_bbox, block_rep, recenter,
-                projDXF, projSCN, thicknessWidth, but_group_by_att, dxf_unit_scale)
+                projDXF, projSCN, thicknessWidth, but_group_by_att, dxf_unit_scale, layers, merge_lines_mode,
+                merge_lines_tolerance)
         errors = do.entities(os.path.basename(filename).replace(".dxf", ""), new_scene)
 
         # display errors
@@ -231,6 +234,23 @@ class IMPORT_OT_dxf(bpy.types.Operator):
             default=T_MergeLines
             )
 
+    merge_lines_mode = EnumProperty(
+            name="Line Merging",
+            description="How connected LINE entities are found",
+            items=[('ROUNDED', "Rounded Points", "Lines are connected if their rounded end points are equal"),
+                   ('GRID', "Spatial Grid", "Lines are connected through a grid of their end points, fast for "
+                                            "many small lines, optionally joining end points within a tolerance")],
+            default=T_MergeLinesMode,
+            )
+
+    merge_lines_tolerance = FloatProperty(
+            name="Tolerance",
+            description="End points closer than this are joined (0 joins equal rounded end points only)",
+            default=0.0,
+            min=0.0,
+            precision=6,
+            )
+
     import_text = BoolProperty(
             name="Import Text",
             description="Import DXF Text Entities MTEXT and TEXT",
@@ -249,6 +269,12 @@ class IMPORT_OT_dxf(bpy.types.Operator):
             default=T_ExportAcis
             )
 
+    layers = StringProperty(
+            name="Layers",
+            description="Import only entities on these layers, separated by commas (all layers if empty)",
+            default="",
+            )
+
     outliner_groups = BoolProperty(
             name="Display Groups in Outliner(s)",
             description="Make all outliners in current screen layout show groups",
@@ -380,6 +406,12 @@ class IMPORT_OT_dxf(bpy.types.Operator):
         sub.enabled = self.merge
         sub.prop(self, "merge_options")
         box.prop(self, "merge_lines")
+        sub = box.row()
+        sub.enabled = self.merge_lines
+        sub.prop(self, "merge_lines_mode", text="")
+        sub = sub.row()
+        sub.enabled = self.merge_lines and self.merge_lines_mode == 'GRID'
+        sub.prop(self, "merge_lines_tolerance")
 
         # general options
         layout.label("Line thickness and width:")
@@ -395,6 +427,7 @@ class IMPORT_OT_dxf(bpy.types.Operator):
         box.prop(self, "import_text")
         box.prop(self, "import_light")
         box.prop(self, "export_acis")
+        box.prop(self, "layers")
 
         # view options
         layout.label("View Options:")
@@ -520,9 +553,11 @@ class IMPORT_OT_dxf(bpy.types.Operator):
             from . import test
             test.test()
         else:
+            layers = [name.strip() for name in self.layers.split(",") if name.strip()] or None
             read(self.report, self.filepath, merge_options, self.import_text, self.import_light, self.export_acis,
                  self.merge_lines, self.do_bbox, block_map[self.block_options], scene, self.recenter,
-                 proj_dxf, proj_scn, self.represent_thickness_and_width, self.import_atts, dxf_unit_scale)
+                 proj_dxf, proj_scn, self.represent_thickness_and_width, self.import_atts, dxf_unit_scale, layers,
+                 self.merge_lines_mode, self.merge_lines_tolerance)
 
         if self.outliner_groups:
             display_groups_in_outliner()
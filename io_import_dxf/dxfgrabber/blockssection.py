@@ -25,13 +25,24 @@ class BlocksSection(object):
             blocks_section._build(tags, drawing.dxfversion)
         return blocks_section
 
+    @staticmethod
+    def from_tag_arrays(section, drawing):
+        """ Section from TagArrays, the tags of each entity are cast when it is built. """
+        blocks_section = BlocksSection()
+        if drawing.grab_blocks and len(section) > 3:
+            blocks_section._build_groups(section.groups(2, len(section)-1), drawing.dxfversion)
+        return blocks_section
+
     def _build(self, tags, dxfversion):
         if len(tags) == 3:  # empty block section
             return
+        self._build_groups(TagGroups(islice(tags, 2, len(tags)-1)), dxfversion)
+
+    def _build_groups(self, tag_groups, dxfversion):
         groups = list()
-        for group in TagGroups(islice(tags, 2, len(tags)-1)):
+        for group in tag_groups:
             groups.append(group)
-            if group[0].value == 'ENDBLK':
+            if group.get_type() == 'ENDBLK':
                 entities = build_entities(groups, dxfversion)
                 block = entities[0]
                 block.set_entities(entities[1:-1])
@@ -8,11 +8,16 @@ __author__ = "mozman <mozman@gmx.at>"
 
 from .tags import TagIterator
 from .sections import Sections
+from .entitysection import entity_filter
 
 DEFAULT_OPTIONS = {
     "grab_blocks": True,  # import block definitions True=yes, False=No
     "assure_3d_coords": False,  # guarantees (x, y, z) tuples for ALL coordinates
     "resolve_text_styles": True,  # Text, Attrib, Attdef and MText attributes will be set by the associated text style if necessary
+    "skip_sections": (),  # names of sections not to load, like 'OBJECTS' or 'ACDSDATA', the HEADER is always loaded
+    "layers": None,  # load only entities on these layers, None=all
+    "dxftypes": None,  # load only entities of these types, None=all
+    "lazy_entities": False,  # build entities when they are used the first time, not while reading the file
 }
 
 
@@ -23,6 +28,9 @@ class Drawing(object):
         self.grab_blocks = options.get('grab_blocks', True)
         self.assure_3d_coords = options.get('assure_3d_coords', False)
         self.resolve_text_styles = options.get('resolve_text_styles', True)
+        self.skip_sections = frozenset(options.get('skip_sections', ()))
+        self.entity_filter = entity_filter(options.get('layers'), options.get('dxftypes'))
+        self.lazy_entities = options.get('lazy_entities', False)
 
         tagreader = TagIterator(stream, self.assure_3d_coords)
         self.dxfversion = 'AC1009'
@@ -38,12 +46,13 @@ class Drawing(object):
         self.objects = sections.objects if ('objects' in sections) else []
         if 'acdsdata' in sections:
             self.acdsdata = sections.acdsdata
-            # sab data introduced with DXF version AC1027 (R2013)
-            if self.dxfversion >= 'AC1027':
-                self.collect_sab_data()
+
+        if self.lazy_entities:
+            self.entities.on_build = self._setup_entities
+        else:
+            self._setup_entities(self.entities)
 
         if self.resolve_text_styles:
-            resolve_text_styles(self.entities, self.styles)
             for block in self.blocks:
                 resolve_text_styles(block, self.styles)
 
@@ -53,8 +62,17 @@ class Drawing(object):
     def paperspace(self):
         return (entity for entity in self.entities if entity.paperspace)
 
-    def collect_sab_data(self):
-        for entity in self.entities:
+    def _setup_entities(self, entities):
+        # sab data introduced with DXF version AC1027 (R2013)
+        if hasattr(self, 'acdsdata') and 'ACDSDATA' not in self.skip_sections and self.dxfversion >= 'AC1027':
+            self.collect_sab_data(entities)
+        if self.resolve_text_styles:
+            resolve_text_styles(entities, self.styles)
+
+    def collect_sab_data(self, entities=None):
+        if entities is None:
+            entities = self.entities
+        for entity in entities:
             if hasattr(entity, 'set_sab_data'):
                 sab_data = self.acdsdata.sab_data[entity.handle]
                 entity.set_sab_data(sab_data)
@@ -10,50 +10,107 @@ from itertools import islice
 
 from .tags import TagGroups, DXFStructureError
 from .tags import ClassifiedTags
-from .entities import entity_factory
+from .entities import entity_factory, EntityTable
 
 
 class EntitySection(object):
     name = 'entities'
+    filtered = True  # only entities accepted by the entity filter of the drawing are built
 
     def __init__(self):
         self._entities = list()
+        self._builder = None  # builds the entities on first use, if loaded lazily
+        self.on_build = None  # called with the entities built on first use
 
     @classmethod
     def from_tags(cls, tags, drawing):
         entity_section = cls()
-        entity_section._build(tags, drawing.dxfversion)
+        entity_section._build(tags, drawing.dxfversion, cls._get_filter(drawing))
         return entity_section
 
+    @classmethod
+    def from_tag_arrays(cls, section, drawing):
+        """ Section from TagArrays, the tags of each entity are cast when it is built. """
+        entity_section = cls()
+        if len(section) > 3:
+            def builder():
+                return build_entities(section.groups(2, len(section)-1), drawing.dxfversion, accept)
+
+            accept = cls._get_filter(drawing)
+            if drawing.lazy_entities:
+                entity_section._builder = builder
+            else:
+                entity_section._entities = builder()
+        return entity_section
+
+    @classmethod
+    def _get_filter(cls, drawing):
+        return drawing.entity_filter if cls.filtered else None
+
     def get_entities(self):
+        if self._builder is not None:
+            builder, self._builder = self._builder, None
+            self._entities = builder()
+            if self.on_build is not None:
+                self.on_build(self._entities)
         return self._entities
 
     # start of public interface
 
     def __len__(self):
-        return len(self._entities)
+        return len(self.get_entities())
 
     def __iter__(self):
-        return iter(self._entities)
+        return iter(self.get_entities())
 
     def __getitem__(self, index):
-        return self._entities[index]
+        return self.get_entities()[index]
 
     # end of public interface
 
-    def _build(self, tags, dxfversion):
+    def _build(self, tags, dxfversion, accept=None):
         if len(tags) == 3:  # empty entities section
             return
         groups = TagGroups(islice(tags, 2, len(tags)-1))
-        self._entities = build_entities(groups, dxfversion)
+        self._entities = build_entities(groups, dxfversion, accept)
 
 
 class ObjectsSection(EntitySection):
     name = 'objects'
+    filtered = False
+
+
+# entities following a POLYLINE or INSERT, they are filtered like it
+SEQUENCE_TYPES = frozenset(['VERTEX', 'ATTRIB', 'SEQEND'])
+
+
+def entity_filter(layers=None, dxftypes=None):
+    """
+    Returns a function accepting the tag groups of entities on one of layers and of one of
+    dxftypes (None accepts all of them), or None if there is nothing to filter.
+    """
+    if layers is None and dxftypes is None:
+        return None
+    layers = None if layers is None else frozenset(layers)
+    dxftypes = None if dxftypes is None else frozenset(dxftypes)
+
+    def accept(group):
+        if dxftypes is not None and group.get_type() not in dxftypes:
+            return False
+        if layers is not None:
+            try:
+                layer = group.get_value(8)
+            except ValueError:
+                layer = '0'  # default layer
+            return layer in layers
+        return True
+    return accept
 
 
-def build_entities(tag_groups, dxfversion):
+def build_entities(tag_groups, dxfversion, accept=None):
     def build_entity(group):
+        if group.get_type() not in EntityTable:
+            return None  # ignore unsupported entities, without casting their tags
         try:
             entity = entity_factory(ClassifiedTags(group), dxfversion)
         except KeyError:
@@ -62,7 +119,13 @@ def build_entities(tag_groups, dxfversion):
 
     entities = list()
     collector = None
+    skip = False
     for group in tag_groups:
+        if accept is not None:
+            if group.get_type() not in SEQUENCE_TYPES:
+                skip = not accept(group)
+            if skip:  # the tags of skipped entities are not even cast
+                continue
         entity = build_entity(group)
         if entity is not None:
             if collector:
@@ -8,7 +8,7 @@ __author__ = "mozman <mozman@gmx.at>"
 
 from io import StringIO
 from collections import namedtuple
-from itertools import chain, islice
+from itertools import chain, islice, compress, repeat, izip
 from . import tostr
 
 
@@ -34,89 +34,237 @@ def is_point_tag(tag):
     return tag[0] in POINT_CODES
 
 
+BLOCK_SIZE = 1 << 20  # characters read at once by TagIterator
+
+
+def read_codes(lines):
+    """
+    Group codes of the code lines, as ints. Stops at the first line which is not a
+    group code, like the end of the file.
+    """
+    try:
+        # only a few different codes, each converted once
+        table = dict((line, int(line)) for line in set(lines))
+        return map(table.__getitem__, lines)
+    except ValueError:
+        codes = []
+        for line in lines:
+            try:
+                codes.append(int(line))
+            except ValueError:
+                break
+        return codes
+
+
+def read_point(codes, values, index, assure_3d_coords=False):
+    """Point starting with the X coordinate at index, returns the point and the index after it."""
+    code_x = codes[index]
+    value_x = float(values[index])
+
+    # 2. coordinate is always necessary
+    if index + 1 >= len(codes) or codes[index + 1] != code_x + 10:
+        raise DXFStructureError("invalid 2D/3D point found")
+    value_y = float(values[index + 1])
+
+    if index + 2 < len(codes) and codes[index + 2] == code_x + 20:  # is a 3D point
+        return (value_x, value_y, float(values[index + 2])), index + 3
+    elif assure_3d_coords:
+        return (value_x, value_y, 0.), index + 2
+    else:
+        return (value_x, value_y), index + 2
+
+
+def _cast_int(value):
+    try:
+        return int(value)
+    except ValueError:  # convert float to int
+        return int(float(value))
+
+
+def cast_tags(codes, values, assure_3d_coords=False):
+    """
+    DXFTags of the raw codes and values, with cast values:
+    coordinates are merged into point tuples and comments are skipped.
+    """
+    count = len(codes)
+    positions = xrange(count)
+
+    # cast the values of each type at once, all others are text already
+    cast = list(values)
+    for caster, type_codes in ((float, FLOAT_CODES), (int, INT_CODES)):
+        indices = list(compress(positions, map(type_codes.__contains__, codes)))
+        if indices:
+            raw = map(values.__getitem__, indices)
+            try:
+                raw = map(caster, raw)
+            except ValueError:
+                if caster is not int:
+                    raise
+                raw = map(_cast_int, raw)
+            map(cast.__setitem__, indices, raw)
+
+    new_tag = tuple.__new__  # DXFTag() without the python level __new__
+    tags = map(new_tag, repeat(DXFTag, count), izip(codes, cast))
+
+    # merge the coordinates of points
+    points = list(compress(positions, map(POINT_CODES.__contains__, codes)))
+    if points:
+        merged = []
+        append = merged.append
+        extend = merged.extend
+        end = 0  # first tag after the last point
+        for index in points:
+            if index < end:
+                continue
+            extend(tags[end:index])
+            code = codes[index]
+            # 2. coordinate is always necessary
+            if index + 1 >= count or codes[index + 1] != code + 10:
+                raise DXFStructureError("invalid 2D/3D point found")
+            if index + 2 < count and codes[index + 2] == code + 20:  # is a 3D point
+                value = (cast[index], cast[index + 1], cast[index + 2])
+                end = index + 3
+            else:
+                value = (cast[index], cast[index + 1], 0.) if assure_3d_coords else (cast[index], cast[index + 1])
+                end = index + 2
+            append(new_tag(DXFTag, (code, value)))
+        extend(tags[end:])
+        tags = merged
+
+    if 999 in codes:  # skip comments
+        tags = [tag for tag in tags if tag[0] != 999]
+    return tags
+
+
+class TagArrays(object):
+    """
+    Tags kept as the arrays of their group codes and raw (not cast) values,
+    the values are only cast when the tags are needed.
+    """
+    __slots__ = ("codes", "values", "assure_3d_coords")
+
+    def __init__(self, codes, values, assure_3d_coords=False):
+        self.codes = codes
+        self.values = values
+        self.assure_3d_coords = assure_3d_coords
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return iter(self.tags())
+
+    def tags(self):
+        return Tags(cast_tags(self.codes, self.values, self.assure_3d_coords))
+
+    def get_type(self):
+        return tostr(self.values[0])
+
+    def get_name(self):
+        """ Name of a section, value of the tag after (0, 'SECTION'). """
+        return tostr(self.values[1])
+
+    def get_value(self, code):
+        """ Raw value of the first tag of code, like Tags.get_value() for text values. """
+        try:
+            return tostr(self.values[self.codes.index(code)])
+        except ValueError:
+            raise ValueError(code)
+
+    def groups(self, start=0, end=None, split_code=0):
+        """
+        Like TagGroups(), tags from start to end as TagArrays starting with a tag of the
+        split_code, tags before the first one are skipped.
+        """
+        if end is None:
+            end = len(self.codes)
+        codes = self.codes
+        values = self.values
+        try:
+            index = codes.index(split_code, start, end)
+        except ValueError:
+            return
+        while index < end:
+            try:
+                next_index = codes.index(split_code, index + 1, end)
+            except ValueError:
+                next_index = end
+            yield TagArrays(codes[index:next_index], values[index:next_index], self.assure_3d_coords)
+            index = next_index
+
+
 class TagIterator(object):
-    def __init__(self, textfile, assure_3d_coords=False):
+    """
+    Reads the tags of the text file in large blocks of lines, which are split once
+    into group codes and raw values. Tags are cast when read one by one with next(),
+    whole sections can also be read without casting their values with read_section().
+    """
+    def __init__(self, textfile, assure_3d_coords=False, block_size=BLOCK_SIZE):
         self.textfile = textfile
-        self.readline = textfile.readline
+        self.block_size = block_size
         self.undo = False
         self.last_tag = NONE_TAG
-        self.undo_coord = None
-        self.eof = False
+        self.eof = False  # end of the file reached, the last tags are buffered
         self.assure_3d_coords = assure_3d_coords
+        self.codes = []
+        self.values = []
+        self.index = 0  # index of the next tag in codes/values
+        self.rest = ''  # start of a line, or lines of an incomplete tag, at the end of the last block
 
     def __iter__(self):
         return self
 
+    def _read_block(self):
+        """ Append the tags of the next block to the buffered ones. """
+        data = self.textfile.read(self.block_size)
+        if not data:
+            lines = self.rest.split('\n') if self.rest else []
+            if len(lines) % 2:  # code without value, or the empty line after the last tag
+                lines.pop()
+            self.rest = ''
+            self.eof = True
+        else:
+            lines = (self.rest + data).split('\n')
+            self.rest = lines.pop()
+            if len(lines) % 2:  # code line without its value yet
+                self.rest = lines.pop() + '\n' + self.rest
+
+        if self.index:  # drop the tags already read
+            del self.codes[:self.index]
+            del self.values[:self.index]
+            self.index = 0
+
+        codes = read_codes(lines[0::2])
+        if len(codes) * 2 < len(lines):  # invalid group code, handled as the end of the file
+            self.rest = ''
+            self.eof = True
+        self.codes.extend(codes)
+        self.values.extend(lines[1:len(codes) * 2:2])
+
     def next(self):
-        def undo_tag():
+        if self.undo:
             self.undo = False
-            tag = self.last_tag
-            return tag
+            return self.last_tag
 
-        def read_next_tag():
-            try:
-                code = int(self.readline())
-                value = self.readline().rstrip('\n')
-            except UnicodeDecodeError:
-                raise  # because UnicodeDecodeError() is a subclass of ValueError()
-            except (EOFError, ValueError):
+        while True:
+            # 3 tags buffered at least, for points
+            while not self.eof and len(self.codes) - self.index < 3:
+                self._read_block()
+            if self.index >= len(self.codes):
                 raise StopIteration()
-            return code, value
-
-        def read_point(code_x, value_x):
-            try:
-                code_y, value_y = read_next_tag()  # 2. coordinate is always necessary
-            except StopIteration:
-                code_y = 0  # -> DXF structure error in following if-statement
 
-            if code_y != code_x + 10:
-                raise DXFStructureError("invalid 2D/3D point found")
-
-            value_y = float(value_y)
-            try:
-                code_z, value_z = read_next_tag()
-            except StopIteration:  # 2D point at end of file
-                self.eof = True  # store reaching end of file
-                if self.assure_3d_coords:
-                    value = (value_x, value_y, 0.)
-                else:
-                    value = (value_x, value_y)
+            index = self.index
+            code = self.codes[index]
+            if code in POINT_CODES:  # 2D or 3D point
+                value, self.index = read_point(self.codes, self.values, index, self.assure_3d_coords)
             else:
-                if code_z != code_x + 20:  # not a Z coordinate -> 2D point
-                    self.undo_coord = (code_z, value_z)
-                    if self.assure_3d_coords:
-                        value = (value_x, value_y, 0.)
-                    else:
-                        value = (value_x, value_y)
-                else:  # is a 3D point
-                    value = (value_x, value_y, float(value_z))
-            return value
-
-        def next_tag():
-            code = 999
-            while code == 999:  # skip comments
-                if self.undo_coord is not None:
-                    code, value = self.undo_coord
-                    self.undo_coord = None
-                else:
-                    code, value = read_next_tag()
-
-                if code in POINT_CODES:  # 2D or 3D point
-                    value = read_point(code, float(value))  # returns a tuple of floats, no casting needed
-                else:
-                    value = cast_tag_value(code, value)
+                self.index = index + 1
+                if code == 999:  # skip comments
+                    continue
+                value = cast_tag_value(code, self.values[index])
             self.last_tag = DXFTag(code, value)
             return self.last_tag
-
-        if self.eof:  # stored end of file
-            raise StopIteration()
-
-        if self.undo:
-            return undo_tag()
-        else:
-            return next_tag()
-    # for Python 2.7
-    next = __next__
+    __next__ = next  # for Python 3
 
     def undo_tag(self):
         if not self.undo:
@@ -124,6 +272,41 @@ class TagIterator(object):
         else:
             raise ValueError('No tag to undo')
 
+    def read_section(self, endofchunk='ENDSEC', stoptag='EOF'):
+        """
+        TagArrays of the next section, from its first tag to DXFTag(0, endofchunk) included,
+        None at DXFTag(0, stoptag) or at the end of the file.
+        """
+        while not self.eof and len(self.codes) - self.index < 3:
+            self._read_block()
+        if self.index >= len(self.codes):
+            return None
+        if self.codes[self.index] == 0 and self.values[self.index] == stoptag:
+            self.index += 1
+            return None
+
+        search = self.index + 1
+        while True:
+            codes = self.codes
+            try:
+                end = codes.index(0, search)
+            except ValueError:
+                if self.eof:  # section not closed, like iterchunks()
+                    self.index = len(codes)
+                    return None
+                search = len(codes) - self.index
+                self._read_block()
+                search += self.index
+                continue
+
+            if self.values[end] == endofchunk:
+                break
+            search = end + 1
+
+        start = self.index
+        self.index = end + 1
+        return TagArrays(codes[start:end + 1], self.values[start:end + 1], self.assure_3d_coords)
+
 
 class StringIterator(TagIterator):
     def __init__(self, dxfcontent):
@@ -197,6 +380,10 @@ _TagCaster = TagCaster()
 cast_tag = _TagCaster.cast
 cast_tag_value = _TagCaster.cast_value
 
+# codes by type for cast_tags(), point coordinates are floats
+FLOAT_CODES = frozenset(code for code, caster in _TagCaster._cast.items() if caster in (float, point_tuple))
+INT_CODES = frozenset(code for code, caster in _TagCaster._cast.items() if caster is int)
+
 
 class Tags(list):
     """ DXFTag() chunk as flat list. """
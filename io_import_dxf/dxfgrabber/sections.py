@@ -7,6 +7,7 @@ from __future__ import unicode_literals
 __author__ = "mozman <mozman@gmx.at>"
 
 from .codepage import toencoding
+from .tags import TagArrays
 from .defaultchunk import DefaultChunk, iterchunks
 from .headersection import HeaderSection
 from .headersection import MinVersionError
@@ -38,12 +39,25 @@ class Sections(object):
 
     def _setup_sections(self, tagreader, drawing):
         def name(section):
+            if isinstance(section, TagArrays):
+                return section.get_name()
             return section[1].value
 
+        def tags(section):
+            if isinstance(section, TagArrays):
+                return section.tags()
+            return section
+
+        if hasattr(tagreader, 'read_section'):
+            # sections as raw tags, only the used ones are cast
+            sections = iter(tagreader.read_section, None)
+        else:
+            sections = iterchunks(tagreader, stoptag='EOF', endofchunk='ENDSEC')
+
         bootstrap = True
-        for section in iterchunks(tagreader, stoptag='EOF', endofchunk='ENDSEC'):
+        for section in sections:
             if bootstrap:
-                new_section = HeaderSection.from_tags(section)
+                new_section = HeaderSection.from_tags(tags(section))
                 drawing.dxfversion = new_section.get('$ACADVER', 'AC1009')
                 self.check_min_version(drawing.dxfversion)
                 codepage = new_section.get('$DWGCODEPAGE', 'ANSI_1252')
@@ -51,9 +65,12 @@ class Sections(object):
                 bootstrap = False
             else:
                 section_name = name(section)
-                if section_name in SECTIONMAP:
+                if section_name in SECTIONMAP and section_name not in drawing.skip_sections:
                     section_class = get_section_class(section_name)
-                    new_section = section_class.from_tags(section, drawing)
+                    if isinstance(section, TagArrays) and hasattr(section_class, 'from_tag_arrays'):
+                        new_section = section_class.from_tag_arrays(section, drawing)
+                    else:
+                        new_section = section_class.from_tags(tags(section), drawing)
                 else:
                     new_section = None
             if new_section is not None:
@@ -25,6 +25,7 @@ except ImportError:
     CYTHON_EXT = False
     from.pytags import TagIterator, Tags, TagGroups, DXFTag, NONE_TAG
     from.pytags import DXFStructureError, StringIterator, ClassifiedTags
+from .pytags import TagArrays
 
 
 import sys
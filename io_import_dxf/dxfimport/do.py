@@ -29,8 +29,9 @@ from math import pi, radians
 
 import bmesh
 from .. import dxfgrabber
+from ..dxfgrabber.entities import EntityTable
 from . import convert, is_, groupsort
-from .line_merger import line_merger
+from .line_merger import line_merger, grid_line_merger
 from ..transverse_mercator import TransverseMercator
 from io import open
 
@@ -97,13 +98,15 @@ class Do(object):
         "dwg", "combination", "known_blocks", "import_text", "import_light", "export_acis", "merge_lines",
         "do_bounding_boxes", "acis_files", "errors", "block_representation", "recenter", "did_group_instance",
         "objects_before", "pDXF", "pScene", "thickness_and_width", "but_group_by_att", "current_scene",
-        "dxf_unit_scale",
+        "dxf_unit_scale", "merge_lines_mode", "merge_lines_tolerance",
     )
 
     def __init__(self, dxf_filename, c=BY_LAYER, import_text=True, import_light=True, export_acis=True,
                  merge_lines=True, do_bbox=True, block_rep=LINKED_OBJECTS, recenter=False, pDXF=None, pScene=None,
-                 thicknessWidth=True, but_group_by_att=True, dxf_unit_scale=1.0):
-        self.dwg = dxfgrabber.readfile(dxf_filename, {"assure_3d_coords": True})
+                 thicknessWidth=True, but_group_by_att=True, dxf_unit_scale=1.0, layers=None,
+                 merge_lines_mode='ROUNDED', merge_lines_tolerance=0.0):
+        self.dwg = dxfgrabber.readfile(dxf_filename, self._read_options(import_text, import_light, export_acis,
+                                                                        layers))
         self.combination = c
         self.known_blocks = {}
         self.import_text = import_text
@@ -123,6 +126,26 @@ class Do(object):
         self.but_group_by_att = but_group_by_att
         self.current_scene = None
         self.dxf_unit_scale = dxf_unit_scale
+        self.merge_lines_mode = merge_lines_mode
+        self.merge_lines_tolerance = merge_lines_tolerance
+
+    @staticmethod
+    def _read_options(import_text, import_light, export_acis, layers):
+        """
+        dxfgrabber options, entities that are not imported are not even built.
+        """
+        skip_sections = set(["OBJECTS"])
+        if not export_acis:
+            skip_sections.add("ACDSDATA")
+
+        skip_types = set([])
+        if not import_text:
+            skip_types.update(("TEXT", "MTEXT"))
+        if not import_light:
+            skip_types.add("LIGHT")
+        dxftypes = set(EntityTable) - skip_types if skip_types else None
+
+        return {"assure_3d_coords": True, "skip_sections": skip_sections, "layers": layers, "dxftypes": dxftypes}
 
     def proj(self, co):
         """
@@ -1097,7 +1120,10 @@ class Do(object):
         curve: Blender curve data
         merges a list of LINE entities to a polygon-point-list and adds it to the Blender curve
         """
-        polylines = line_merger(lines)
+        if self.merge_lines_mode == 'GRID':
+            polylines = grid_line_merger(lines, tolerance=self.merge_lines_tolerance)
+        else:
+            polylines = line_merger(lines)
         for polyline in polylines:
             self._poly(polyline, curve, polyline[0] == polyline[-1])
 
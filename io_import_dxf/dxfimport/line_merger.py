@@ -19,11 +19,29 @@
 # <pep8 compliant>
 
 
+from __future__ import absolute_import
+from collections import deque
+from itertools import product, repeat
+from math import floor
+from operator import add
+
+
 def line_merger(lines, precision=6):
     merger = _LineMerger(lines, precision)
     return merger.polylines
 
 
+def grid_line_merger(lines, precision=6, tolerance=0.0):
+    """
+    Merges the same set of segments as line_merger(), though at junctions of more than two
+    lines they may be grouped into polylines differently. An index of the line end points is
+    built once, so every step of a polyline is a constant time lookup. With a tolerance > 0
+    end points closer than it are joined, instead of those equal after rounding.
+    """
+    merger = _GridLineMerger(lines, precision, tolerance)
+    return merger.polylines
+
+
 def _round_point(point, precision):
     return tuple(round(c, precision) for c in point)
 
@@ -111,3 +129,90 @@ class _LineMerger(object):
                         extend_end = False
             polylines.append(polyline)
         return polylines
+
+
+class _GridLineMerger(object):
+    def __init__(self, lines, precision, tolerance):
+        self.precision = precision
+        self.tolerance = tolerance
+        self.points = []  # coordinates of each vertex
+        self.cells = dict()  # key: grid cell -> value: vertex (exact) or list of vertices (tolerance)
+        self.vertex = self.near_vertex if tolerance > 0 else self.exact_vertex
+        self.segments = []  # single lines as vertex tuples: (start, end) with start < end
+        self.links = []  # segments (indices) at each vertex
+        self.setup(lines)
+        self.polylines = self.merge_lines()  # result of merging process
+
+    def exact_vertex(self, point):
+        point = tuple(map(round, point, repeat(self.precision, len(point))))
+        vertex = self.cells.get(point)
+        if vertex is None:
+            vertex = self.cells[point] = len(self.points)
+            self.points.append(point)
+        return vertex
+
+    def near_vertex(self, point):
+        # with cells twice the tolerance, a point within tolerance is in the same cell or
+        # in the neighbouring one on the side the point is closer to, per coordinate
+        size = self.tolerance * 2
+        scaled = [c / size for c in point]
+        cell = tuple(int(floor(c)) for c in scaled)
+        sides = [(0, -1) if c - i < 0.5 else (0, 1) for c, i in zip(scaled, cell)]
+
+        max_distance = self.tolerance * self.tolerance
+        for offset in product(*sides):
+            for vertex in self.cells.get(tuple(map(add, cell, offset)), ()):
+                if sum((a - b) ** 2 for a, b in zip(self.points[vertex], point)) <= max_distance:
+                    return vertex
+
+        vertex = len(self.points)
+        self.points.append(tuple(point))
+        self.cells.setdefault(cell, []).append(vertex)
+        return vertex
+
+    def setup(self, lines):
+        segments = set()
+        for line in lines:
+            s = self.vertex(line.start)
+            e = self.vertex(line.end)
+            if s != e:  # doubles are detected by ordered vertices
+                segments.add((s, e) if s < e else (e, s))
+        self.segments = list(segments)
+
+        self.links = [[] for point in self.points]
+        for index, (s, e) in enumerate(self.segments):
+            self.links[s].append(index)
+            self.links[e].append(index)
+
+    def merge_lines(self):
+        segments = self.segments
+        links = self.links
+        used = [False] * len(segments)
+
+        def get_extension_vertex(vertex):
+            # used segments are dropped from the links, so each one is looked at once per end
+            vertex_links = links[vertex]
+            while vertex_links:
+                index = vertex_links.pop()
+                if not used[index]:
+                    used[index] = True
+                    s, e = segments[index]
+                    return e if s == vertex else s
+            return None
+
+        polylines = []
+        for index, segment in enumerate(segments):
+            if used[index]:
+                continue
+            used[index] = True
+            polyline = deque(segment)  # start a new polyline
+            vertex = get_extension_vertex(polyline[0])  # extend start of polyline
+            while vertex is not None:
+                polyline.appendleft(vertex)
+                vertex = get_extension_vertex(vertex)
+            vertex = get_extension_vertex(polyline[-1])  # extend end of polyline
+            while vertex is not None:
+                polyline.append(vertex)
+                vertex = get_extension_vertex(vertex)
+            polylines.append([self.points[vertex] for vertex in polyline])
+        return polylines
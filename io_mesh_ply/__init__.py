@@ -124,6 +124,11 @@ class ExportPLY(bpy.types.Operator, ExportHelper, IOPLYOrientationHelper):
             description="Export the active vertex color layer",
             default=True,
             )
+    use_ascii = BoolProperty(
+            name="ASCII",
+            description="Export using the ASCII file format, otherwise binary (smaller and faster to read)",
+            default=True,
+            )
 
     global_scale = FloatProperty(
             name="Scale",
@@ -165,6 +170,7 @@ class ExportPLY(bpy.types.Operator, ExportHelper, IOPLYOrientationHelper):
         row = layout.row()
         row.prop(self, "use_uv_coords")
         row.prop(self, "use_colors")
+        layout.prop(self, "use_ascii")
 
         layout.prop(self, "axis_forward")
         layout.prop(self, "axis_up")
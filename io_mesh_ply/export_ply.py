@@ -27,7 +27,15 @@ Only one mesh can be exported at a time.
 from __future__ import absolute_import
 import bpy
 import os
+import array
+import struct
 from io import open
+from itertools import izip, chain, compress, repeat
+
+from array_utils import gather, unique_indices
+
+# vertices or faces written at once
+BLOCK_SIZE = 16 * 1024
 
 
 def save_mesh(filepath,
@@ -35,17 +43,9 @@ def save_mesh(filepath,
               use_normals=True,
               use_uv_coords=True,
               use_colors=True,
+              use_ascii=True,
               ):
 
-    def rvec3d(v):
-        return round(v[0], 6), round(v[1], 6), round(v[2], 6)
-
-    def rvec2d(v):
-        return round(v[0], 6), round(v[1], 6)
-
-    file = open(filepath, "w", encoding="utf8", newline="\n")
-    fw = file.write
-
     # Be sure tessface & co are available!
     if not mesh.tessfaces and mesh.polygons:
         mesh.calc_tessface()
@@ -79,104 +79,158 @@ def save_mesh(filepath,
         else:
             active_col_layer = active_col_layer.data
 
-    # in case
-    color = uvcoord = uvcoord_key = normal = normal_key = None
-
     mesh_verts = mesh.vertices  # save a lookup
-    ply_verts = []  # list of dictionaries
-    # vdict = {} # (index, normal, uv) -> new index
-    vdict = [{} for i in xrange(len(mesh_verts))]
-    ply_faces = [[] for f in xrange(len(mesh.tessfaces))]
-    vert_count = 0
-    for i, f in enumerate(mesh.tessfaces):
-
-        smooth = not use_normals or f.use_smooth
-        if not smooth:
-            normal = f.normal[:]
-            normal_key = rvec3d(normal)
-
-        if has_uv:
-            uv = active_uv_layer[i]
-            uv = uv.uv1, uv.uv2, uv.uv3, uv.uv4
-        if has_vcol:
-            col = active_col_layer[i]
-            col = col.color1[:], col.color2[:], col.color3[:], col.color4[:]
-
-        f_verts = f.vertices
-
-        pf = ply_faces[i]
-        for j, vidx in enumerate(f_verts):
-            v = mesh_verts[vidx]
-
-            if smooth:
-                normal = v.normal[:]
-                normal_key = rvec3d(normal)
-
-            if has_uv:
-                uvcoord = uv[j][0], uv[j][1]
-                uvcoord_key = rvec2d(uvcoord)
-
-            if has_vcol:
-                color = col[j]
-                color = (int(color[0] * 255.0),
-                         int(color[1] * 255.0),
-                         int(color[2] * 255.0),
-                         )
-            key = normal_key, uvcoord_key, color
-
-            vdict_local = vdict[vidx]
-            pf_vidx = vdict_local.get(key)  # Will be None initially
-
-            if pf_vidx is None:  # same as vdict_local.has_key(key)
-                pf_vidx = vdict_local[key] = vert_count
-                ply_verts.append((vidx, normal, uvcoord, color))
-                vert_count += 1
-
-            pf.append(pf_vidx)
-
-    fw("ply\n")
-    fw("format ascii 1.0\n")
-    fw("comment Created by Blender %s - "
-       "www.blender.org, source file: %r\n" %
-       (bpy.app.version_string, os.path.basename(bpy.data.filepath)))
-
-    fw("element vertex %d\n" % len(ply_verts))
-
-    fw("property float x\n"
-       "property float y\n"
-       "property float z\n")
+    tessfaces = mesh.tessfaces
+    tot_verts = len(mesh_verts)
+    tot_faces = len(tessfaces)
+
+    # Everything is read per face corner, 4 corners per face (the 4th is 0 for triangles)
+    faces_raw = array.array('i', [0]) * (tot_faces * 4)
+    tessfaces.foreach_get("vertices_raw", faces_raw)
+    face_totals = [4 if v4 else 3 for v4 in faces_raw[3::4]]
+    corner_used = [True] * (tot_faces * 4)
+    corner_used[3::4] = map(bool, faces_raw[3::4])
+    corners = list(compress(xrange(tot_faces * 4), corner_used))
+    corner_verts = list(compress(faces_raw, corner_used))
+    del faces_raw
+
+    # per corner values (flat, size values per corner) and their keys, the ply vertices being
+    # unique combinations of the mesh vertex and the rounded values
+    corner_values = []
+    corner_keys = [corner_verts]
 
     if use_normals:
-        fw("property float nx\n"
-           "property float ny\n"
-           "property float nz\n")
+        # normals of vertices, followed by those of faces, used for flat faces
+        normals = array.array('f', [0.0]) * (tot_verts * 3)
+        mesh_verts.foreach_get("normal", normals)
+        faces_no = array.array('f', [0.0]) * (tot_faces * 3)
+        tessfaces.foreach_get("normal", faces_no)
+        normals.extend(faces_no)
+        del faces_no
+
+        faces_smooth = [False] * tot_faces
+        tessfaces.foreach_get("use_smooth", faces_smooth)
+        corner_no = [vidx if faces_smooth[c >> 2] else tot_verts + (c >> 2)
+                     for vidx, c in izip(corner_verts, corners)]
+        corner_no = gather(normals, corner_no, 3)
+        del normals, faces_smooth
+
+        corner_values.append((corner_no, 3))
+        corner_keys += [map(round, corner_no[i::3], repeat(6, len(corners))) for i in xrange(3)]
+
+    if has_uv:
+        uvs = array.array('f', [0.0]) * (tot_faces * 8)
+        active_uv_layer.foreach_get("uv_raw", uvs)
+        corner_uv = gather(uvs, corners, 2)
+        del uvs
+
+        corner_values.append((corner_uv, 2))
+        corner_keys += [map(round, corner_uv[i::2], repeat(6, len(corners))) for i in xrange(2)]
+
+    if has_vcol:
+        cols = array.array('f', [0.0]) * (tot_faces * 12)
+        col = array.array('f', [0.0]) * (tot_faces * 3)
+        for j in xrange(4):
+            active_col_layer.foreach_get("color%d" % (j + 1), col)
+            for i in xrange(3):
+                cols[j * 3 + i::12] = col[i::3]
+        corner_col = array.array('i', map(int, map((255.0).__mul__, gather(cols, corners, 3))))
+        del cols, col
+
+        corner_values.append((corner_col, 3))
+        corner_keys += [corner_col[i::3] for i in xrange(3)]
+
+    corner_index, firsts = unique_indices(zip(*corner_keys))
+    del corner_keys
+
+    # values of each ply vertex, one vertex after the other
+    co = array.array('f', [0.0]) * (tot_verts * 3)
+    mesh_verts.foreach_get("co", co)
+    columns = [(gather(co, map(corner_verts.__getitem__, firsts), 3), 3)]
+    columns += [(gather(values, firsts, size), size) for values, size in corner_values]
+    vertex_values = list(chain.from_iterable(izip(*[values[i::size] for values, size in columns
+                                                    for i in xrange(size)])))
+    tot_ply_verts = len(firsts)
+    del co, columns, corner_values, corner_verts, firsts
+
+    # face records are the number of corners followed by the ply vertex of each corner
+    corner_index = iter(corner_index)
+    corner_index = [next(corner_index) if used else 0 for used in corner_used]
+    face_values = [0] * (tot_faces * 5)
+    face_values[0::5] = face_totals
+    for j in xrange(4):
+        face_values[j + 1::5] = corner_index[j::4]
+    face_used = [True] * (tot_faces * 5)
+    face_used[4::5] = corner_used[3::4]
+    face_values = list(compress(face_values, face_used))
+    del corner_index, corner_used, face_used
+
+    if use_ascii:
+        file = open(filepath, "w", encoding="utf8", newline="\n")
+        vertex_fmt = ("%.6f %.6f %.6f" +
+                      (" %.6f %.6f %.6f" if use_normals else "") +
+                      (" %.6f %.6f" if use_uv_coords else "") +
+                      (" %u %u %u" if use_colors else "") + "\n")
+        face_fmts = {3: "%d %d %d %d\n", 4: "%d %d %d %d %d\n"}
+
+        def pack(fmt, values):
+            return fmt % tuple(values)
+    else:
+        file = open(filepath, "wb")
+        vertex_fmt = ("fff" +
+                      ("fff" if use_normals else "") +
+                      ("ff" if use_uv_coords else "") +
+                      ("BBB" if use_colors else ""))
+        face_fmts = {3: "BIII", 4: "BIIII"}
+
+        def pack(fmt, values):
+            return struct.pack("<" + fmt, *values)
+
+    header = ["ply\n"]
+    header.append("format ascii 1.0\n" if use_ascii else "format binary_little_endian 1.0\n")
+    header.append("comment Created by Blender %s - "
+                  "www.blender.org, source file: %r\n" %
+                  (bpy.app.version_string, os.path.basename(bpy.data.filepath)))
+
+    header.append("element vertex %d\n" % tot_ply_verts)
+
+    header.append("property float x\n"
+                  "property float y\n"
+                  "property float z\n")
+
+    if use_normals:
+        header.append("property float nx\n"
+                      "property float ny\n"
+                      "property float nz\n")
     if use_uv_coords:
-        fw("property float s\n"
-           "property float t\n")
+        header.append("property float s\n"
+                      "property float t\n")
     if use_colors:
-        fw("property uchar red\n"
-           "property uchar green\n"
-           "property uchar blue\n")
-
-    fw("element face %d\n" % len(mesh.tessfaces))
-    fw("property list uchar uint vertex_indices\n")
-    fw("end_header\n")
-
-    for i, v in enumerate(ply_verts):
-        fw("%.6f %.6f %.6f" % mesh_verts[v[0]].co[:])  # co
-        if use_normals:
-            fw(" %.6f %.6f %.6f" % v[1])  # no
-        if use_uv_coords:
-            fw(" %.6f %.6f" % v[2])  # uv
-        if use_colors:
-            fw(" %u %u %u" % v[3])  # col
-        fw("\n")
-
-    for pf in ply_faces:
-        if len(pf) == 3:
-            fw("3 %d %d %d\n" % tuple(pf))
-        else:
-            fw("4 %d %d %d %d\n" % tuple(pf))
+        header.append("property uchar red\n"
+                      "property uchar green\n"
+                      "property uchar blue\n")
+
+    header.append("element face %d\n" % tot_faces)
+    header.append("property list uchar uint vertex_indices\n")
+    header.append("end_header\n")
+    header = "".join(header)
+
+    fw = file.write
+    fw(header if use_ascii else header.encode("utf8"))
+
+    # write blocks of vertices and faces, each formatted at once
+    vertex_size = vertex_fmt.count("%") if use_ascii else len(vertex_fmt)
+    step = BLOCK_SIZE * vertex_size
+    for i in xrange(0, len(vertex_values), step):
+        block = vertex_values[i:i + step]
+        fw(pack(vertex_fmt * (len(block) // vertex_size), block))
+
+    start = 0
+    for i in xrange(0, tot_faces, BLOCK_SIZE):
+        totals = face_totals[i:i + BLOCK_SIZE]
+        end = start + len(totals) + sum(totals)
+        fw(pack("".join(map(face_fmts.__getitem__, totals)), face_values[start:end]))
+        start = end
 
     file.close()
     print "writing %r done" % filepath
@@ -191,6 +245,7 @@ def save(operator,
          use_normals=True,
          use_uv_coords=True,
          use_colors=True,
+         use_ascii=True,
          global_matrix=None
          ):
 
@@ -220,6 +275,7 @@ def save(operator,
                     use_normals=use_normals,
                     use_uv_coords=use_uv_coords,
                     use_colors=use_colors,
+                    use_ascii=use_ascii,
                     )
 
     if use_mesh_modifiers:
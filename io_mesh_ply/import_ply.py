@@ -21,9 +21,16 @@
 from __future__ import division
 from __future__ import with_statement
 from __future__ import absolute_import
+import array
 import re
 import struct
 from io import open
+from itertools import izip, chain
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class element_spec(object):
@@ -42,6 +49,76 @@ class element_spec(object):
             stream = stream.readline().split()
         return [x.load(format, stream) for x in self.properties]
 
+    def dtype(self, format, list_sizes):
+        """
+        numpy dtype of the binary records, with list_sizes items in each list property in order,
+        None when the records don't have a fixed layout (strings).
+        """
+        fields = []
+        list_sizes = iter(list_sizes)
+        for i, p in enumerate(self.properties):
+            if p.numeric_type == 's' or p.list_type == 's':
+                return None
+            name = "p%d" % i  # property names are not always unique
+            if p.list_type is None:
+                fields.append((name, format + p.numeric_type))
+            else:
+                fields.append((name + "_count", format + p.list_type))
+                fields.append((name, format + p.numeric_type, (next(list_sizes),)))
+        return numpy.dtype(fields)
+
+    def load_numpy(self, format, stream):
+        """
+        Read all records at once, when every list property has the same number of items
+        in all records as in the first one (e.g. only triangles), None otherwise.
+        """
+        start = stream.tell()
+        list_sizes = []
+        if any(p.list_type is not None for p in self.properties):
+            if not self.count or any(p.list_type == 's' or p.numeric_type == 's' for p in self.properties):
+                return None
+            first = self.load(format, stream)
+            stream.seek(start)
+            list_sizes = [len(v) for p, v in izip(self.properties, first) if p.list_type is not None]
+
+        dtype = self.dtype(format, list_sizes)
+        if dtype is None:
+            return None
+
+        data = stream.read(dtype.itemsize * self.count)
+        if len(data) != dtype.itemsize * self.count:
+            stream.seek(start)
+            return None
+        records = numpy.frombuffer(data, dtype=dtype)
+
+        # verify the lists really all have the size of the first one
+        for i, p in enumerate(self.properties):
+            if p.list_type is not None and (records["p%d_count" % i] != records.dtype["p%d" % i].shape[0]).any():
+                stream.seek(start)
+                return None
+
+        columns = {}
+        for i, p in enumerate(self.properties):
+            columns.setdefault(p.name, records["p%d" % i])
+        return columns
+
+    def load_columns(self, format, stream):
+        """
+        Values of each property of all records, by property name.
+        Columns are numpy arrays when the records could be read at once (list properties
+        then being 2D arrays), lists otherwise.
+        """
+        if numpy is not None and format != 'ascii':
+            columns = self.load_numpy(format, stream)
+            if columns is not None:
+                return columns
+
+        rows = [self.load(format, stream) for j in xrange(self.count)]
+        columns = {}
+        for i, p in enumerate(self.properties):
+            columns.setdefault(p.name, [row[i] for row in rows])
+        return columns
+
     def index(self, name):
         for i, p in enumerate(self.properties):
             if p.name == name:
@@ -113,7 +190,7 @@ class object_spec(object):
         self.specs = []
 
     def load(self, format, stream):
-        return dict([(i.name, [i.load(format, stream) for j in xrange(i.count)]) for i in self.specs])
+        return dict([(i.name, i.load_columns(format, stream)) for i in self.specs])
 
         '''
         # Longhand for above LC
@@ -218,8 +295,74 @@ def read(filepath):
 import bpy
 
 
-def load_ply_mesh(filepath, ply_name):
+def _take(column, indices):
+    """Values of column (numpy array or list) at indices."""
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        return column[indices]
+    return map(column.__getitem__, indices)
+
+
+def _scale(column, factor):
+    if factor == 1.0:
+        return column
+    if numpy is not None and isinstance(column, numpy.ndarray):
+        return column * factor
+    return [v * factor for v in column]
+
+
+def _interleave(columns, typecode):
+    """Flat array of the values of columns, one of each after the other, as used by foreach_set()."""
+    if numpy is not None and all(isinstance(c, numpy.ndarray) for c in columns):
+        return numpy.column_stack(columns).astype(typecode).ravel()
+    return array.array(typecode, chain.from_iterable(izip(*columns)))
+
+
+def _faces_numpy(faces):
+    """
+    Like unpack_face_list(), for a 2D array of faces all with the same number of vertices,
+    faces of more than 4 vertices being fan filled.
+    """
+    total = faces.shape[1]
+    if total > 4:
+        faces = numpy.column_stack([numpy.repeat(faces[:, 0], total - 2),
+                                    faces[:, 1:-1].ravel(),
+                                    faces[:, 2:].ravel()])
+        total = 3
+
+    raw = numpy.zeros((len(faces), 4), dtype=numpy.int32)
+    raw[:, :total] = faces
+    # a 0 index last means a triangle for tessfaces, rotate these faces
+    if total == 3:
+        rotate = raw[:, 2] == 0
+        raw[rotate, :3] = raw[rotate][:, (1, 2, 0)]
+    else:
+        rotate = (raw[:, 2] == 0) | (raw[:, 3] == 0)
+        raw[rotate] = raw[rotate][:, (2, 3, 0, 1)]
+    return raw.ravel()
+
+
+def _faces_list(face_lists, strip_lists):
+    """Flat vertex indices of the faces (4 per face), fan filling faces and splitting triangle strips."""
     from bpy_extras.io_utils import unpack_face_list
+
+    faces = []
+    for ind in face_lists:
+        len_ind = len(ind)
+        if len_ind <= 4:
+            faces.append(ind)
+        else:
+            # Fan fill the face
+            for j in xrange(len_ind - 2):
+                faces.append((ind[0], ind[j + 1], ind[j + 2]))
+
+    for ind in strip_lists:
+        for j in xrange(len(ind) - 2):
+            faces.append((ind[j], ind[j + 1], ind[j + 2]))
+
+    return array.array('i', unpack_face_list(faces))
+
+
+def load_ply_mesh(filepath, ply_name):
     # from bpy_extras.image_utils import load_image  # UNUSED
 
     obj_spec, obj, texture = read(filepath)
@@ -234,7 +377,6 @@ def load_ply_mesh(filepath, ply_name):
 
     for el in obj_spec.specs:
         if el.name == 'vertex':
-            vindices_x, vindices_y, vindices_z = el.index('x'), el.index('y'), el.index('z')
             # noindices = (el.index('nx'), el.index('ny'), el.index('nz'))
             # if -1 in noindices: noindices = None
             uvindices = (el.index('s'), el.index('t'))
@@ -247,98 +389,59 @@ def load_ply_mesh(filepath, ply_name):
                 colmultiply = [1.0 if el.properties[i].numeric_type in set(['f', 'd']) else (1.0 / 255.0) for i in colindices]
 
         elif el.name == 'face':
-            findex = el.index('vertex_indices')
+            findex = el.properties[el.index('vertex_indices')].name
         elif el.name == 'tristrips':
-            trindex = el.index('vertex_indices')
+            trindex = el.properties[el.index('vertex_indices')].name
         elif el.name == 'edge':
-            eindex1, eindex2 = el.index('vertex1'), el.index('vertex2')
-
-    mesh_faces = []
-    mesh_uvs = []
-    mesh_colors = []
-
-    def add_face(vertices, indices, uvindices, colindices):
-        mesh_faces.append(indices)
-        if uvindices:
-            mesh_uvs.append([(vertices[index][uvindices[0]], vertices[index][uvindices[1]]) for index in indices])
-        if colindices:
-            mesh_colors.append([(vertices[index][colindices[0]] * colmultiply[0],
-                                 vertices[index][colindices[1]] * colmultiply[1],
-                                 vertices[index][colindices[2]] * colmultiply[2],
-                                 ) for index in indices])
-
-    if uvindices or colindices:
-        # If we have Cols or UVs then we need to check the face order.
-        add_face_simple = add_face
-
-        # EVIL EEKADOODLE - face order annoyance.
-        def add_face(vertices, indices, uvindices, colindices):
-            if len(indices) == 4:
-                if indices[2] == 0 or indices[3] == 0:
-                    indices = indices[2], indices[3], indices[0], indices[1]
-            elif len(indices) == 3:
-                if indices[2] == 0:
-                    indices = indices[1], indices[2], indices[0]
-
-            add_face_simple(vertices, indices, uvindices, colindices)
+            eindex1, eindex2 = el.properties[el.index('vertex1')].name, el.properties[el.index('vertex2')].name
 
+    # properties are read in columns, all values of a property at once
     verts = obj['vertex']
-
-    if 'face' in obj:
-        for f in obj['face']:
-            ind = f[findex]
-            len_ind = len(ind)
-            if len_ind <= 4:
-                add_face(verts, ind, uvindices, colindices)
-            else:
-                # Fan fill the face
-                for j in xrange(len_ind - 2):
-                    add_face(verts, (ind[0], ind[j + 1], ind[j + 2]), uvindices, colindices)
-
-    if 'tristrips' in obj:
-        for t in obj['tristrips']:
-            ind = t[trindex]
-            len_ind = len(ind)
-            for j in xrange(len_ind - 2):
-                add_face(verts, (ind[j], ind[j + 1], ind[j + 2]), uvindices, colindices)
+    faces = obj['face'][findex] if 'face' in obj else []
+    strips = obj['tristrips'][trindex] if 'tristrips' in obj else []
+
+    # Flat vertex indices of the tessfaces, 4 per face, 0 last for triangles.
+    # When uvs or colors are read, the face order matters: unpack_face_list() rotates
+    # the faces with a 0 index last, this is done before reading them at the corners.
+    if (numpy is not None and isinstance(faces, numpy.ndarray) and faces.ndim == 2 and
+            faces.shape[1] >= 3 and not len(strips)):
+        faces_raw = _faces_numpy(faces)
+    elif len(faces) or len(strips):
+        faces_raw = _faces_list(faces, strips)
+    else:
+        faces_raw = []
+    del faces, strips
 
     mesh = bpy.data.meshes.new(name=ply_name)
 
-    mesh.vertices.add(len(obj['vertex']))
+    mesh.vertices.add(len(verts['x']))
 
-    mesh.vertices.foreach_set("co", [a for v in obj['vertex'] for a in (v[vindices_x], v[vindices_y], v[vindices_z])])
+    mesh.vertices.foreach_set("co", _interleave((verts['x'], verts['y'], verts['z']), 'f'))
 
     if 'edge' in obj:
-        mesh.edges.add(len(obj['edge']))
-        mesh.edges.foreach_set("vertices", [a for e in obj['edge'] for a in (e[eindex1], e[eindex2])])
-
-    if mesh_faces:
-        mesh.tessfaces.add(len(mesh_faces))
-        mesh.tessfaces.foreach_set("vertices_raw", unpack_face_list(mesh_faces))
-
-        if uvindices or colindices:
-            if uvindices:
-                uvlay = mesh.tessface_uv_textures.new()
-            if colindices:
-                vcol_lay = mesh.tessface_vertex_colors.new()
-
-            if uvindices:
-                for i, f in enumerate(uvlay.data):
-                    ply_uv = mesh_uvs[i]
-                    for j, uv in enumerate(f.uv):
-                        uv[0], uv[1] = ply_uv[j]
-
-            if colindices:
-                for i, f in enumerate(vcol_lay.data):
-                    # XXX, colors dont come in right, needs further investigation.
-                    ply_col = mesh_colors[i]
-                    if len(ply_col) == 4:
-                        f_col = f.color1, f.color2, f.color3, f.color4
-                    else:
-                        f_col = f.color1, f.color2, f.color3
+        edges = obj['edge']
+        mesh.edges.add(len(edges[eindex1]))
+        mesh.edges.foreach_set("vertices", _interleave((edges[eindex1], edges[eindex2]), 'i'))
+
+    if len(faces_raw):
+        mesh.tessfaces.add(len(faces_raw) // 4)
+        mesh.tessfaces.foreach_set("vertices_raw", faces_raw)
+
+        # vertex index at each corner of the faces (4th corner unused for triangles)
+        corners = [faces_raw[j::4] for j in xrange(4)]
 
-                    for j, col in enumerate(f_col):
-                        col.r, col.g, col.b = ply_col[j]
+        if uvindices:
+            uvlay = mesh.tessface_uv_textures.new()
+            u, v = verts['s'], verts['t']
+            uvlay.data.foreach_set("uv_raw", _interleave(list(chain.from_iterable(
+                    (_take(u, c), _take(v, c)) for c in corners)), 'f'))
+
+        if colindices:
+            vcol_lay = mesh.tessface_vertex_colors.new()
+            # XXX, colors dont come in right, needs further investigation.
+            channels = [_scale(verts[name], m) for name, m in izip(('red', 'green', 'blue'), colmultiply)]
+            for j, c in enumerate(corners):
+                vcol_lay.data.foreach_set("color%d" % (j + 1), _interleave([_take(ch, c) for ch in channels], 'f'))
 
     mesh.validate()
     mesh.update()
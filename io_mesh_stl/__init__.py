@@ -62,6 +62,7 @@ from bpy.props import (
         CollectionProperty,
         EnumProperty,
         FloatProperty,
+        IntProperty,
         )
 from bpy_extras.io_utils import (
         ImportHelper,
@@ -117,6 +118,21 @@ class ImportSTL(Operator, ImportHelper, IOSTLOrientationHelper):
             default=False,
             )
 
+    use_low_memory = BoolProperty(
+            name="Low Memory",
+            description="Read the file chunk by chunk with compact data structures, "
+                        "slower but allows to import files much bigger than available memory",
+            default=False,
+            )
+
+    split_size = IntProperty(
+            name="Split Size",
+            description="In Low Memory mode, split the imported data into several objects "
+                        "of at most this number of faces each (0 to disable)",
+            min=0,
+            default=0,
+            )
+
     def execute(self, context):
         from . import stl_utils
         from . import blender_utils
@@ -147,6 +163,12 @@ class ImportSTL(Operator, ImportHelper, IOSTLOrientationHelper):
 
         for path in paths:
             objName = bpy.path.display_name(os.path.basename(path))
+            if self.use_low_memory:
+                for tris, tri_nors, pts in stl_utils.read_stl_parts(path, self.split_size):
+                    tri_nors = tri_nors if self.use_facet_normal else None
+                    blender_utils.create_and_link_mesh(objName, tris, tri_nors, pts, global_matrix)
+                    del tris, tri_nors, pts
+                continue
             tris, tri_nors, pts = stl_utils.read_stl(path)
             tri_nors = tri_nors if self.use_facet_normal else None
             blender_utils.create_and_link_mesh(objName, tris, tri_nors, pts, global_matrix)
@@ -210,9 +232,16 @@ class ExportSTL(Operator, ExportHelper, IOSTLOrientationHelper):
                                         to_up=self.axis_up,
                                         ).to_4x4() * Matrix.Scale(global_scale, 4)
 
-        faces = itertools.chain.from_iterable(
-            blender_utils.faces_from_mesh(ob, global_matrix, self.use_mesh_modifiers)
-            for ob in context.selected_objects)
+        if stl_utils.numpy is not None and not self.ascii:
+            faces = [blender_utils.faces_array_from_mesh(ob, global_matrix, self.use_mesh_modifiers)
+                     for ob in context.selected_objects]
+            faces = [f for f in faces if f is not None]
+            faces = (stl_utils.numpy.concatenate(faces) if faces else
+                     stl_utils.numpy.empty((0, 3, 3), dtype=stl_utils.numpy.float32))
+        else:
+            faces = itertools.chain.from_iterable(
+                blender_utils.faces_from_mesh(ob, global_matrix, self.use_mesh_modifiers)
+                for ob in context.selected_objects)
 
         stl_utils.write_stl(faces=faces, **keywords)
 
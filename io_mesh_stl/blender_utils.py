@@ -24,21 +24,81 @@ import array
 from itertools import chain
 from itertools import izip
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _flat_array(seq, typecode):
+    """
+    Return *seq* (numpy array or flat array.array) as a flat buffer usable by foreach_set().
+    """
+    if isinstance(seq, array.array):
+        assert(seq.typecode == typecode)
+        return seq
+    return numpy.ascontiguousarray(seq, dtype=numpy.dtype(typecode)).ravel()
+
+
+def _mesh_from_arrays(mesh, points, faces):
+    """
+    Fill mesh from arrays of *points* and triangles, like from_pydata() does.
+
+    Arrays are either (N, 3) numpy arrays, or flat array.array ('f' for points, 'i' for faces).
+    """
+    points = _flat_array(points, 'f')
+    faces = _flat_array(faces, 'i')
+    nbr_faces = len(faces) // 3
+
+    mesh.vertices.add(len(points) // 3)
+    mesh.vertices.foreach_set("co", points)
+
+    mesh.loops.add(nbr_faces * 3)
+    mesh.loops.foreach_set("vertex_index", faces)
+
+    mesh.polygons.add(nbr_faces)
+    mesh.polygons.foreach_set("loop_start", array.array('i', xrange(0, nbr_faces * 3, 3)))
+    mesh.polygons.foreach_set("loop_total", array.array('i', (3,)) * nbr_faces)
+
+    mesh.update(calc_edges=True)
+
+
+def _loop_normals_from_arrays(face_nors):
+    if isinstance(face_nors, array.array):
+        lnors = array.array('f')
+        for i in xrange(0, len(face_nors), 3):
+            nor = face_nors[i:i + 3]
+            lnors.extend(nor)
+            lnors.extend(nor)
+            lnors.extend(nor)
+        return lnors
+    return numpy.repeat(numpy.asarray(face_nors, dtype=numpy.float32), 3, axis=0).ravel()
+
 
 def create_and_link_mesh(name, faces, face_nors, points, global_matrix):
     """
     Create a blender mesh and object called name from a list of
     *points* and *faces* and link it in the current scene.
+
+    *points*, *faces* and *face_nors* may also be numpy arrays (as returned by read_stl()),
+    or flat array.array (as returned by read_stl_parts()).
     """
 
     mesh = bpy.data.meshes.new(name)
-    mesh.from_pydata(points, [], faces)
+    is_array = isinstance(faces, array.array) or (numpy is not None and isinstance(faces, numpy.ndarray))
+    if is_array:
+        _mesh_from_arrays(mesh, points, faces)
+    else:
+        mesh.from_pydata(points, [], faces)
 
-    if face_nors:
+    if face_nors is not None and len(face_nors):
         # Note: we store 'temp' normals in loops, since validate() may alter final mesh,
         #       we can only set custom lnors *after* calling it.
         mesh.create_normals_split()
-        lnors = tuple(chain(*chain(*izip(face_nors, face_nors, face_nors))))
+        if is_array:
+            lnors = _loop_normals_from_arrays(face_nors)
+        else:
+            lnors = tuple(chain(*chain(*izip(face_nors, face_nors, face_nors))))
         mesh.loops.foreach_set("normal", lnors)
 
     mesh.transform(global_matrix)
@@ -46,7 +106,7 @@ def create_and_link_mesh(name, faces, face_nors, points, global_matrix):
     # update mesh to allow proper display
     mesh.validate(clean_customdata=False)  # *Very* important to not remove lnors here!
 
-    if face_nors:
+    if face_nors is not None and len(face_nors):
         clnors = array.array('f', [0.0] * (len(mesh.loops) * 3))
         mesh.loops.foreach_get("normal", clnors)
 
@@ -113,3 +173,41 @@ def faces_from_mesh(ob, global_matrix, use_mesh_modifiers=False, triangulate=Tru
         yield [vertices[index].co.copy() for index in indexes]
 
     bpy.data.meshes.remove(mesh)
+
+
+def faces_array_from_mesh(ob, global_matrix, use_mesh_modifiers=False):
+    """
+    Same as faces_from_mesh() (always triangulating), but returns all triangles at once
+    as a (N, 3, 3) numpy array, using foreach_get() instead of per-vertex access.
+
+    Requires numpy, returns None if the object cannot be converted to a mesh.
+    """
+
+    # get the editmode data
+    ob.update_from_editmode()
+
+    # get the modifiers
+    try:
+        mesh = ob.to_mesh(bpy.context.scene, use_mesh_modifiers, "PREVIEW")
+    except RuntimeError:
+        return None
+
+    mesh.transform(global_matrix * ob.matrix_world)
+    mesh.calc_tessface()
+
+    co = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get("co", co)
+    co.shape = (-1, 3)
+
+    # Tessfaces always have 4 indices, the last one being 0 for triangles
+    # (Blender ensures it is never 0 for quads).
+    vraw = numpy.empty(len(mesh.tessfaces) * 4, dtype=numpy.int32)
+    mesh.tessfaces.foreach_get("vertices_raw", vraw)
+    vraw.shape = (-1, 4)
+
+    bpy.data.meshes.remove(mesh)
+
+    quads = vraw[vraw[:, 3] != 0]
+    tris = numpy.concatenate((vraw[:, :3], quads[:, (2, 3, 0)]))
+
+    return co[tris]
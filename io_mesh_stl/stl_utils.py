@@ -29,6 +29,7 @@ blender --python stl_utils.py -- file1.stl file2.stl file3.stl ...
 from __future__ import with_statement
 from __future__ import absolute_import
 import os
+import array
 import struct
 import contextlib
 import itertools
@@ -36,8 +37,16 @@ from mathutils.geometry import normal
 from itertools import imap
 from io import open
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # TODO: endien
 
+_IS_BIG_ENDIAN = (__import__("sys").byteorder != 'little')
+_NEG_ZERO = struct.pack('<f', -0.0)
+
 class ListDict(dict):
     """
     Set struct with order.
@@ -67,6 +76,102 @@ class ListDict(dict):
         return value
 
 
+class PointTable(object):
+    """
+    Set of points with order, like ListDict, but compact.
+
+    Points are added as packed 12 bytes keys (3 little-endian floats), stored
+    in a single bytearray and indexed by an array-backed open-addressing hash
+    table, instead of a dict of tuples.
+    """
+    __slots__ = (
+        "keys",  # packed points, in insertion order.
+        "_slots",  # index of the point in each slot of the table, -1 when free.
+        "_mask",
+        "_len",
+        )
+
+    KEY_SIZE = 12
+
+    def __init__(self, size_hint=4096):
+        capacity = 16
+        while capacity < size_hint * 2:
+            capacity <<= 1
+        self.keys = bytearray()
+        self._slots = array.array('i', (-1,)) * capacity
+        self._mask = capacity - 1
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, key):
+        """
+        Add a packed point to the Set, return its position in it.
+        """
+        KEY_SIZE = self.KEY_SIZE
+        keys = self.keys
+        slots = self._slots
+        mask = self._mask
+
+        i = hash(key) & mask
+        while True:
+            index = slots[i]
+            if index == -1:
+                break
+            ofs = index * KEY_SIZE
+            if keys[ofs:ofs + KEY_SIZE] == key:
+                return index
+            i = (i + 1) & mask
+
+        index = self._len
+        slots[i] = index
+        keys += key
+        self._len += 1
+
+        # Keep load factor under 1/2.
+        if self._len * 2 > mask:
+            self._grow()
+
+        return index
+
+    def _grow(self):
+        KEY_SIZE = self.KEY_SIZE
+        keys = self.keys
+        capacity = (self._mask + 1) * 2
+        mask = capacity - 1
+        slots = array.array('i', (-1,)) * capacity
+
+        for index in xrange(self._len):
+            ofs = index * KEY_SIZE
+            i = hash(bytes(keys[ofs:ofs + KEY_SIZE])) & mask
+            while slots[i] != -1:
+                i = (i + 1) & mask
+            slots[i] = index
+
+        self._slots = slots
+        self._mask = mask
+
+    def to_array(self):
+        """
+        Return points as a flat array of floats.
+        """
+        pts = array.array('f', bytes(self.keys))
+        if _IS_BIG_ENDIAN:
+            pts.byteswap()
+        return pts
+
+
+def _pack_point_key(key):
+    """
+    Make sure that -0.0 and 0.0 give the same packed key, as they compare equal as floats.
+    """
+    if _NEG_ZERO in key:
+        unpack = struct.unpack('<3f', key)
+        key = struct.pack('<3f', unpack[0] + 0.0, unpack[1] + 0.0, unpack[2] + 0.0)
+    return key
+
+
 # an stl binary file is
 # - 80 bytes of description
 # - 4 bytes of size (unsigned int)
@@ -78,6 +183,15 @@ class ListDict(dict):
 BINARY_HEADER = 80
 BINARY_STRIDE = 12 * 4 + 2
 
+if numpy is not None:
+    # Same layout as above, for reading/writing all facets at once.
+    BINARY_DTYPE = numpy.dtype([
+        ("normal", "<f4", (3,)),
+        ("verts", "<f4", (3, 3)),
+        ("attr", "<u2"),
+        ])
+    assert(BINARY_DTYPE.itemsize == BINARY_STRIDE)
+
 
 def _header_version():
     import bpy
@@ -108,7 +222,7 @@ def _is_ascii_file(data):
     return (file_size != BINARY_HEADER + 4 + BINARY_STRIDE * size)
 
 
-def _binary_read(data):
+def _binary_read_size(data):
     # Skip header...
     data.seek(BINARY_HEADER)
     size = struct.unpack('<I', data.read(4))[0]
@@ -124,6 +238,12 @@ def _binary_read(data):
         size = file_size // BINARY_STRIDE
         print "WARNING! Reported size (facet number) is 0, inferring %d facets from file size." % size
 
+    return size
+
+
+def _binary_read(data):
+    size = _binary_read_size(data)
+
     # We read 4096 elements at once, avoids too much calls to read()!
     CHUNK_LEN = 4096
     chunks = [CHUNK_LEN] * (size // CHUNK_LEN)
@@ -140,6 +260,58 @@ def _binary_read(data):
             yield pt[:3], (pt[3:6], pt[6:9], pt[9:])
 
 
+def _binary_read_numpy(data):
+    """
+    Vectorized version of _binary_read() + ListDict, reading all facets at once.
+
+    Returns the same (tris, tri_nors, pts) as read_stl(), as numpy arrays.
+    """
+    size = _binary_read_size(data)
+
+    facets = numpy.fromfile(data, dtype=BINARY_DTYPE, count=size)
+    tri_nors = facets["normal"]
+
+    # Adding 0.0 turns -0.0 into 0.0, so that both are merged as they would be when comparing floats.
+    verts = numpy.ascontiguousarray(facets["verts"].reshape(-1, 3)) + numpy.float32(0.0)
+    del facets
+
+    # Remove doubles by sorting raw (x, y, z) 12-bytes values,
+    # then restore the order of first occurrence of each point, like ListDict does.
+    verts_raw = verts.view(numpy.dtype((numpy.void, verts.dtype.itemsize * 3))).ravel()
+    _unique, first_index, inverse = numpy.unique(verts_raw, return_index=True, return_inverse=True)
+    del _unique, verts_raw
+
+    order = numpy.argsort(first_index, kind="mergesort")
+    rank = numpy.empty_like(order)
+    rank[order] = numpy.arange(len(order))
+
+    pts = verts[first_index[order]]
+    tris = rank[inverse.ravel()].astype(numpy.int32).reshape(-1, 3)
+
+    return tris, tri_nors, pts
+
+
+def _binary_read_packed(data):
+    """
+    Like _binary_read(), but yields points as raw packed keys (see PointTable).
+    """
+    size = _binary_read_size(data)
+
+    CHUNK_LEN = 4096
+    chunks = [CHUNK_LEN] * (size // CHUNK_LEN)
+    chunks.append(size % CHUNK_LEN)
+
+    unpack = struct.Struct('<3f').unpack_from
+    for chunk_len in chunks:
+        if chunk_len == 0:
+            continue
+        buf = data.read(BINARY_STRIDE * chunk_len)
+        for ofs in xrange(0, BINARY_STRIDE * chunk_len, BINARY_STRIDE):
+            yield unpack(buf, ofs), (_pack_point_key(buf[ofs + 12:ofs + 24]),
+                                     _pack_point_key(buf[ofs + 24:ofs + 36]),
+                                     _pack_point_key(buf[ofs + 36:ofs + 48]))
+
+
 def _ascii_read(data):
     # an stl ascii file is like
     # HEADER: solid some name
@@ -194,6 +366,28 @@ def _binary_write(filepath, faces):
         fw(struct.pack('<80sI', _header_version().encode('ascii'), nb))
 
 
+def _binary_write_numpy(filepath, faces):
+    """
+    Vectorized version of _binary_write(), faces being a (N, 3, 3) array of triangles.
+    """
+    faces = numpy.asarray(faces, dtype=numpy.float32).reshape(-1, 3, 3)
+
+    # Same as mathutils.geometry.normal(v1, v2, v3), zero-length normals are left as is.
+    nors = numpy.cross(faces[:, 0] - faces[:, 1], faces[:, 1] - faces[:, 2])
+    lengths = numpy.sqrt((nors * nors).sum(axis=1))
+    lengths[lengths == 0.0] = 1.0
+    nors /= lengths[:, None]
+
+    facets = numpy.zeros(len(faces), dtype=BINARY_DTYPE)
+    facets["normal"] = nors
+    facets["verts"] = faces
+    del nors
+
+    with open(filepath, 'wb') as data:
+        data.write(struct.pack('<80sI', _header_version().encode('ascii'), len(facets)))
+        facets.tofile(data)
+
+
 def _ascii_write(filepath, faces):
     with open(filepath, 'w') as data:
         fw = data.write
@@ -221,12 +415,18 @@ def write_stl(filepath="",
        output filepath
 
     faces
-       iterable of tuple of 3 vertex, vertex is tuple of 3 coordinates as float
+       iterable of tuple of 3 vertex, vertex is tuple of 3 coordinates as float,
+       or a (N, 3, 3) numpy array of triangles (binary format only)
 
     ascii
        save the file in ascii format (very huge)
     """
-    (_ascii_write if ascii else _binary_write)(filepath, faces)
+    if ascii:
+        _ascii_write(filepath, faces)
+    elif numpy is not None and isinstance(faces, numpy.ndarray):
+        _binary_write_numpy(filepath, faces)
+    else:
+        _binary_write(filepath, faces)
 
 
 def read_stl(filepath):
@@ -234,7 +434,9 @@ def read_stl(filepath):
     Return the triangles and points of an stl binary file.
 
     Please note that this process can take lot of time if the file is
-    huge (~1m30 for a 1 Go stl file on an quad core i7).
+    huge (~1m30 for a 1 Go stl file on an quad core i7), unless NumPy is
+    available, binary files being then read all at once (and triangles,
+    normals and points being returned as numpy arrays).
 
     - returns a tuple(triangles, triangles' normals, points).
 
@@ -264,7 +466,14 @@ def read_stl(filepath):
 
     with open(filepath, 'rb') as data:
         # check for ascii or binary
-        gen = _ascii_read if _is_ascii_file(data) else _binary_read
+        is_ascii = _is_ascii_file(data)
+
+        if numpy is not None and not is_ascii:
+            tris, tri_nors, pts = _binary_read_numpy(data)
+            print 'Import finished in %.4f sec.' % (time.process_time() - start_time)
+            return tris, tri_nors, pts
+
+        gen = _ascii_read if is_ascii else _binary_read
 
         for nor, pt in gen(data):
             # Add the triangle and the point.
@@ -279,6 +488,58 @@ def read_stl(filepath):
     return tris, tri_nors, pts.list
 
 
+def read_stl_parts(filepath, part_size=0):
+    """
+    Memory-friendly variant of read_stl(), for files too big to be loaded at once.
+
+    Facets are processed chunk by chunk, and points deduplicated with a
+    compact PointTable instead of a ListDict of tuples.
+
+    - yields a tuple(triangles, triangles' normals, points) for each part of
+      at most *part_size* triangles (or a single one for the whole file if 0),
+      points being only shared within a same part.
+
+      triangles
+          A flat array ('i') of point indices, 3 per triangle.
+
+      triangles' normals
+          A flat array ('f') of normals, 3 floats per triangle.
+
+      points
+          A flat array ('f') of points, 3 floats per point.
+    """
+    import time
+    start_time = time.process_time()
+
+    pack = struct.Struct('<3f').pack
+
+    def packed_ascii_read(data):
+        for nor, pt in _ascii_read(data):
+            yield nor, [_pack_point_key(pack(*p)) for p in pt]
+
+    with open(filepath, 'rb') as data:
+        # check for ascii or binary
+        gen = packed_ascii_read if _is_ascii_file(data) else _binary_read_packed
+
+        tris, tri_nors, pts = array.array('i'), array.array('f'), PointTable()
+        nbr_tris = 0
+        for nor, pt in gen(data):
+            add = pts.add
+            tris.extend((add(pt[0]), add(pt[1]), add(pt[2])))
+            tri_nors.extend(nor)
+            nbr_tris += 1
+
+            if nbr_tris == part_size:
+                yield tris, tri_nors, pts.to_array()
+                tris, tri_nors, pts = array.array('i'), array.array('f'), PointTable()
+                nbr_tris = 0
+
+        if nbr_tris:
+            yield tris, tri_nors, pts.to_array()
+
+    print 'Import finished in %.4f sec.' % (time.process_time() - start_time)
+
+
 if __name__ == '__main__':
     import sys
     import bpy
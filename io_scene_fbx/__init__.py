@@ -45,6 +45,7 @@ from bpy.props import (
         StringProperty,
         BoolProperty,
         FloatProperty,
+        IntProperty,
         EnumProperty,
         )
 from bpy_extras.io_utils import (
@@ -187,6 +188,13 @@ class ImportFBX(bpy.types.Operator, ImportHelper, IOFBXOrientationHelper):
             default=True,
             )
 
+    use_lazy_parse = BoolProperty(
+            name="Lazy Parsing",
+            description="Memory-map the file and only decode data when it is needed "
+                        "(faster and lighter on big files, keeps the file open during import)",
+            default=False,
+            )
+
     def draw(self, context):
         layout = self.layout
 
@@ -215,6 +223,8 @@ class ImportFBX(bpy.types.Operator, ImportHelper, IOFBXOrientationHelper):
             layout.prop(self, "decal_offset")
 
             layout.prop(self, "use_prepost_rot")
+
+            layout.prop(self, "use_lazy_parse")
         elif self.ui_tab == 'ARMATURE':
             layout.prop(self, "ignore_leaf_bones")
             layout.prop(self, "force_connect_children"),
@@ -454,6 +464,14 @@ class ExportFBX(bpy.types.Operator, ExportHelper, IOFBXOrientationHelper):
             description="Embed textures in FBX binary file (only for \"Copy\" path mode!)",
             default=False,
             )
+    # 7.4 only
+    compression_level = IntProperty(
+            name="Compression",
+            description="Compression level of arrays data (0 to disable compression, "
+                        "much faster but bigger files, 9 for smallest but slowest files)",
+            min=0, max=9,
+            default=1,
+            )
     batch_mode = EnumProperty(
             name="Batch Mode",
             items=(('OFF', "Off", "Active scene to file"),
@@ -499,6 +517,7 @@ class ExportFBX(bpy.types.Operator, ExportHelper, IOFBXOrientationHelper):
                 sub = row.row(align=True)
                 sub.enabled = (self.path_mode == 'COPY')
                 sub.prop(self, "embed_textures", text="", icon='PACKAGE' if self.embed_textures else 'UGLYPACKAGE')
+                layout.prop(self, "compression_level")
                 row = layout.row(align=True)
                 row.prop(self, "batch_mode")
                 sub = row.row(align=True)
@@ -49,6 +49,57 @@ _FOOT_ID = '\xfa\xbc\xab\x09\xd0\xc8\xd4\x66\xb1\x76\xfb\x83\x1c\xf7\x26\x7e'
 _ELEMS_ID_ALWAYS_BLOCK_SENTINEL = set(["AnimationStack", "AnimationLayer"])
 
 
+# Arrays compression settings, see init_array_compression().
+_compression_level = 1
+_compression_pool = None
+
+
+def init_array_compression(level=1, threads=1):
+    """
+    Set zlib level used to compress arrays (0 disables compression),
+    and the number of threads doing it in the background while elements keep being generated
+    (zlib releases the GIL). Call :func:`free_array_compression` once done.
+    """
+    global _compression_level, _compression_pool
+    free_array_compression()
+
+    _compression_level = level
+    if level > 0 and threads > 1:
+        try:
+            from multiprocessing.pool import ThreadPool
+        except ImportError:
+            ThreadPool = None
+        if ThreadPool is not None:
+            _compression_pool = ThreadPool(threads)
+
+
+def free_array_compression():
+    global _compression_level, _compression_pool
+    if _compression_pool is not None:
+        _compression_pool.close()
+        _compression_pool.join()
+        _compression_pool = None
+    _compression_level = 1
+
+
+def _compress_array(length, data, level):
+    data = zlib.compress(data, level)
+    return pack('<3I', length, 1, len(data)) + data
+
+
+class _PendingArray(object):
+    """
+    Array property being compressed in a worker thread.
+    """
+    __slots__ = ("result",)
+
+    def __init__(self, result):
+        self.result = result
+
+    def get(self):
+        return self.result.get()
+
+
 class FBXElem(object):
     __slots__ = (
         "id",
@@ -145,16 +196,13 @@ class FBXElem(object):
         data = data.tobytes()
 
         # mimic behavior of fbxconverter (also common sense)
-        # we could make this configurable.
-        encoding = 0 if len(data) <= 128 else 1
+        encoding = 0 if (len(data) <= 128 or _compression_level == 0) else 1
         if encoding == 0:
-            pass
-        elif encoding == 1:
-            data = zlib.compress(data, 1)
-
-        comp_len = len(data)
-
-        data = pack('<3I', length, encoding, comp_len) + data
+            data = pack('<3I', length, encoding, len(data)) + data
+        elif _compression_pool is not None:
+            data = _PendingArray(_compression_pool.apply_async(_compress_array, (length, data, _compression_level)))
+        else:
+            data = _compress_array(length, data, _compression_level)
 
         self.props_type.append(prop_type)
         self.props.append(data)
@@ -202,18 +250,26 @@ class FBXElem(object):
         offset += 12  # 3 uints
         offset += 1 + len(self.id)  # len + idname
 
-        props_length = 0
-        for data in self.props:
-            # 1 byte for the prop type
-            props_length += 1 + len(data)
-        self._props_length = props_length
-        offset += props_length
+        offset += self._calc_props_length()
 
         offset = self._calc_offsets_children(offset, is_last)
 
         self._end_offset = offset
         return offset
 
+    def _calc_props_length(self):
+        props = self.props
+        for i, data in enumerate(props):
+            if data.__class__ is _PendingArray:
+                props[i] = data.get()
+
+        props_length = 0
+        for data in props:
+            # 1 byte for the prop type
+            props_length += 1 + len(data)
+        self._props_length = props_length
+        return props_length
+
     def _calc_offsets_children(self, offset, is_last):
         if self.elems:
             elem_last = self.elems[-1]
@@ -230,7 +286,16 @@ class FBXElem(object):
         assert(self._end_offset != -1)
         assert(self._props_length != -1)
 
-        write(pack('<3I', self._end_offset, len(self.props), self._props_length))
+        self._write_head(write, self._end_offset)
+
+        self._write_children(write, tell, is_last)
+
+        if tell() != self._end_offset:
+            raise IOError("scope length not reached, "
+                          "something is wrong (%d)" % (end_offset - tell()))
+
+    def _write_head(self, write, end_offset):
+        write(pack('<3I', end_offset, len(self.props), self._props_length))
 
         write(str((len(self.id),)))
         write(self.id)
@@ -239,12 +304,6 @@ class FBXElem(object):
             write(str((self.props_type[i],)))
             write(data)
 
-        self._write_children(write, tell, is_last)
-
-        if tell() != self._end_offset:
-            raise IOError("scope length not reached, "
-                          "something is wrong (%d)" % (end_offset - tell()))
-
     def _write_children(self, write, tell, is_last):
         if self.elems:
             elem_last = self.elems[-1]
@@ -257,6 +316,27 @@ class FBXElem(object):
                 write(_BLOCK_SENTINEL_DATA)
 
 
+def _write_timedate_hack_elem(elem):
+    # set the FileID or the CreationTime, return True when elem is one of those.
+    if elem.id == 'FileId':
+        assert(elem.props_type[0] == 'R'[0])
+        assert(len(elem.props_type) == 1)
+        elem.props.clear()
+        elem.props_type.clear()
+
+        elem.add_bytes(_FILE_ID)
+        return True
+    elif elem.id == 'CreationTime':
+        assert(elem.props_type[0] == 'S'[0])
+        assert(len(elem.props_type) == 1)
+        elem.props.clear()
+        elem.props_type.clear()
+
+        elem.add_string(_TIME_ID)
+        return True
+    return False
+
+
 def _write_timedate_hack(elem_root):
     # perform 2 changes
     # - set the FileID
@@ -264,21 +344,7 @@ def _write_timedate_hack(elem_root):
 
     ok = 0
     for elem in elem_root.elems:
-        if elem.id == 'FileId':
-            assert(elem.props_type[0] == 'R'[0])
-            assert(len(elem.props_type) == 1)
-            elem.props.clear()
-            elem.props_type.clear()
-
-            elem.add_bytes(_FILE_ID)
-            ok += 1
-        elif elem.id == 'CreationTime':
-            assert(elem.props_type[0] == 'S'[0])
-            assert(len(elem.props_type) == 1)
-            elem.props.clear()
-            elem.props_type.clear()
-
-            elem.add_string(_TIME_ID)
+        if _write_timedate_hack_elem(elem):
             ok += 1
 
         if ok == 2:
@@ -288,6 +354,161 @@ def _write_timedate_hack(elem_root):
         print "Missing fields!"
 
 
+def _write_footer(write, tell, version):
+    write(_FOOT_ID)
+    write('\x00' * 4)
+
+    # padding for alignment (values between 1 & 16 observed)
+    # if already aligned to 16, add a full 16 bytes padding.
+    ofs = tell()
+    pad = ((ofs + 15) & ~15) - ofs
+    if pad == 0:
+        pad = 16
+
+    write('\0' * pad)
+
+    write(pack('<I', version))
+
+    # unknown magic (always the same)
+    write('\0' * 120)
+    write('\xf8\x5a\x8c\x6a\xde\xf5\xd9\x7e\xec\xe9\x0c\xe3\x75\x8f\x29\x0b')
+
+
+class FBXStreamWriter(object):
+    """
+    Write a binary FBX file while its elements are being generated,
+    instead of building the whole tree in memory first (see :func:`write`).
+
+    Elements added to ``root`` (or to an element opened with :meth:`begin`) are written
+    and released on each :meth:`flush`. Opened elements get their end offset back-patched
+    once they are closed with :meth:`end`.
+
+    The output is identical to the one of :func:`write`.
+    """
+    __slots__ = (
+        "root",
+        "_file",
+        "_version",
+        "_scopes",  # [elem, head_offset, pending_child] of elements whose children are being streamed.
+        "_timedate_ok",
+        )
+
+    def __init__(self, fn, version):
+        self.root = FBXElem('')  # Root element has no id, as it is not saved per se!
+        self._file = open(fn, 'wb')
+        self._version = version
+        self._scopes = [[self.root, -1, None]]
+        self._timedate_ok = 0
+
+        self._file.write(_HEAD_MAGIC)
+        self._file.write(pack('<I', version))
+
+    def _write_elem(self, elem, is_last):
+        f = self._file
+        if len(self._scopes) == 1:
+            # hack since we don't decode time.
+            # ideally we would _not_ modify this data.
+            if self._timedate_ok != 2 and _write_timedate_hack_elem(elem):
+                self._timedate_ok += 1
+        elem._calc_offsets(f.tell(), is_last)
+        elem._write(f.write, f.tell, is_last)
+
+    def flush(self):
+        """
+        Write children added to the current element so far.
+
+        The last one is kept until we know whether it is the last child of its parent.
+        """
+        scope = self._scopes[-1]
+        elems = scope[0].elems
+        if not elems:
+            return
+        pending = scope[2]
+        for elem in elems:
+            assert(elem.id != '')
+            if pending is not None:
+                self._write_elem(pending, False)
+            pending = elem
+        scope[2] = pending
+        del elems[:]
+
+    def begin(self, elem):
+        """
+        Start streaming children of elem, which must be the last child added to the current element
+        and have all its properties set.
+        """
+        parent = self._scopes[-1][0]
+        assert(parent.elems and parent.elems[-1] is elem and not elem.elems)
+        del parent.elems[-1]
+        self.flush()
+
+        scope = self._scopes[-1]
+        if scope[2] is not None:
+            self._write_elem(scope[2], False)
+            scope[2] = None
+
+        f = self._file
+        head_offset = f.tell()
+        elem._calc_props_length()
+        elem._write_head(f.write, 0)  # end offset is back-patched in end().
+        self._scopes.append([elem, head_offset, None])
+
+    def end(self, elem):
+        """
+        Finish streaming children of elem (see :meth:`begin`).
+        """
+        self.flush()
+        elem_scope, head_offset, pending = self._scopes.pop()
+        assert(elem_scope is elem)
+
+        f = self._file
+        if pending is None:
+            # No children at all, write it again later as a regular element,
+            # since its trailing sentinel depends on whether it is the last one.
+            f.seek(head_offset)
+            f.truncate()
+            elem._props_length = -1
+            self._scopes[-1][0].elems.append(elem)
+            return
+
+        self._write_elem(pending, True)
+        f.write(_BLOCK_SENTINEL_DATA)
+
+        end_offset = f.tell()
+        f.seek(head_offset)
+        f.write(pack('<I', end_offset))
+        f.seek(end_offset)
+
+    def close(self):
+        """
+        Write remaining elements and the footer, and close the file.
+        """
+        assert(len(self._scopes) == 1)
+        self.flush()
+
+        f = self._file
+        pending = self._scopes[0][2]
+        if pending is not None:
+            self._write_elem(pending, True)
+        self._scopes[0][2] = None
+        f.write(_BLOCK_SENTINEL_DATA)
+
+        if self._timedate_ok != 2:
+            print "Missing fields!"
+
+        _write_footer(f.write, f.tell, self._version)
+        f.close()
+
+    def abort(self):
+        """
+        Close and remove the (incomplete) file.
+        """
+        import os
+
+        self._file.close()
+        os.remove(self._file.name)
+
+
 def write(fn, elem_root, version):
     assert(elem_root.id == '')
 
@@ -305,20 +526,4 @@ def write(fn, elem_root, version):
         elem_root._calc_offsets_children(tell(), False)
         elem_root._write_children(write, tell, False)
 
-        write(_FOOT_ID)
-        write('\x00' * 4)
-
-        # padding for alignment (values between 1 & 16 observed)
-        # if already aligned to 16, add a full 16 bytes padding.
-        ofs = tell()
-        pad = ((ofs + 15) & ~15) - ofs
-        if pad == 0:
-            pad = 16
-
-        write('\0' * pad)
-
-        write(pack('<I', version))
-
-        # unknown magic (always the same)
-        write('\0' * 120)
-        write('\xf8\x5a\x8c\x6a\xde\xf5\xd9\x7e\xec\xe9\x0c\xe3\x75\x8f\x29\x0b')
+        _write_footer(write, tell, version)
@@ -1621,9 +1621,10 @@ def fbx_data_object_elements(root, ob_obj, scene_data):
     elem_props_template_finalize(tmpl, props)
 
 
-def fbx_data_animation_elements(root, scene_data):
+def fbx_data_animation_elements(root, scene_data, stream=None):
     """
     Write animation data.
+    If stream (an encode_bin.FBXStreamWriter) is given, curves are flushed to the file as soon as they are complete.
     """
     animations = scene_data.animations
     if not animations:
@@ -1706,6 +1707,8 @@ def fbx_data_animation_elements(root, scene_data):
                         elem_data_single_int32_array(acurve, "KeyAttrRefCount", (nbr_keys,))
 
                 elem_props_template_finalize(acn_tmpl, acn_props)
+                if stream is not None:
+                    stream.flush()
 
 
 # ##### Top-level FBX data container. #####
@@ -2735,28 +2738,39 @@ def fbx_definitions_elements(root, scene_data):
     fbx_templates_generate(definitions, scene_data.templates)
 
 
-def fbx_objects_elements(root, scene_data):
+def fbx_objects_elements(root, scene_data, stream=None):
     """
     Data (objects, geometry, material, textures, armatures, etc.).
+    If stream (an encode_bin.FBXStreamWriter) is given, each object is written as soon as it is generated.
     """
     perfmon = PerfMon()
     perfmon.level_up()
     objects = elem_empty(root, "Objects")
 
+    if stream is not None:
+        stream.begin(objects)
+        flush = stream.flush
+    else:
+        def flush():
+            pass
+
     perfmon.step("FBX export fetch empties (%d)..." % len(scene_data.data_empties))
 
     for empty in scene_data.data_empties:
         fbx_data_empty_elements(objects, empty, scene_data)
+        flush()
 
     perfmon.step("FBX export fetch lamps (%d)..." % len(scene_data.data_lamps))
 
     for lamp in scene_data.data_lamps:
         fbx_data_lamp_elements(objects, lamp, scene_data)
+        flush()
 
     perfmon.step("FBX export fetch cameras (%d)..." % len(scene_data.data_cameras))
 
     for cam in scene_data.data_cameras:
         fbx_data_camera_elements(objects, cam, scene_data)
+        flush()
 
     perfmon.step("FBX export fetch meshes (%d)..."
                  % len(set(me_key for me_key, _me, _free in scene_data.data_meshes.values())))
@@ -2764,6 +2778,7 @@ def fbx_objects_elements(root, scene_data):
     done_meshes = set()
     for me_obj in scene_data.data_meshes:
         fbx_data_mesh_elements(objects, me_obj, scene_data, done_meshes)
+        flush()
     del done_meshes
 
     perfmon.step("FBX export fetch objects (%d)..." % len(scene_data.objects))
@@ -2778,6 +2793,7 @@ def fbx_objects_elements(root, scene_data):
                 continue
             fbx_data_object_elements(objects, dp_obj, scene_data)
         ob_obj.dupli_list_clear()
+        flush()
 
     perfmon.step("FBX export fetch remaining...")
 
@@ -2785,23 +2801,30 @@ def fbx_objects_elements(root, scene_data):
         if not (ob_obj.is_object and ob_obj.type == 'ARMATURE'):
             continue
         fbx_data_armature_elements(objects, ob_obj, scene_data)
+        flush()
 
     if scene_data.data_leaf_bones:
         fbx_data_leaf_bone_elements(objects, scene_data)
 
     for mat in scene_data.data_materials:
         fbx_data_material_elements(objects, mat, scene_data)
+        flush()
 
     for tex in scene_data.data_textures:
         fbx_data_texture_file_elements(objects, tex, scene_data)
+        flush()
 
     for vid in scene_data.data_videos:
         fbx_data_video_elements(objects, vid, scene_data)
+        flush()
 
     perfmon.step("FBX export fetch animations...")
     start_time = time.process_time()
 
-    fbx_data_animation_elements(objects, scene_data)
+    fbx_data_animation_elements(objects, scene_data, stream)
+
+    if stream is not None:
+        stream.end(objects)
 
     perfmon.level_down()
 
@@ -2869,6 +2892,7 @@ def save_single(operator, scene, filepath="",
                 embed_textures=False,
                 use_custom_props=False,
                 bake_space_transform=False,
+                compression_level=1,
                 **kwargs
                 ):
 
@@ -2935,32 +2959,51 @@ def save_single(operator, scene, filepath="",
     # Generate some data about exported scene...
     scene_data = fbx_data_from_scene(scene, settings)
 
-    root = elem_empty(None, "")  # Root element has no id, as it is not saved per se!
-
-    # Mostly FBXHeaderExtension and GlobalSettings.
-    fbx_header_elements(root, scene_data)
-
-    # Documents and References are pretty much void currently.
-    fbx_documents_elements(root, scene_data)
-    fbx_references_elements(root, scene_data)
-
-    # Templates definitions.
-    fbx_definitions_elements(root, scene_data)
-
-    # Actual data.
-    fbx_objects_elements(root, scene_data)
-
-    # How data are inter-connected.
-    fbx_connections_elements(root, scene_data)
-
-    # Animation.
-    fbx_takes_elements(root, scene_data)
-
-    # Cleanup!
-    fbx_scene_data_cleanup(scene_data)
-
-    # And we are down, we can write the whole thing!
-    encode_bin.write(filepath, root, FBX_VERSION)
+    # Write the file while we generate it, each section (and each object) being released once written,
+    # so that we never have to keep the whole (packed and compressed) data in memory.
+    # Arrays get compressed in the background while we keep generating the scene's data.
+    import multiprocessing
+    try:
+        compression_threads = multiprocessing.cpu_count()
+    except NotImplementedError:
+        compression_threads = 1
+    encode_bin.init_array_compression(compression_level, compression_threads)
+
+    stream = encode_bin.FBXStreamWriter(filepath, FBX_VERSION)
+    try:
+        root = stream.root
+
+        # Mostly FBXHeaderExtension and GlobalSettings.
+        fbx_header_elements(root, scene_data)
+
+        # Documents and References are pretty much void currently.
+        fbx_documents_elements(root, scene_data)
+        fbx_references_elements(root, scene_data)
+
+        # Templates definitions.
+        fbx_definitions_elements(root, scene_data)
+        stream.flush()
+
+        # Actual data.
+        fbx_objects_elements(root, scene_data, stream)
+
+        # How data are inter-connected.
+        fbx_connections_elements(root, scene_data)
+        stream.flush()
+
+        # Animation.
+        fbx_takes_elements(root, scene_data)
+
+        # Cleanup!
+        fbx_scene_data_cleanup(scene_data)
+
+        # And we are done, we can write the remaining of the file!
+        stream.close()
+    except:
+        stream.abort()
+        raise
+    finally:
+        encode_bin.free_array_compression()
 
     # Clear cached ObjectWrappers!
     ObjectWrapper.cache_clear()
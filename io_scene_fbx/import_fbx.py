@@ -2209,7 +2209,9 @@ def load(operator, context, filepath="",
          automatic_bone_orientation=False,
          primary_bone_axis='Y',
          secondary_bone_axis='X',
-         use_prepost_rot=True):
+         use_prepost_rot=True,
+         use_lazy_parse=False,
+         decompress_threads=0):
 
     global fbx_elem_nil
     fbx_elem_nil = FBXElem('', (), (), ())
@@ -2234,8 +2236,15 @@ def load(operator, context, filepath="",
         operator.report(set(['ERROR']), "ASCII FBX files are not supported %r" % filepath)
         return set(['CANCELLED'])
 
+    if decompress_threads <= 0:
+        import multiprocessing
+        try:
+            decompress_threads = multiprocessing.cpu_count()
+        except NotImplementedError:
+            decompress_threads = 1
+
     try:
-        elem_root, version = parse_fbx.parse(filepath)
+        elem_root, version = parse_fbx.parse(filepath, use_mmap=use_lazy_parse, threads=decompress_threads)
     except:
         import traceback
         traceback.print_exc()
@@ -26,13 +26,15 @@ from __future__ import absolute_import
 from io import open
 __all__ = (
     "parse",
+    "parse_mmap",
     "data_types",
     "parse_version",
     "FBXElem",
     )
 
-from struct import unpack
+from struct import unpack, unpack_from
 import array
+import mmap
 import zlib
 
 from . import data_types
@@ -101,7 +103,307 @@ read_data_dict = {
     }
 
 
-def read_elem(read, tell, use_namedtuple):
+# -----------------------------------------------------------------------------
+# Memory-mapped (lazy) parsing
+#
+# Instead of reading each property with its own 'f.read()' call,
+# the whole file is mapped and elements are decoded from byte offsets.
+# Array properties (vertices, polygon indices, animation keys...) are only
+# recorded by offset, and get decompressed the first time they are accessed.
+# Children of an element are only decoded when its 'elems' list is first used.
+
+class _LazyArray(object):
+    """
+    Placeholder for an array property which hasn't been decoded yet.
+    """
+    __slots__ = (
+        "offset",  # offset of the array header (length, encoding, comp_len).
+        "data_type",
+        )
+
+    def __init__(self, offset, data_type):
+        self.offset = offset
+        self.data_type = data_type
+
+    def __repr__(self):
+        return "<FBX lazy array '%s' at %d>" % (self.data_type, self.offset)
+
+
+_array_spec_dict = {
+    'f'[0]: (data_types.ARRAY_FLOAT32, 4, False),  # array (float)
+    'i'[0]: (data_types.ARRAY_INT32, 4, True),     # array (int)
+    'd'[0]: (data_types.ARRAY_FLOAT64, 8, False),  # array (double)
+    'l'[0]: (data_types.ARRAY_INT64, 8, True),     # array (long)
+    'b'[0]: (data_types.ARRAY_BOOL, 1, False),     # array (bool)
+    'c'[0]: (data_types.ARRAY_BYTE, 1, False),     # array (ubyte)
+    }
+
+
+def unpack_array_from(buf, offset, array_type, array_stride, array_byteswap):
+    """
+    Same as :func:`unpack_array`, reading from a buffer at a given offset.
+    """
+    length, encoding, comp_len = unpack_from('<3I', buf, offset)
+    offset += 12
+
+    data = buf[offset:offset + comp_len]
+
+    if encoding == 0:
+        pass
+    elif encoding == 1:
+        data = zlib.decompress(data)
+
+    return _array_from_data(data, length, array_type, array_stride, array_byteswap)
+
+
+class _LazyProps(list):
+    """
+    Properties list, decoding array properties from the mapped file on first access.
+
+    Decoded arrays replace their placeholder, so they are only decompressed once.
+    """
+    __slots__ = ("_buf",)
+
+    def __init__(self, buf, props):
+        list.__init__(self, props)
+        self._buf = buf
+
+    def _resolve(self, index):
+        data = list.__getitem__(self, index)
+        if data.__class__ is _LazyArray:
+            data = unpack_array_from(self._buf, data.offset, *_array_spec_dict[data.data_type])
+            list.__setitem__(self, index, data)
+        return data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._resolve(i) for i in xrange(*index.indices(len(self)))]
+        return self._resolve(index)
+
+    def __getslice__(self, i, j):
+        # Python 2 still uses this for simple slices of list subclasses.
+        return self.__getitem__(slice(i, j))
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self._resolve(i)
+
+    def __reversed__(self):
+        for i in xrange(len(self) - 1, -1, -1):
+            yield self._resolve(i)
+
+    def __contains__(self, value):
+        return any(data == value for data in self)
+
+    def __eq__(self, other):
+        return list(self) == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class _LazyElems(list):
+    """
+    Children list, only decoded from the mapped file when first used.
+    """
+    __slots__ = (
+        "_buf",
+        "_offset",
+        "_end_offset",
+        "_use_namedtuple",
+        )
+
+    def __init__(self, buf, offset, end_offset, use_namedtuple):
+        list.__init__(self)
+        self._buf = buf
+        self._offset = offset
+        self._end_offset = end_offset
+        self._use_namedtuple = use_namedtuple
+
+    def _ensure(self):
+        buf = self._buf
+        if buf is None:
+            return
+
+        offset = self._offset
+        end_offset = self._end_offset
+        elems = []
+        while offset < (end_offset - _BLOCK_SENTINEL_LENGTH):
+            elem, offset = read_elem_from(buf, offset, self._use_namedtuple)
+            elems.append(elem)
+
+        if buf[offset:offset + _BLOCK_SENTINEL_LENGTH] != _BLOCK_SENTINEL_DATA:
+            raise IOError("failed to read nested block sentinel, "
+                          "expected all bytes to be 0")
+        if offset + _BLOCK_SENTINEL_LENGTH != end_offset:
+            raise IOError("scope length not reached, something is wrong")
+
+        list.extend(self, elems)
+        self._buf = None
+
+    def __nonzero__(self):
+        self._ensure()
+        return list.__len__(self) != 0
+    __bool__ = __nonzero__
+
+
+def _lazy_elems_method(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args):
+        self._ensure()
+        return method(self, *args)
+    wrapper.__name__ = name
+    return wrapper
+
+for _name in ("__getitem__", "__getslice__", "__iter__", "__reversed__", "__len__",
+              "__contains__", "__eq__", "__ne__", "__repr__",
+              "__setitem__", "__delitem__", "__iadd__",
+              "append", "extend", "insert", "pop", "remove",
+              "index", "count", "sort", "reverse"):
+    if hasattr(list, _name):
+        setattr(_LazyElems, _name, _lazy_elems_method(_name))
+del _name
+
+
+def read_elem_from(buf, offset, use_namedtuple):
+    """
+    Decode the element starting at offset in the mapped file.
+
+    Returns (elem, offset_after_elem), elem being None for the NULL record.
+    """
+    # [0] the offset at which this block ends
+    # [1] the number of properties in the scope
+    # [2] the length of the property list
+    end_offset, prop_count, prop_length = unpack_from('<3I', buf, offset)
+    if end_offset == 0:
+        return None, offset + 12
+    offset += 12
+
+    elem_id_len = unpack_from('B', buf, offset)[0]
+    offset += 1
+    elem_id = buf[offset:offset + elem_id_len]  # elem name of the scope/key
+    offset += elem_id_len
+    elem_props_type = bytearray(prop_count)  # elem property types
+    elem_props_data = [None] * prop_count    # elem properties (if any)
+    has_arrays = False
+
+    for i in xrange(prop_count):
+        data_type = buf[offset]
+        offset += 1
+        if data_type in _array_spec_dict:
+            # Only keep the location of array data, skipping the payload.
+            elem_props_data[i] = _LazyArray(offset, data_type)
+            offset += 12 + unpack_from('<I', buf, offset + 8)[0]
+            has_arrays = True
+        elif data_type in _read_fixed_dict:
+            fmt, size = _read_fixed_dict[data_type]
+            elem_props_data[i] = unpack_from(fmt, buf, offset)[0]
+            offset += size
+        else:  # 'R', 'S'
+            size = unpack_from('<I', buf, offset)[0]
+            offset += 4
+            elem_props_data[i] = buf[offset:offset + size]
+            offset += size
+        elem_props_type[i] = data_type
+
+    if has_arrays:
+        elem_props_data = _LazyProps(buf, elem_props_data)
+
+    if offset < end_offset:
+        elem_subtree = _LazyElems(buf, offset, end_offset, use_namedtuple)
+    elif offset == end_offset:
+        elem_subtree = []
+    else:
+        raise IOError("scope length not reached, something is wrong")
+
+    args = (elem_id, elem_props_data, elem_props_type, elem_subtree)
+    return (FBXElem(*args) if use_namedtuple else args), end_offset
+
+
+_read_fixed_dict = {
+    'Y'[0]: ('<h', 2),  # 16 bit int
+    'C'[0]: ('?', 1),   # 1 bit bool (yes/no)
+    'I'[0]: ('<i', 4),  # 32 bit int
+    'F'[0]: ('<f', 4),  # 32 bit float
+    'D'[0]: ('<d', 8),  # 64 bit float
+    'L'[0]: ('<q', 8),  # 64 bit int
+    }
+
+
+# -----------------------------------------------------------------------------
+# Threaded decompression
+#
+# zlib releases the GIL while (de)compressing, so instead of inflating arrays
+# one after the other while walking the file, their compressed payload is
+# collected and they get decompressed afterwards on a pool of threads.
+
+def read_array_deferred(read, data_type, props, index, arrays_pending):
+    """
+    Read an array property, deferring its decompression.
+
+    Uncompressed arrays are returned directly, compressed ones are queued in arrays_pending
+    (None is returned, the slot is filled by :func:`decompress_arrays`).
+    """
+    length = read_uint(read)
+    encoding = read_uint(read)
+    comp_len = read_uint(read)
+
+    data = read(comp_len)
+
+    if encoding == 0:
+        return _array_from_data(data, length, *_array_spec_dict[data_type])
+
+    arrays_pending.append((props, index, data_type, length, data))
+    return None
+
+
+def _array_from_data(data, length, array_type, array_stride, array_byteswap):
+    assert(length * array_stride == len(data))
+
+    data_array = array.array(array_type, data)
+    if array_byteswap and _IS_BIG_ENDIAN:
+        data_array.byteswap()
+    return data_array
+
+
+def _decompress_array(item):
+    props, index, data_type, length, data = item
+    props[index] = _array_from_data(zlib.decompress(data), length, *_array_spec_dict[data_type])
+
+
+def decompress_arrays(arrays_pending, threads):
+    """
+    Decompress arrays queued by :func:`read_array_deferred`, using up to threads workers.
+    """
+    if threads > 1 and len(arrays_pending) > 1:
+        try:
+            from multiprocessing.pool import ThreadPool
+        except ImportError:
+            ThreadPool = None
+
+        if ThreadPool is not None:
+            pool = ThreadPool(min(threads, len(arrays_pending)))
+            try:
+                # Bigger arrays first, so that the last ones to finish are the small ones.
+                arrays_pending.sort(key=lambda item: len(item[4]), reverse=True)
+                pool.map(_decompress_array, arrays_pending, 1)
+            finally:
+                pool.close()
+                pool.join()
+            del arrays_pending[:]
+            return
+
+    # Serial fallback.
+    for item in arrays_pending:
+        _decompress_array(item)
+    del arrays_pending[:]
+
+
+def read_elem(read, tell, use_namedtuple, arrays_pending=None):
     # [0] the offset at which this block ends
     # [1] the number of properties in the scope
     # [2] the length of the property list
@@ -119,12 +421,15 @@ def read_elem(read, tell, use_namedtuple):
 
     for i in xrange(prop_count):
         data_type = read(1)[0]
-        elem_props_data[i] = read_data_dict[data_type](read)
+        if arrays_pending is not None and data_type in _array_spec_dict:
+            elem_props_data[i] = read_array_deferred(read, data_type, elem_props_data, i, arrays_pending)
+        else:
+            elem_props_data[i] = read_data_dict[data_type](read)
         elem_props_type[i] = data_type
 
     if tell() < end_offset:
         while tell() < (end_offset - _BLOCK_SENTINEL_LENGTH):
-            elem_subtree.append(read_elem(read, tell, use_namedtuple))
+            elem_subtree.append(read_elem(read, tell, use_namedtuple, arrays_pending))
 
         if read(_BLOCK_SENTINEL_LENGTH) != _BLOCK_SENTINEL_DATA:
             raise IOError("failed to read nested block sentinel, "
@@ -151,8 +456,51 @@ def parse_version(fn):
         return read_uint(read)
 
 
-def parse(fn, use_namedtuple=True):
+def parse_mmap(fn, use_namedtuple=True):
+    """
+    Like :func:`parse`, but backed by a memory-mapped file.
+
+    Only the top level elements are decoded up-front; children and array properties
+    are decoded on first access, so pulling out e.g. the 'Objects' and 'Connections'
+    tables of a large file only costs a fraction of a full parse.
+
+    The mapping stays alive for as long as some element refers to it.
+    """
+    root_elems = []
+
+    with open(fn, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buf[:len(_HEAD_MAGIC)] != _HEAD_MAGIC:
+        raise IOError("Invalid header")
+    offset = len(_HEAD_MAGIC)
+
+    fbx_version = unpack_from('<I', buf, offset)[0]
+    offset += 4
+
+    while True:
+        elem, offset = read_elem_from(buf, offset, use_namedtuple)
+        if elem is None:
+            break
+        root_elems.append(elem)
+
+    args = ('', [], bytearray(0), root_elems)
+    return FBXElem(*args) if use_namedtuple else args, fbx_version
+
+
+def parse(fn, use_namedtuple=True, use_mmap=False, threads=1):
+    """
+    Parse a binary FBX file, returning (elem_root, fbx_version).
+
+    :arg use_mmap: Use :func:`parse_mmap`, decoding data lazily.
+    :arg threads: Number of threads used to decompress arrays (values below 2 decompress them
+       serially while reading). Ignored when use_mmap is enabled, since arrays are decoded on access.
+    """
+    if use_mmap:
+        return parse_mmap(fn, use_namedtuple)
+
     root_elems = []
+    arrays_pending = [] if threads > 1 else None
 
     with open(fn, 'rb') as f:
         read = f.read
@@ -164,10 +512,13 @@ def parse(fn, use_namedtuple=True):
         fbx_version = read_uint(read)
 
         while True:
-            elem = read_elem(read, tell, use_namedtuple)
+            elem = read_elem(read, tell, use_namedtuple, arrays_pending)
             if elem is None:
                 break
             root_elems.append(elem)
 
+    if arrays_pending:
+        decompress_arrays(arrays_pending, threads)
+
     args = ('', [], bytearray(0), root_elems)
     return FBXElem(*args) if use_namedtuple else args, fbx_version
@@ -43,6 +43,7 @@ import bpy
 from bpy.props import (
         BoolProperty,
         FloatProperty,
+        IntProperty,
         StringProperty,
         EnumProperty,
         )
@@ -105,6 +106,20 @@ class ImportOBJ(bpy.types.Operator, ImportHelper, IOOBJOrientationHelper):
             default=True,
             )
 
+    use_fast_parse = BoolProperty(
+            name="Fast Parser",
+            description="Parse geometry in bulk, much faster on big files "
+                        "(curves and surfaces use the regular parser)",
+            default=False,
+            )
+    parse_processes = IntProperty(
+            name="Processes",
+            description="Number of processes parsing parts of the file "
+                        "at the same time, with the fast parser",
+            min=1, max=64,
+            default=1,
+            )
+
     split_mode = EnumProperty(
             name="Split",
             items=(('ON', "Split", "Split geometry, omits unused verts"),
@@ -173,6 +188,12 @@ class ImportOBJ(bpy.types.Operator, ImportHelper, IOOBJOrientationHelper):
 
         layout.prop(self, "use_image_search")
 
+        row = layout.row(align=True)
+        row.prop(self, "use_fast_parse")
+        sub = row.row(align=True)
+        sub.active = self.use_fast_parse
+        sub.prop(self, "parse_processes")
+
 
 class ExportOBJ(bpy.types.Operator, ExportHelper, IOOBJOrientationHelper):
     """Save a Wavefront OBJ File"""
@@ -285,6 +306,13 @@ class ExportOBJ(bpy.types.Operator, ExportHelper, IOOBJOrientationHelper):
 
     path_mode = path_reference_mode
 
+    processes = IntProperty(
+            name="Processes",
+            description="Number of processes formatting the geometry of objects in parallel",
+            min=1, max=64,
+            default=1,
+            )
+
     check_extension = True
 
     def execute(self, context):
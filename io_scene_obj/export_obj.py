@@ -18,6 +18,7 @@
 
 # <pep8 compliant>
 
+import array
 import os
 
 import bpy
@@ -25,8 +26,14 @@ import mathutils
 import bpy_extras.io_utils
 
 from progress_report import ProgressReport, ProgressReportSubstep
+from array_utils import gather, unique_indices
 from io import open
-from itertools import izip
+from itertools import izip, chain, compress, repeat
+
+# lines formatted at once, keeps the formatting arguments to a reasonable size
+BLOCK_SIZE = 16 * 1024
+# characters copied at once from the temporary files of parallel formatting
+COPY_SIZE = 1024 * 1024
 
 
 def name_compat(name):
@@ -36,6 +43,199 @@ def name_compat(name):
         return name.replace(' ', '_')
 
 
+def write_lines(fw, line_fmt, values, size):
+    """Write lines of size values each, formatting blocks of lines at once."""
+    step = BLOCK_SIZE * size
+    for i in xrange(0, len(values), step):
+        block = values[i:i + step]
+        fw(line_fmt * (len(block) // size) % tuple(block))
+
+
+class FaceBlock(object):
+    """
+    Face lines waiting to be written, formatted all at once when flushed.
+    corner_values are the indices of all corners (size values each), in the order faces are added.
+    """
+    __slots__ = ("chunk", "face_fmts", "corner_values", "size", "faces", "start")
+
+    def __init__(self, chunk, face_fmts, corner_values, size):
+        self.chunk = chunk
+        self.face_fmts = face_fmts  # number of corners -> format of the face line
+        self.corner_values = corner_values
+        self.size = size
+        self.faces = []  # number of corners of the pending faces
+        self.start = 0  # first value of the pending faces
+
+    def add(self, total):
+        self.faces.append(total)
+        if len(self.faces) >= BLOCK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.faces:
+            return
+        end = self.start + sum(self.faces) * self.size
+        self.chunk.faces(self.face_fmts, self.faces, self.corner_values[self.start:end])
+        self.faces = []
+        self.start = end
+
+
+CHUNK_TEXT, CHUNK_LINES, CHUNK_FACES = xrange(3)
+
+
+class GeometryChunk(object):
+    """
+    Geometry of one object, kept as the values of its lines until formatted.
+    Indices are already global to the file, so chunks can be formatted in any order
+    (and any process) as long as they are written in order.
+    """
+    __slots__ = ("ops",)
+
+    def __init__(self, ops=None):
+        self.ops = ops if ops is not None else []
+
+    def write(self, text):
+        ops = self.ops
+        if ops and ops[-1][0] == CHUNK_TEXT:
+            ops[-1][1].append(text)
+        else:
+            ops.append((CHUNK_TEXT, [text]))
+
+    def lines(self, line_fmt, values, size):
+        if len(values):
+            self.ops.append((CHUNK_LINES, line_fmt, values, size))
+
+    def faces(self, face_fmts, totals, values):
+        self.ops.append((CHUNK_FACES, face_fmts, values, totals))
+
+    def format(self, fw):
+        for op in self.ops:
+            if op[0] == CHUNK_TEXT:
+                fw(''.join(op[1]))
+            elif op[0] == CHUNK_LINES:
+                write_lines(fw, op[1], op[2], op[3])
+            else:
+                kind, face_fmts, values, totals = op
+                fw(''.join(map(face_fmts.__getitem__, totals)) % tuple(values))
+
+    def pack(self):
+        """The ops with their values as strings, much faster to send to another process."""
+        packed = []
+        for op in self.ops:
+            if op[0] == CHUNK_TEXT:
+                packed.append(op)
+            else:
+                kind, fmt, values, extra = op
+                if isinstance(values, array.array):
+                    typecode = values.typecode
+                else:
+                    typecode = 'd' if values and isinstance(values[0], float) else 'i'
+                    values = array.array(typecode, values)
+                if kind == CHUNK_FACES:
+                    extra = array.array('i', extra).tostring()
+                packed.append((kind, fmt, typecode, values.tostring(), extra))
+        return packed
+
+    @classmethod
+    def unpack(cls, packed):
+        ops = []
+        for op in packed:
+            if op[0] == CHUNK_TEXT:
+                ops.append(op)
+            else:
+                kind, fmt, typecode, values, extra = op
+                values = array.array(typecode, values)
+                if kind == CHUNK_FACES:
+                    extra = array.array('i', extra)
+                ops.append((kind, fmt, values, extra))
+        return cls(ops)
+
+
+def format_chunk_file(args):
+    """Format a packed chunk to the file at path, run by the processes of a GeometryWriter."""
+    packed, path = args
+    with open(path, "w", encoding="utf8", newline="\n") as f:
+        GeometryChunk.unpack(packed).format(f.write)
+    return path
+
+
+class GeometryWriter(object):
+    """
+    Writes the chunks of geometry to the file in the order they are added.
+    With more than one process, chunks are formatted by a pool of processes in temporary files,
+    which are then appended to the file in order.
+    """
+    def __init__(self, fw, processes=1):
+        self.fw = fw
+        self.chunk = None
+        self.pool = None
+        if processes > 1:
+            import multiprocessing
+            import tempfile
+            from collections import deque
+            self.temp_dir = tempfile.mkdtemp(prefix="export_obj_")
+            self.pool = multiprocessing.Pool(processes)
+            self.pending = deque()  # results of the chunks being formatted, in order
+            self.max_pending = processes * 2  # bounds the memory used by formatted chunks
+            self.count = 0
+
+    def new_chunk(self):
+        """Start the geometry of the next object, the previous one is done."""
+        self._submit()
+        self.chunk = GeometryChunk()
+        return self.chunk
+
+    def _submit(self):
+        chunk, self.chunk = self.chunk, None
+        if not chunk or not chunk.ops:
+            return
+        if self.pool is None:
+            chunk.format(self.fw)
+            return
+
+        path = os.path.join(self.temp_dir, "%d.obj" % self.count)
+        self.count += 1
+        self.pending.append(self.pool.apply_async(format_chunk_file, ((chunk.pack(), path),)))
+        while len(self.pending) > self.max_pending:
+            self._write_pending()
+
+    def _write_pending(self):
+        path = self.pending.popleft().get()
+        with open(path, "r", encoding="utf8", newline="\n") as f:
+            while True:
+                data = f.read(COPY_SIZE)
+                if not data:
+                    break
+                self.fw(data)
+        os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def close(self):
+        """Write the remaining chunks, then stop the processes."""
+        try:
+            self._submit()
+            while self.pool is not None and self.pending:
+                self._write_pending()
+        finally:
+            self.terminate()
+
+    def terminate(self):
+        if self.pool is not None:
+            import shutil
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
 def mesh_triangulate(me):
     import bmesh
     bm = bmesh.new()
@@ -279,6 +479,7 @@ def write_file(filepath, objects, scene,
                EXPORT_CURVE_AS_NURBS=True,
                EXPORT_GLOBAL_MATRIX=None,
                EXPORT_PATH_MODE='AUTO',
+               EXPORT_PROCESSES=1,
                progress=ProgressReport(),
                ):
     """
@@ -290,13 +491,7 @@ def write_file(filepath, objects, scene,
     if EXPORT_GLOBAL_MATRIX is None:
         EXPORT_GLOBAL_MATRIX = mathutils.Matrix()
 
-    def veckey3d(v):
-        return round(v.x, 4), round(v.y, 4), round(v.z, 4)
-
-    def veckey2d(v):
-        return round(v[0], 4), round(v[1], 4)
-
-    def findVertexGroupName(face, vWeightMap):
+    def findVertexGroupName(face_verts, vWeightMap):
         """
         Searches the vertexDict to see what groups is assigned to a given face.
         We use a frequency system in order to sort out the name because a given vetex can
@@ -306,7 +501,7 @@ def write_file(filepath, objects, scene,
         of vertices is the face's group
         """
         weightDict = {}
-        for vert_index in face.vertices:
+        for vert_index in face_verts:
             vWeights = vWeightMap[vert_index]
             for vGroupName, weight in vWeights:
                 weightDict[vGroupName] = weightDict.get(vGroupName, 0.0) + weight
@@ -317,7 +512,8 @@ def write_file(filepath, objects, scene,
             return '(null)'
 
     with ProgressReportSubstep(progress, 2, "OBJ Export path: %r" % filepath, "OBJ Export Finished") as subprogress1:
-        with open(filepath, "w", encoding="utf8", newline="\n") as f:
+        with open(filepath, "w", encoding="utf8", newline="\n") as f, \
+                GeometryWriter(f.write, EXPORT_PROCESSES) as geometry:
             fw = f.write
 
             # Write Header
@@ -333,8 +529,6 @@ def write_file(filepath, objects, scene,
             # Initialize totals, these are updated each object
             totverts = totuvco = totno = 1
 
-            face_vert_index = 1
-
             # A Dict of Materials
             # (material.name, image.name):matname_imagename # matname_imagename has gaps removed.
             mtl_dict = {}
@@ -369,13 +563,15 @@ def write_file(filepath, objects, scene,
 
                 subprogress1.enter_substeps(len(obs))
                 for ob, ob_mat in obs:
+                    chunk = geometry.new_chunk()
+                    cw = chunk.write
                     with ProgressReportSubstep(subprogress1, 6) as subprogress2:
                         uv_unique_count = no_unique_count = 0
 
                         # Nurbs curve support
                         if EXPORT_CURVE_AS_NURBS and test_nurbs_compat(ob):
                             ob_mat = EXPORT_GLOBAL_MATRIX * ob_mat
-                            totverts += write_nurb(fw, ob, ob_mat)
+                            totverts += write_nurb(cw, ob, ob_mat)
                             continue
                         # END NURBS
 
@@ -395,42 +591,62 @@ def write_file(filepath, objects, scene,
 
                         if EXPORT_UV:
                             faceuv = len(me.uv_textures) > 0
-                            if faceuv:
-                                uv_texture = me.uv_textures.active.data[:]
-                                uv_layer = me.uv_layers.active.data[:]
                         else:
                             faceuv = False
 
-                        me_verts = me.vertices[:]
-
-                        # Make our own list so it can be sorted to reduce context switching
-                        face_index_pairs = [(face, index) for index, face in enumerate(me.polygons)]
-                        # faces = [ f for f in me.tessfaces ]
+                        me_verts = me.vertices
+                        me_polys = me.polygons
+                        tot_verts = len(me_verts)
+                        tot_polys = len(me_polys)
 
                         if EXPORT_EDGES:
                             edges = me.edges
                         else:
                             edges = []
 
-                        if not (len(face_index_pairs) + len(edges) + len(me.vertices)):  # Make sure there is something to write
+                        if not (tot_polys + len(edges) + tot_verts):  # Make sure there is something to write
                             # clean up
                             bpy.data.meshes.remove(me)
                             continue  # dont bother with this mesh.
 
-                        if EXPORT_NORMALS and face_index_pairs:
+                        # Get all the mesh data at once, in flat arrays
+                        verts_co = array.array('f', [0.0]) * (tot_verts * 3)
+                        me_verts.foreach_get("co", verts_co)
+                        loops_vert = array.array('i', [0]) * len(me.loops)
+                        me.loops.foreach_get("vertex_index", loops_vert)
+                        polys_loop_start = array.array('i', [0]) * tot_polys
+                        me_polys.foreach_get("loop_start", polys_loop_start)
+                        polys_loop_total = array.array('i', [0]) * tot_polys
+                        me_polys.foreach_get("loop_total", polys_loop_total)
+                        polys_material = array.array('i', [0]) * tot_polys
+                        me_polys.foreach_get("material_index", polys_material)
+                        polys_smooth = [False] * tot_polys
+                        me_polys.foreach_get("use_smooth", polys_smooth)
+
+                        if faceuv:
+                            polys_image = [tface.image for tface in me.uv_textures.active.data]
+                            loops_uv_co = array.array('f', [0.0]) * (len(me.loops) * 2)
+                            me.uv_layers.active.data.foreach_get("uv", loops_uv_co)
+                        else:
+                            polys_image = [None] * tot_polys
+
+                        if EXPORT_NORMALS and tot_polys:
                             me.calc_normals_split()
                             # No need to call me.free_normals_split later, as this mesh is deleted anyway!
-                            loops = me.loops
-                        else:
-                            loops = []
+                            loops_no_co = array.array('f', [0.0]) * (len(me.loops) * 3)
+                            me.loops.foreach_get("normal", loops_no_co)
 
-                        if (EXPORT_SMOOTH_GROUPS or EXPORT_SMOOTH_GROUPS_BITFLAGS) and face_index_pairs:
+                        if (EXPORT_SMOOTH_GROUPS or EXPORT_SMOOTH_GROUPS_BITFLAGS) and tot_polys:
                             smooth_groups, smooth_groups_tot = me.calc_smooth_groups(EXPORT_SMOOTH_GROUPS_BITFLAGS)
                             if smooth_groups_tot <= 1:
                                 smooth_groups, smooth_groups_tot = (), 0
                         else:
                             smooth_groups, smooth_groups_tot = (), 0
 
+                        # smooth group of each face, False when flat
+                        if smooth_groups:
+                            polys_smooth = [g if s else False for g, s in izip(smooth_groups, polys_smooth)]
+
                         materials = me.materials[:]
                         material_names = [m.name if m else None for m in materials]
 
@@ -442,34 +658,25 @@ def write_file(filepath, objects, scene,
                         # Sort by Material, then images
                         # so we dont over context switch in the obj file.
                         if EXPORT_KEEP_VERT_ORDER:
-                            pass
+                            polys_order = xrange(tot_polys)
                         else:
                             if faceuv:
-                                if smooth_groups:
-                                    sort_func = lambda a: (a[0].material_index,
-                                                           hash(uv_texture[a[1]].image),
-                                                           smooth_groups[a[1]] if a[0].use_smooth else False)
-                                else:
-                                    sort_func = lambda a: (a[0].material_index,
-                                                           hash(uv_texture[a[1]].image),
-                                                           a[0].use_smooth)
+                                sort_keys = zip(polys_material, map(hash, polys_image), polys_smooth)
                             elif len(materials) > 1:
-                                if smooth_groups:
-                                    sort_func = lambda a: (a[0].material_index,
-                                                           smooth_groups[a[1]] if a[0].use_smooth else False)
-                                else:
-                                    sort_func = lambda a: (a[0].material_index,
-                                                           a[0].use_smooth)
+                                sort_keys = zip(polys_material, polys_smooth)
                             else:
                                 # no materials
-                                if smooth_groups:
-                                    sort_func = lambda a: smooth_groups[a[1] if a[0].use_smooth else False]
-                                else:
-                                    sort_func = lambda a: a[0].use_smooth
+                                sort_keys = polys_smooth
+
+                            polys_order = sorted(xrange(tot_polys), key=sort_keys.__getitem__)
 
-                            face_index_pairs.sort(key=sort_func)
+                            del sort_keys
 
-                            del sort_func
+                        # loops of the faces in the order they are written
+                        loops_order = array.array('i')
+                        for f_index in polys_order:
+                            loop_start = polys_loop_start[f_index]
+                            loops_order.extend(xrange(loop_start, loop_start + polys_loop_total[f_index]))
 
                         # Set the default mat to no material and no image.
                         contextMat = 0, 0  # Can never be this, so we will label a new material the first chance we get.
@@ -484,68 +691,56 @@ def write_file(filepath, objects, scene,
                                 obnamestring = '%s_%s' % (name_compat(name1), name_compat(name2))
 
                             if EXPORT_BLEN_OBS:
-                                fw('o %s\n' % obnamestring)  # Write Object name
+                                cw('o %s\n' % obnamestring)  # Write Object name
                             else:  # if EXPORT_GROUP_BY_OB:
-                                fw('g %s\n' % obnamestring)
+                                cw('g %s\n' % obnamestring)
 
                         subprogress2.step()
 
                         # Vert
-                        for v in me_verts:
-                            fw('v %.6f %.6f %.6f\n' % v.co[:])
+                        chunk.lines('v %.6f %.6f %.6f\n', verts_co, 3)
 
                         subprogress2.step()
 
                         # UV
                         if faceuv:
-                            # in case removing some of these dont get defined.
-                            uv = f_index = uv_index = uv_key = uv_val = uv_ls = None
-
-                            uv_face_mapping = [None] * len(face_index_pairs)
-
-                            uv_dict = {}
-                            uv_get = uv_dict.get
-                            for f, f_index in face_index_pairs:
-                                uv_ls = uv_face_mapping[f_index] = []
-                                for uv_index, l_index in enumerate(f.loop_indices):
-                                    uv = uv_layer[l_index].uv
-                                    uv_key = veckey2d(uv)
-                                    uv_val = uv_get(uv_key)
-                                    if uv_val is None:
-                                        uv_val = uv_dict[uv_key] = uv_unique_count
-                                        fw('vt %.6f %.6f\n' % uv[:])
-                                        uv_unique_count += 1
-                                    uv_ls.append(uv_val)
-
-                            del uv_dict, uv, f_index, uv_index, uv_ls, uv_get, uv_key, uv_val
-                            # Only need uv_unique_count and uv_face_mapping
+                            uvs = gather(loops_uv_co, loops_order, 2)
+                            uv_keys = map(round, uvs, repeat(4, len(uvs)))
+                            loops_uv, uv_firsts = unique_indices(zip(uv_keys[0::2], uv_keys[1::2]))
+                            chunk.lines('vt %.6f %.6f\n', gather(uvs, uv_firsts, 2), 2)
+                            uv_unique_count = len(uv_firsts)
+                            del uvs, uv_keys, uv_firsts
 
                         subprogress2.step()
 
                         # NORMAL, Smooth/Non smoothed.
-                        if EXPORT_NORMALS:
-                            no_key = no_val = None
-                            normals_to_idx = {}
-                            no_get = normals_to_idx.get
-                            loops_to_normals = [0] * len(loops)
-                            for f, f_index in face_index_pairs:
-                                for l_idx in f.loop_indices:
-                                    no_key = veckey3d(loops[l_idx].normal)
-                                    no_val = no_get(no_key)
-                                    if no_val is None:
-                                        no_val = normals_to_idx[no_key] = no_unique_count
-                                        fw('vn %.6f %.6f %.6f\n' % no_key)
-                                        no_unique_count += 1
-                                    loops_to_normals[l_idx] = no_val
-                            del normals_to_idx, no_get, no_key, no_val
-                        else:
-                            loops_to_normals = []
-
-                        if not faceuv:
-                            f_image = None
+                        if EXPORT_NORMALS and tot_polys:
+                            no_keys = map(round, gather(loops_no_co, loops_order, 3), repeat(4, len(loops_order) * 3))
+                            no_keys = zip(no_keys[0::3], no_keys[1::3], no_keys[2::3])
+                            loops_no, no_firsts = unique_indices(no_keys)
+                            chunk.lines('vn %.6f %.6f %.6f\n',
+                                        list(chain.from_iterable(map(no_keys.__getitem__, no_firsts))), 3)
+                            no_unique_count = len(no_firsts)
+                            del no_keys, no_firsts
 
                         subprogress2.step()
 
+                        # Indices of all face corners, in the order they are written
+                        corners = [map(totverts.__add__, gather(loops_vert, loops_order))]
+                        if faceuv:
+                            corners.append(map(totuvco.__add__, loops_uv))
+                        if EXPORT_NORMALS and tot_polys:
+                            corners.append(map(totno.__add__, loops_no))
+                        corner_values = list(chain.from_iterable(izip(*corners)))
+                        del corners
+
+                        if faceuv:
+                            corner_fmt = " %d/%d/%d" if EXPORT_NORMALS else " %d/%d"  # vert, uv(, normal)
+                        else:
+                            corner_fmt = " %d//%d" if EXPORT_NORMALS else " %d"  # vert(, normal)
+                        face_fmts = dict((total, 'f' + corner_fmt * total + '\n') for total in set(polys_loop_total))
+                        face_block = FaceBlock(chunk, face_fmts, corner_values, corner_fmt.count('%'))
+
                         # XXX
                         if EXPORT_POLYGROUPS:
                             # Retrieve the list of vertex groups
@@ -553,22 +748,17 @@ def write_file(filepath, objects, scene,
                             if vertGroupNames:
                                 currentVGroup = ''
                                 # Create a dictionary keyed by face id and listing, for each vertex, the vertex groups it belongs to
-                                vgroupsMap = [[] for _i in xrange(len(me_verts))]
+                                vgroupsMap = [[] for _i in xrange(tot_verts)]
                                 for v_idx, v_ls in enumerate(vgroupsMap):
                                     v_ls[:] = [(vertGroupNames[g.group], g.weight) for g in me_verts[v_idx].groups]
 
-                        for f, f_index in face_index_pairs:
-                            f_smooth = f.use_smooth
-                            if f_smooth and smooth_groups:
-                                f_smooth = smooth_groups[f_index]
-                            f_mat = min(f.material_index, len(materials) - 1)
-
-                            if faceuv:
-                                tface = uv_texture[f_index]
-                                f_image = tface.image
+                        for f_index in polys_order:
+                            f_smooth = polys_smooth[f_index]
+                            f_mat = min(polys_material[f_index], len(materials) - 1)
+                            f_image = polys_image[f_index]
 
                             # MAKE KEY
-                            if faceuv and f_image:  # Object is always true.
+                            if f_image:  # Object is always true.
                                 key = material_names[f_mat], f_image.name
                             else:
                                 key = material_names[f_mat], None  # No image, use None instead.
@@ -577,22 +767,26 @@ def write_file(filepath, objects, scene,
                             if EXPORT_POLYGROUPS:
                                 if vertGroupNames:
                                     # find what vertext group the face belongs to
-                                    vgroup_of_face = findVertexGroupName(f, vgroupsMap)
+                                    loop_start = polys_loop_start[f_index]
+                                    vgroup_of_face = findVertexGroupName(
+                                            loops_vert[loop_start:loop_start + polys_loop_total[f_index]], vgroupsMap)
                                     if vgroup_of_face != currentVGroup:
                                         currentVGroup = vgroup_of_face
-                                        fw('g %s\n' % vgroup_of_face)
+                                        face_block.flush()
+                                        cw('g %s\n' % vgroup_of_face)
 
                             # CHECK FOR CONTEXT SWITCH
                             if key == contextMat:
                                 pass  # Context already switched, dont do anything
                             else:
+                                face_block.flush()
                                 if key[0] is None and key[1] is None:
                                     # Write a null material, since we know the context has changed.
                                     if EXPORT_GROUP_BY_MAT:
                                         # can be mat_image or (null)
-                                        fw("g %s_%s\n" % (name_compat(ob.name), name_compat(ob.data.name)))
+                                        cw("g %s_%s\n" % (name_compat(ob.name), name_compat(ob.data.name)))
                                     if EXPORT_MTL:
-                                        fw("usemtl (null)\n")  # mat, image
+                                        cw("usemtl (null)\n")  # mat, image
 
                                 else:
                                     mat_data = mtl_dict.get(key)
@@ -622,61 +816,40 @@ def write_file(filepath, objects, scene,
 
                                     if EXPORT_GROUP_BY_MAT:
                                         # can be mat_image or (null)
-                                        fw("g %s_%s_%s\n" % (name_compat(ob.name), name_compat(ob.data.name), mat_data[0]))
+                                        cw("g %s_%s_%s\n" % (name_compat(ob.name), name_compat(ob.data.name), mat_data[0]))
                                     if EXPORT_MTL:
-                                        fw("usemtl %s\n" % mat_data[0])  # can be mat_image or (null)
+                                        cw("usemtl %s\n" % mat_data[0])  # can be mat_image or (null)
 
                             contextMat = key
                             if f_smooth != contextSmooth:
+                                face_block.flush()
                                 if f_smooth:  # on now off
                                     if smooth_groups:
-                                        f_smooth = smooth_groups[f_index]
-                                        fw('s %d\n' % f_smooth)
+                                        cw('s %d\n' % f_smooth)
                                     else:
-                                        fw('s 1\n')
+                                        cw('s 1\n')
                                 else:  # was off now on
-                                    fw('s off\n')
+                                    cw('s off\n')
                                 contextSmooth = f_smooth
 
-                            f_v = [(vi, me_verts[v_idx], l_idx)
-                                   for vi, (v_idx, l_idx) in enumerate(izip(f.vertices, f.loop_indices))]
+                            face_block.add(polys_loop_total[f_index])
 
-                            fw('f')
-                            if faceuv:
-                                if EXPORT_NORMALS:
-                                    for vi, v, li in f_v:
-                                        fw(" %d/%d/%d" % (totverts + v.index,
-                                                          totuvco + uv_face_mapping[f_index][vi],
-                                                          totno + loops_to_normals[li],
-                                                          ))  # vert, uv, normal
-                                else:  # No Normals
-                                    for vi, v, li in f_v:
-                                        fw(" %d/%d" % (totverts + v.index,
-                                                       totuvco + uv_face_mapping[f_index][vi],
-                                                       ))  # vert, uv
-
-                                face_vert_index += len(f_v)
-
-                            else:  # No UV's
-                                if EXPORT_NORMALS:
-                                    for vi, v, li in f_v:
-                                        fw(" %d//%d" % (totverts + v.index, totno + loops_to_normals[li]))
-                                else:  # No Normals
-                                    for vi, v, li in f_v:
-                                        fw(" %d" % (totverts + v.index))
-
-                            fw('\n')
+                        face_block.flush()
+                        del face_block, corner_values
 
                         subprogress2.step()
 
                         # Write edges.
                         if EXPORT_EDGES:
-                            for ed in edges:
-                                if ed.is_loose:
-                                    fw('l %d %d\n' % (totverts + ed.vertices[0], totverts + ed.vertices[1]))
+                            edges_vert = array.array('i', [0]) * (len(edges) * 2)
+                            edges.foreach_get("vertices", edges_vert)
+                            edges_loose = [False] * len(edges)
+                            edges.foreach_get("is_loose", edges_loose)
+                            edges_vert = gather(edges_vert, list(compress(xrange(len(edges)), edges_loose)), 2)
+                            chunk.lines('l %d %d\n', map(totverts.__add__, edges_vert), 2)
 
                         # Make the indices global rather then per mesh
-                        totverts += len(me_verts)
+                        totverts += tot_verts
                         totuvco += uv_unique_count
                         totno += no_unique_count
 
@@ -718,6 +891,7 @@ def _write(context, filepath,
            EXPORT_ANIMATION,
            EXPORT_GLOBAL_MATRIX,
            EXPORT_PATH_MODE,  # Not used
+           EXPORT_PROCESSES=1,
            ):
 
     with ProgressReport(context.window_manager) as progress:
@@ -772,6 +946,7 @@ def _write(context, filepath,
                        EXPORT_CURVE_AS_NURBS,
                        EXPORT_GLOBAL_MATRIX,
                        EXPORT_PATH_MODE,
+                       EXPORT_PROCESSES,
                        progress,
                        )
             progress.leave_substeps()
@@ -808,7 +983,8 @@ def save(operator, context, filepath="",
          use_selection=True,
          use_animation=False,
          global_matrix=None,
-         path_mode='AUTO'
+         path_mode='AUTO',
+         processes=1,
          ):
 
     _write(context, filepath,
@@ -830,6 +1006,7 @@ def save(operator, context, filepath="",
            EXPORT_ANIMATION=use_animation,
            EXPORT_GLOBAL_MATRIX=global_matrix,
            EXPORT_PATH_MODE=path_mode,
+           EXPORT_PROCESSES=processes,
            )
 
     return set(['FINISHED'])
@@ -35,16 +35,20 @@ from __future__ import with_statement
 from __future__ import division
 from __future__ import absolute_import
 import array
+import operator
 import os
 import time
+from functools import partial
 import bpy
 import mathutils
 from bpy_extras.io_utils import unpack_list
 from bpy_extras.image_utils import load_image
 
 from progress_report import ProgressReport, ProgressReportSubstep
+from array_utils import gather
+from . import parse_obj
 from io import open
-from itertools import izip
+from itertools import izip, compress, repeat
 
 
 def line_value(line_split):
@@ -403,6 +407,104 @@ def create_materials(filepath, relpath,
             mtl.close()
 
 
+# kinds of faces in OBJFaces
+FACE, FACE_INVALID, FACE_LINE = xrange(3)
+
+
+class OBJFaces(object):
+    """
+    Faces (and polylines) of an OBJ file, in flat arrays instead of lists per face.
+
+    loc holds the vertex indices of all faces one after the other, start the index
+    in loc of the first corner of each face, plus the total. nor and tex hold the
+    normal and uv index of each corner, -1 when the face has none.
+    Material, smooth group and object of each face are ids, indices in the names
+    lists (0 being None), kind is FACE, FACE_INVALID (ngon using an edge more than once)
+    or FACE_LINE.
+    """
+    __slots__ = (
+        "loc", "nor", "tex", "start",
+        "kind", "material", "smooth_group", "object",
+        "materials", "smooth_groups", "objects", "_ids",
+        )
+
+    def __init__(self, names=None):
+        self.loc = array.array('i')
+        self.nor = array.array('i')
+        self.tex = array.array('i')
+        self.start = array.array('i', [0])
+        self.kind = array.array('b')
+        self.material = array.array('i')
+        self.smooth_group = array.array('i')
+        self.object = array.array('i')
+
+        if names is None:
+            names = ([None], [None], [None])
+        self.materials, self.smooth_groups, self.objects = names
+        self._ids = tuple(dict((name, i) for i, name in enumerate(n)) for n in names)
+
+    def __len__(self):
+        return len(self.kind)
+
+    def name_id(self, which, name):
+        """Id of name in the names list number which (materials, smooth groups, objects)."""
+        ids = self._ids[which]
+        i = ids.get(name)
+        if i is None:
+            names = (self.materials, self.smooth_groups, self.objects)[which]
+            i = ids[name] = len(names)
+            names.append(name)
+        return i
+
+    def append(self, face_vert_loc_indices, face_vert_nor_indices, face_vert_tex_indices,
+               context_material, context_smooth_group, context_object, kind):
+        """
+        Add a face, nor and tex indices being -1 where missing, or empty lists
+        when the face has none at all.
+        """
+        tot = len(face_vert_loc_indices)
+        self.loc.extend(face_vert_loc_indices)
+        for data, indices in ((self.nor, face_vert_nor_indices), (self.tex, face_vert_tex_indices)):
+            if not indices:
+                data.extend(array.array('i', [-1]) * tot)
+            else:
+                # corners missing from a face having some use the first one
+                data.extend([i if i != -1 else 0 for i in indices] if -1 in indices else indices)
+        self.start.append(len(self.loc))
+
+        self.kind.append(kind)
+        self.material.append(self.name_id(0, context_material))
+        self.smooth_group.append(self.name_id(1, context_smooth_group))
+        self.object.append(self.name_id(2, context_object))
+
+    def subset(self, face_indices):
+        """Faces at face_indices, sharing the names lists."""
+        sub = OBJFaces((self.materials, self.smooth_groups, self.objects))
+        start = self.start
+
+        if len(face_indices) and face_indices[-1] - face_indices[0] + 1 == len(face_indices):
+            # contiguous
+            s, e = start[face_indices[0]], start[face_indices[-1] + 1]
+            sub.loc = self.loc[s:e]
+            sub.nor = self.nor[s:e]
+            sub.tex = self.tex[s:e]
+            sub.start = array.array('i', map((-s).__add__, start[face_indices[0]:face_indices[-1] + 2]))
+        else:
+            for f in face_indices:
+                s, e = start[f], start[f + 1]
+                sub.loc.extend(self.loc[s:e])
+                sub.nor.extend(self.nor[s:e])
+                sub.tex.extend(self.tex[s:e])
+                sub.start.append(len(sub.loc))
+
+        sub.kind = gather(self.kind, face_indices)
+        sub.material = gather(self.material, face_indices)
+        sub.smooth_group = gather(self.smooth_group, face_indices)
+        sub.object = gather(self.object, face_indices)
+
+        return sub
+
+
 def split_mesh(verts_loc, faces, unique_materials, filepath, SPLIT_OB_OR_GROUP):
     """
     Takes vert_loc and faces, and separates into multiple sets of
@@ -411,11 +513,12 @@ def split_mesh(verts_loc, faces, unique_materials, filepath, SPLIT_OB_OR_GROUP):
 
     filename = os.path.splitext((os.path.basename(filepath)))[0]
 
+    def use_indices(data):
+        return bool(data) and max(data) != -1
+
     if not SPLIT_OB_OR_GROUP or not faces:
-        use_verts_nor = any((False if f[1] is ... else True) for f in faces)
-        use_verts_tex = any((False if f[2] is ... else True) for f in faces)
         # use the filename for the object name since we aren't chopping up the mesh.
-        return [(verts_loc, faces, unique_materials, filename, use_verts_nor, use_verts_tex)]
+        return [(verts_loc, faces, unique_materials, filename, use_indices(faces.nor), use_indices(faces.tex))]
 
     def key_to_name(key):
         # if the key is a tuple, join it to make a string
@@ -424,48 +527,36 @@ def split_mesh(verts_loc, faces, unique_materials, filepath, SPLIT_OB_OR_GROUP):
         else:
             return key.decode('utf-8', 'replace')
 
-    # Return a key that makes the faces unique.
-    face_split_dict = {}
-
-    oldkey = -1  # initialize to a value that will never match the key
-
-    for face in faces:
-        key = face[5]
-
-        if oldkey != key:
-            # Check the key has changed.
-            (verts_split, faces_split, unique_materials_split, vert_remap,
-             use_verts_nor, use_verts_tex) = face_split_dict.setdefault(key, ([], [], {}, {}, [], []))
-            oldkey = key
-
-        face_vert_loc_indices = face[0]
-
-        if not use_verts_nor and face[1] is not ...:
-            use_verts_nor.append(True)
-
-        if not use_verts_tex and face[2] is not ...:
-            use_verts_tex.append(True)
+    # face indices of each object
+    keys = set(faces.object)
+    if len(keys) == 1:
+        face_split_dict = {keys.pop(): xrange(len(faces))}
+    elif len(keys) <= 16:
+        face_split_dict = dict((key, array.array('i', compress(xrange(len(faces)),
+                                                               map(partial(operator.eq, key), faces.object))))
+                               for key in keys)
+    else:
+        face_split_dict = {}
+        for f, key in enumerate(faces.object):
+            face_split_dict.setdefault(key, array.array('i')).append(f)
 
-        # Remap verts to new vert list and add where needed
-        for enum, i in enumerate(face_vert_loc_indices):
-            map_index = vert_remap.get(i)
-            if map_index is None:
-                map_index = len(verts_split)
-                vert_remap[i] = map_index  # set the new remapped index so we only add once and can reference next time.
-                verts_split.append(verts_loc[i])  # add the vert to the local verts
+    splits = []
+    for key, face_indices in face_split_dict.items():
+        faces_split = faces.subset(face_indices)
 
-            face_vert_loc_indices[enum] = map_index  # remap to the local index
+        # keep the used verts only, in their original order
+        used = sorted(set(faces_split.loc))
+        vert_remap = dict(izip(used, xrange(len(used))))
+        faces_split.loc = array.array('i', map(vert_remap.__getitem__, faces_split.loc))
+        verts_split = gather(verts_loc, used, 3)
 
-            matname = face[3]
-            if matname and matname not in unique_materials_split:
-                unique_materials_split[matname] = unique_materials[matname]
+        unique_materials_split = dict((faces.materials[i], unique_materials[faces.materials[i]])
+                                      for i in set(faces_split.material) if i)
 
-        faces_split.append(face)
+        splits.append((verts_split, faces_split, unique_materials_split, key_to_name(faces.objects[key]),
+                       use_indices(faces_split.nor), use_indices(faces_split.tex)))
 
-    # remove one of the items and reorder
-    return [(verts_split, faces_split, unique_materials_split, key_to_name(key), bool(use_vnor), bool(use_vtex))
-            for key, (verts_split, faces_split, unique_materials_split, _, use_vnor, use_vtex)
-            in face_split_dict.items()]
+    return splits
 
 
 def create_mesh(new_objects,
@@ -487,76 +578,60 @@ def create_mesh(new_objects,
 
     if unique_smooth_groups:
         sharp_edges = set()
-        smooth_group_users = dict((context_smooth_group, {}) for context_smooth_group in unique_smooth_groups.keys())
-        context_smooth_group_old = -1
+        smooth_group_users = {}  # smooth group id -> {edge_key: users}
 
     fgon_edges = set()  # Used for storing fgon keys when we need to tesselate/untesselate them (ngons with hole).
     edges = []
-    tot_loops = 0
 
-    context_object = None
+    face_loc = faces.loc
+    face_start = faces.start
+    face_kind = faces.kind
+    face_smooth_group = faces.smooth_group
+    face_sizes = array.array('i', map(operator.sub, face_start[1:], face_start[:-1]))
 
-    # reverse loop through face indices
-    for f_idx in xrange(len(faces) - 1, -1, -1):
-        (face_vert_loc_indices,
-         face_vert_nor_indices,
-         face_vert_tex_indices,
-         context_material,
-         context_smooth_group,
-         context_object,
-         face_invalid_blenpoly,
-         ) = faces[f_idx]
+    # Unless there are polylines, single vert faces or ngons to tessellate, all faces are polygons as is.
+    # Otherwise polygons are listed with the corners they use.
+    if face_kind.count(FACE) == len(face_kind) and (not face_sizes or min(face_sizes) >= 3):
+        poly_faces = None
+    else:
+        poly_faces = array.array('i')  # face of each polygon
+        poly_corners = array.array('i')  # corners of all polygons
+        poly_sizes = array.array('i')
 
-        len_face_vert_loc_indices = len(face_vert_loc_indices)
+    if poly_faces is not None or unique_smooth_groups:
+        for f, (size, kind, smooth_group) in enumerate(izip(face_sizes, face_kind, face_smooth_group)):
+            if size == 1:
+                continue  # cant add single vert faces
 
-        if len_face_vert_loc_indices == 1:
-            faces.pop(f_idx)  # cant add single vert faces
+            s = face_start[f]
+            face_vert_loc_indices = face_loc[s:s + size]
 
-        # Face with a single item in face_vert_nor_indices is actually a polyline!
-        elif len(face_vert_nor_indices) == 1 or len_face_vert_loc_indices == 2:
-            if use_edges:
-                edges.extend((face_vert_loc_indices[i], face_vert_loc_indices[i + 1])
-                             for i in xrange(len_face_vert_loc_indices - 1))
-            faces.pop(f_idx)
+            if kind == FACE_LINE or size == 2:
+                if use_edges:
+                    edges.extend(izip(face_vert_loc_indices[:-1], face_vert_loc_indices[1:]))
+                continue
 
-        else:
             # Smooth Group
-            if unique_smooth_groups and context_smooth_group:
-                # Is a part of of a smooth group and is a face
-                if context_smooth_group_old is not context_smooth_group:
-                    edge_dict = smooth_group_users[context_smooth_group]
-                    context_smooth_group_old = context_smooth_group
-
+            if unique_smooth_groups and smooth_group:
+                edge_dict = smooth_group_users.setdefault(smooth_group, {})
                 prev_vidx = face_vert_loc_indices[-1]
                 for vidx in face_vert_loc_indices:
                     edge_key = (prev_vidx, vidx) if (prev_vidx < vidx) else (vidx, prev_vidx)
                     prev_vidx = vidx
                     edge_dict[edge_key] = edge_dict.get(edge_key, 0) + 1
 
+            if poly_faces is None:
+                continue
+
             # NGons into triangles
-            if face_invalid_blenpoly:
+            if kind == FACE_INVALID:
                 from bpy_extras.mesh_utils import ngon_tessellate
-                ngon_face_indices = ngon_tessellate(verts_loc, face_vert_loc_indices)
-                faces.extend([([face_vert_loc_indices[ngon[0]],
-                                face_vert_loc_indices[ngon[1]],
-                                face_vert_loc_indices[ngon[2]],
-                                ],
-                               [face_vert_nor_indices[ngon[0]],
-                                face_vert_nor_indices[ngon[1]],
-                                face_vert_nor_indices[ngon[2]],
-                                ] if face_vert_nor_indices else [],
-                               [face_vert_tex_indices[ngon[0]],
-                                face_vert_tex_indices[ngon[1]],
-                                face_vert_tex_indices[ngon[2]],
-                                ] if face_vert_tex_indices else [],
-                               context_material,
-                               context_smooth_group,
-                               context_object,
-                               [],
-                               )
-                             for ngon in ngon_face_indices]
-                             )
-                tot_loops += 3 * len(ngon_face_indices)
+                ngon_face_indices = ngon_tessellate([tuple(verts_loc[vidx * 3:vidx * 3 + 3])
+                                                     for vidx in face_vert_loc_indices], range(size))
+                for ngon in ngon_face_indices:
+                    poly_faces.append(f)
+                    poly_corners.extend((s + ngon[0], s + ngon[1], s + ngon[2]))
+                    poly_sizes.append(3)
 
                 # edges to make ngons
                 edge_users = set()
@@ -572,10 +647,10 @@ def create_mesh(new_objects,
                             fgon_edges.add(edge_key)
                         else:
                             edge_users.add(edge_key)
-
-                faces.pop(f_idx)
             else:
-                tot_loops += len_face_vert_loc_indices
+                poly_faces.append(f)
+                poly_corners.extend(xrange(s, s + size))
+                poly_sizes.append(size)
 
     # Build sharp edges
     if unique_smooth_groups:
@@ -584,6 +659,27 @@ def create_mesh(new_objects,
                 if users == 1:  # This edge is on the boundry of a group
                     sharp_edges.add(key)
 
+    if poly_faces is None:
+        loops_vert_idx = face_loc
+        loops_nor = faces.nor
+        loops_tex = faces.tex
+        faces_loop_start = face_start[:-1]
+        faces_loop_total = face_sizes
+        faces_material = faces.material
+        faces_smooth_group = face_smooth_group
+    else:
+        loops_vert_idx = gather(face_loc, poly_corners)
+        loops_nor = gather(faces.nor, poly_corners)
+        loops_tex = gather(faces.tex, poly_corners)
+        faces_loop_start = array.array('i', [0]) * len(poly_sizes)
+        lidx = 0
+        for i, size in enumerate(poly_sizes):
+            faces_loop_start[i] = lidx
+            lidx += size
+        faces_loop_total = poly_sizes
+        faces_material = gather(faces.material, poly_faces)
+        faces_smooth_group = gather(face_smooth_group, poly_faces)
+
     # map the material names to an index
     material_mapping = dict((name, i) for i, name in enumerate(unique_materials))  # enumerate over unique_materials keys()
 
@@ -598,75 +694,51 @@ def create_mesh(new_objects,
     for material in materials:
         me.materials.append(material)
 
-    me.vertices.add(len(verts_loc))
-    me.loops.add(tot_loops)
-    me.polygons.add(len(faces))
-
-    # verts_loc is a list of (x, y, z) tuples
-    me.vertices.foreach_set("co", unpack_list(verts_loc))
-
-    loops_vert_idx = []
-    faces_loop_start = []
-    faces_loop_total = []
-    lidx = 0
-    for f in faces:
-        vidx = f[0]
-        nbr_vidx = len(vidx)
-        loops_vert_idx.extend(vidx)
-        faces_loop_start.append(lidx)
-        faces_loop_total.append(nbr_vidx)
-        lidx += nbr_vidx
+    me.vertices.add(len(verts_loc) // 3)
+    me.loops.add(len(loops_vert_idx))
+    me.polygons.add(len(faces_loop_total))
+
+    # verts_loc is a flat array of coordinates
+    me.vertices.foreach_set("co", verts_loc)
 
     me.loops.foreach_set("vertex_index", loops_vert_idx)
     me.polygons.foreach_set("loop_start", faces_loop_start)
     me.polygons.foreach_set("loop_total", faces_loop_total)
 
+    # material ids to material indices, faces without material use the first one
+    material_index = [material_mapping.get(name, 0) for name in faces.materials]
+    me.polygons.foreach_set("material_index", map(material_index.__getitem__, faces_material))
+    me.polygons.foreach_set("use_smooth", map(bool, faces_smooth_group))
+
+    def set_loop_data(layer, attr, data, size, indices):
+        # corners with no index keep the current value
+        values = gather(data, map(max, indices, repeat(0, len(indices))), size)
+        if -1 in indices:
+            current = array.array('f', [0.0]) * len(values)
+            layer.foreach_get(attr, current)
+            for lidx in compress(xrange(len(indices)), map(partial(operator.eq, -1), indices)):
+                values[lidx * size:lidx * size + size] = current[lidx * size:lidx * size + size]
+        layer.foreach_set(attr, values)
+
     if verts_nor and me.loops:
         # Note: we store 'temp' normals in loops, since validate() may alter final mesh,
         #       we can only set custom lnors *after* calling it.
         me.create_normals_split()
+        if max(loops_nor) != -1:
+            set_loop_data(me.loops, "normal", verts_nor, 3, loops_nor)
 
     if verts_tex and me.polygons:
         me.uv_textures.new()
+        if max(loops_tex) != -1:
+            set_loop_data(me.uv_layers[0].data, "uv", verts_tex, 2, loops_tex)
 
-    context_material_old = -1  # avoid a dict lookup
-    mat = 0  # rare case it may be un-initialized.
-
-    for i, (face, blen_poly) in enumerate(izip(faces, me.polygons)):
-        if len(face[0]) < 3:
-            raise Exception("bad face")  # Shall not happen, we got rid of those earlier!
-
-        (face_vert_loc_indices,
-         face_vert_nor_indices,
-         face_vert_tex_indices,
-         context_material,
-         context_smooth_group,
-         context_object,
-         face_invalid_blenpoly,
-         ) = face
-
-        if context_smooth_group:
-            blen_poly.use_smooth = True
-
-        if context_material:
-            if context_material_old is not context_material:
-                mat = material_mapping[context_material]
-                context_material_old = context_material
-            blen_poly.material_index = mat
-
-        if verts_nor and face_vert_nor_indices:
-            for face_noidx, lidx in izip(face_vert_nor_indices, blen_poly.loop_indices):
-                me.loops[lidx].normal[:] = verts_nor[0 if (face_noidx is ...) else face_noidx]
-
-        if verts_tex and face_vert_tex_indices:
-            if context_material:
-                image = unique_material_images[context_material]
-                if image:  # Can be none if the material dosnt have an image.
-                    me.uv_textures[0].data[i].image = image
-
-            blen_uvs = me.uv_layers[0]
-            for face_uvidx, lidx in izip(face_vert_tex_indices, blen_poly.loop_indices):
-                blen_uvs.data[lidx].uv = verts_tex[0 if (face_uvidx is ...) else face_uvidx]
+            uv_faces = me.uv_textures[0].data
+            images = [unique_material_images.get(name) for name in faces.materials]
+            for i, (lidx, material) in enumerate(izip(faces_loop_start, faces_material)):
+                if material and loops_tex[lidx] != -1:
+                    image = images[material]
+                    if image:  # Can be none if the material dosnt have an image.
+                        uv_faces[i].image = image
 
     use_edges = use_edges and bool(edges)
     if use_edges:
@@ -754,7 +826,9 @@ def create_nurbs(context_nurbs, vert_loc, new_objects):
 
     nu = cu.splines.new('NURBS')
     nu.points.add(len(curv_idx) - 1)  # a point is added to start with
-    nu.points.foreach_set("co", [co_axis for vt_idx in curv_idx for co_axis in (vert_loc[vt_idx] + (1.0,))])
+    # vert_loc is a flat array of coordinates
+    nu.points.foreach_set("co", [co_axis for vt_idx in curv_idx
+                                 for co_axis in (vert_loc[vt_idx * 3:vt_idx * 3 + 3].tolist() + [1.0])])
 
     nu.order_u = deg[0] + 1
 
@@ -828,6 +902,50 @@ def get_float_func(filepath):
     return float
 
 
+def fast_parse_data(geom):
+    """
+    Data as made by the regular parser, from the arrays of parse_obj.
+    """
+    faces = OBJFaces()
+    faces.loc = geom.face_loc
+    faces.start = geom.face_start
+    tot = len(geom.face_loc)
+    faces.nor = geom.face_nor if geom.face_nor else array.array('i', [-1]) * tot
+    faces.tex = geom.face_tex if geom.face_tex else array.array('i', [-1]) * tot
+
+    # corners missing from a face having some use the first one, as in OBJFaces.append
+    for data in (faces.nor, faces.tex):
+        if max(data or [-1]) != -1 and -1 in data:
+            for f in xrange(len(geom)):
+                s, e = faces.start[f], faces.start[f + 1]
+                indices = data[s:e]
+                if -1 in indices and max(indices) != -1:
+                    data[s:e] = array.array('i', [i if i != -1 else 0 for i in indices])
+
+    vertex_groups = {}
+    runs = geom.runs + [[len(geom)] + [None] * 5]
+    for run, run_next in izip(runs[:-1], runs[1:]):
+        first, is_line, context_material, context_smooth_group, context_object, context_vgroup = run
+        count = run_next[0] - first
+        faces.kind.extend(array.array('b', [FACE_LINE if is_line else FACE]) * count)
+        faces.material.extend(array.array('i', [faces.name_id(0, context_material)]) * count)
+        faces.smooth_group.extend(array.array('i', [faces.name_id(1, context_smooth_group)]) * count)
+        faces.object.extend(array.array('i', [faces.name_id(2, context_object)]) * count)
+
+        if context_vgroup and not is_line:
+            vertex_groups.setdefault(context_vgroup, array.array('i')).extend(
+                    faces.loc[faces.start[first]:faces.start[run_next[0]]])
+
+    for f in geom.face_invalid:
+        faces.kind[f] = FACE_INVALID
+
+    unique_materials = dict.fromkeys(geom.unique_materials)
+    unique_smooth_groups = dict.fromkeys(geom.unique_smooth_groups)
+
+    return (geom.verts_loc, geom.verts_nor, geom.verts_tex, faces, geom.material_libs,
+            unique_materials, unique_smooth_groups, vertex_groups)
+
+
 def load(operator, context, filepath,
          global_clamp_size=0.0,
          use_smooth_groups=True,
@@ -836,6 +954,8 @@ def load(operator, context, filepath,
          use_split_groups=True,
          use_image_search=True,
          use_groups_as_vgroups=False,
+         use_fast_parse=False,
+         parse_processes=1,
          relpath=None,
          global_matrix=None,
          ):
@@ -853,23 +973,9 @@ def load(operator, context, filepath,
         elif context_multi_line == tag:
             vec += [float_func(v) for v in line_split]
         if not ret_context_multi_line:
-            data.append(tuple(vec[:vec_len]))
+            data.extend((vec + [0.0] * vec_len)[:vec_len])
         return ret_context_multi_line
 
-    def create_face(context_material, context_smooth_group, context_object):
-        face_vert_loc_indices = []
-        face_vert_nor_indices = []
-        face_vert_tex_indices = []
-        return (
-            face_vert_loc_indices,
-            face_vert_nor_indices,
-            face_vert_tex_indices,
-            context_material,
-            context_smooth_group,
-            context_object,
-            [],  # If non-empty, that face is a Blender-invalid ngon (holes...), need a mutable object for that...
-        )
-
     with ProgressReport(context.window_manager) as progress:
         progress.enter_substeps(1, "Importing OBJ %r..." % filepath)
 
@@ -881,10 +987,10 @@ def load(operator, context, filepath,
 
         time_main = time.time()
 
-        verts_loc = []
-        verts_nor = []
-        verts_tex = []
-        faces = []  # tuples of the faces
+        verts_loc = array.array('f')  # flat coordinates
+        verts_nor = array.array('f')
+        verts_tex = array.array('f')
+        faces = OBJFaces()
         material_libs = []  # filanems to material libs this uses
         vertex_groups = {}  # when use_groups_as_vgroups is true
 
@@ -920,208 +1026,229 @@ def load(operator, context, filepath,
         face_vert_tex_indices = None
         face_vert_nor_valid = face_vert_tex_valid = False
         face_items_usage = set()
-        face_invalid_blenpoly = None
+        face_invalid_blenpoly = None  # If non-empty, that face is a Blender-invalid ngon (holes...)
         prev_vidx = None
-        face = None
         vec = []
 
         progress.enter_substeps(3, "Parsing OBJ file...")
-        with open(filepath, 'rb') as f:
-            for line in f:  # .readlines():
-                line_split = line.split()
-
-                if not line_split:
-                    continue
-
-                line_start = line_split[0]  # we compare with this a _lot_
-
-                if line_start == 'v' or context_multi_line == 'v':
-                    context_multi_line = handle_vec(line_start, context_multi_line, line_split, 'v', verts_loc, vec, 3)
-
-                elif line_start == 'vn' or context_multi_line == 'vn':
-                    context_multi_line = handle_vec(line_start, context_multi_line, line_split, 'vn', verts_nor, vec, 3)
-
-                elif line_start == 'vt' or context_multi_line == 'vt':
-                    context_multi_line = handle_vec(line_start, context_multi_line, line_split, 'vt', verts_tex, vec, 2)
-
-                # Handle faces lines (as faces) and the second+ lines of fa multiline face here
-                # use 'f' not 'f ' because some objs (very rare have 'fo ' for faces)
-                elif line_start == 'f' or context_multi_line == 'f':
-                    if not context_multi_line:
-                        line_split = line_split[1:]
-                        # Instantiate a face
-                        face = create_face(context_material, context_smooth_group, context_object)
-                        (face_vert_loc_indices, face_vert_nor_indices, face_vert_tex_indices,
-                         _1, _2, _3, face_invalid_blenpoly) = face
-                        faces.append(face)
-                        face_items_usage.clear()
-                    # Else, use face_vert_loc_indices and face_vert_tex_indices previously defined and used the obj_face
-
-                    context_multi_line = 'f' if strip_slash(line_split) else ''
-
-                    for v in line_split:
-                        obj_vert = v.split('/')
-                        idx = int(obj_vert[0]) - 1
-                        vert_loc_index = (idx + len(verts_loc) + 1) if (idx < 0) else idx
-                        # Add the vertex to the current group
-                        # *warning*, this wont work for files that have groups defined around verts
-                        if use_groups_as_vgroups and context_vgroup:
-                            vertex_groups[context_vgroup].append(vert_loc_index)
-                        # This a first round to quick-detect ngons that *may* use a same edge more than once.
-                        # Potential candidate will be re-checked once we have done parsing the whole face.
-                        if not face_invalid_blenpoly:
-                            # If we use more than once a same vertex, invalid ngon is suspected.
-                            if vert_loc_index in face_items_usage:
-                                face_invalid_blenpoly.append(True)
-                            else:
-                                face_items_usage.add(vert_loc_index)
-                        face_vert_loc_indices.append(vert_loc_index)
-
-                        # formatting for faces with normals and textures is
-                        # loc_index/tex_index/nor_index
-                        if len(obj_vert) > 1 and obj_vert[1]:
-                            idx = int(obj_vert[1]) - 1
-                            face_vert_tex_indices.append((idx + len(verts_tex) + 1) if (idx < 0) else idx)
-                            face_vert_tex_valid = True
-                        else:
-                            face_vert_tex_indices.append(...)
-
-                        if len(obj_vert) > 2 and obj_vert[2]:
-                            idx = int(obj_vert[2]) - 1
-                            face_vert_nor_indices.append((idx + len(verts_nor) + 1) if (idx < 0) else idx)
-                            face_vert_nor_valid = True
-                        else:
-                            face_vert_nor_indices.append(...)
-
-                    if not context_multi_line:
-                        # Clear nor/tex indices in case we had none defined for this face.
-                        if not face_vert_nor_valid:
-                            face_vert_nor_indices.clear()
-                        if not face_vert_tex_valid:
-                            face_vert_tex_indices.clear()
-                        face_vert_nor_valid = face_vert_tex_valid = False
-
-                        # Means we have finished a face, we have to do final check if ngon is suspected to be blender-invalid...
-                        if face_invalid_blenpoly:
-                            face_invalid_blenpoly.clear()
+        geom = None
+        if use_fast_parse:
+            try:
+                geom = parse_obj.parse(filepath,
+                                       processes=parse_processes,
+                                       use_comma=float_func is not float,
+                                       use_smooth_groups=use_smooth_groups,
+                                       use_edges=use_edges,
+                                       use_split_objects=use_split_objects,
+                                       use_split_groups=use_split_groups,
+                                       use_groups_as_vgroups=use_groups_as_vgroups,
+                                       )
+            except parse_obj.UnsupportedError, e:
+                print "\t%s, using the regular parser" % e
+
+        if geom is not None:
+            (verts_loc, verts_nor, verts_tex, faces, material_libs,
+             unique_materials, unique_smooth_groups, vertex_groups) = fast_parse_data(geom)
+        else:
+            with open(filepath, 'rb') as f:
+                for line in f:  # .readlines():
+                    line_split = line.split()
+
+                    if not line_split:
+                        continue
+
+                    line_start = line_split[0]  # we compare with this a _lot_
+
+                    if line_start == 'v' or context_multi_line == 'v':
+                        context_multi_line = handle_vec(line_start, context_multi_line, line_split, 'v', verts_loc, vec, 3)
+
+                    elif line_start == 'vn' or context_multi_line == 'vn':
+                        context_multi_line = handle_vec(line_start, context_multi_line, line_split, 'vn', verts_nor, vec, 3)
+
+                    elif line_start == 'vt' or context_multi_line == 'vt':
+                        context_multi_line = handle_vec(line_start, context_multi_line, line_split, 'vt', verts_tex, vec, 2)
+
+                    # Handle faces lines (as faces) and the second+ lines of fa multiline face here
+                    # use 'f' not 'f ' because some objs (very rare have 'fo ' for faces)
+                    elif line_start == 'f' or context_multi_line == 'f':
+                        if not context_multi_line:
+                            line_split = line_split[1:]
+                            # Instantiate a face
+                            face_vert_loc_indices = []
+                            face_vert_nor_indices = []
+                            face_vert_tex_indices = []
+                            face_invalid_blenpoly = []
                             face_items_usage.clear()
-                            prev_vidx = face_vert_loc_indices[-1]
-                            for vidx in face_vert_loc_indices:
-                                edge_key = (prev_vidx, vidx) if (prev_vidx < vidx) else (vidx, prev_vidx)
-                                if edge_key in face_items_usage:
+                        # Else, use face_vert_loc_indices and face_vert_tex_indices previously defined and used the obj_face
+
+                        context_multi_line = 'f' if strip_slash(line_split) else ''
+
+                        for v in line_split:
+                            obj_vert = v.split('/')
+                            idx = int(obj_vert[0]) - 1
+                            vert_loc_index = (idx + len(verts_loc) // 3 + 1) if (idx < 0) else idx
+                            # Add the vertex to the current group
+                            # *warning*, this wont work for files that have groups defined around verts
+                            if use_groups_as_vgroups and context_vgroup:
+                                vertex_groups[context_vgroup].append(vert_loc_index)
+                            # This a first round to quick-detect ngons that *may* use a same edge more than once.
+                            # Potential candidate will be re-checked once we have done parsing the whole face.
+                            if not face_invalid_blenpoly:
+                                # If we use more than once a same vertex, invalid ngon is suspected.
+                                if vert_loc_index in face_items_usage:
                                     face_invalid_blenpoly.append(True)
-                                    break
-                                face_items_usage.add(edge_key)
-                                prev_vidx = vidx
-
-                elif use_edges and (line_start == 'l' or context_multi_line == 'l'):
-                    # very similar to the face load function above with some parts removed
-                    if not context_multi_line:
-                        line_split = line_split[1:]
-                        # Instantiate a face
-                        face = create_face(context_material, context_smooth_group, context_object)
-                        face_vert_loc_indices = face[0]
-                        # XXX A bit hackish, we use special 'value' of face_vert_nor_indices (a single True item) to tag this
-                        #     as a polyline, and not a regular face...
-                        face[1][:] = [True]
-                        faces.append(face)
-                    # Else, use face_vert_loc_indices previously defined and used the obj_face
-
-                    context_multi_line = 'l' if strip_slash(line_split) else ''
-
-                    for v in line_split:
-                        obj_vert = v.split('/')
-                        idx = int(obj_vert[0]) - 1
-                        face_vert_loc_indices.append((idx + len(verts_loc) + 1) if (idx < 0) else idx)
-
-                elif line_start == 's':
-                    if use_smooth_groups:
-                        context_smooth_group = line_value(line_split)
-                        if context_smooth_group == 'off':
-                            context_smooth_group = None
-                        elif context_smooth_group:  # is not None
-                            unique_smooth_groups[context_smooth_group] = None
-
-                elif line_start == 'o':
-                    if use_split_objects:
-                        context_object = line_value(line_split)
-                        # unique_obects[context_object]= None
-
-                elif line_start == 'g':
-                    if use_split_groups:
-                        context_object = line_value(line.split())
-                        # print 'context_object', context_object
-                        # unique_obects[context_object]= None
-                    elif use_groups_as_vgroups:
-                        context_vgroup = line_value(line.split())
-                        if context_vgroup and context_vgroup != '(null)':
-                            vertex_groups.setdefault(context_vgroup, [])
+                                else:
+                                    face_items_usage.add(vert_loc_index)
+                            face_vert_loc_indices.append(vert_loc_index)
+
+                            # formatting for faces with normals and textures is
+                            # loc_index/tex_index/nor_index
+                            if len(obj_vert) > 1 and obj_vert[1]:
+                                idx = int(obj_vert[1]) - 1
+                                face_vert_tex_indices.append((idx + len(verts_tex) // 2 + 1) if (idx < 0) else idx)
+                                face_vert_tex_valid = True
+                            else:
+                                face_vert_tex_indices.append(-1)
+
+                            if len(obj_vert) > 2 and obj_vert[2]:
+                                idx = int(obj_vert[2]) - 1
+                                face_vert_nor_indices.append((idx + len(verts_nor) // 3 + 1) if (idx < 0) else idx)
+                                face_vert_nor_valid = True
+                            else:
+                                face_vert_nor_indices.append(-1)
+
+                        if not context_multi_line:
+                            # Clear nor/tex indices in case we had none defined for this face.
+                            if not face_vert_nor_valid:
+                                del face_vert_nor_indices[:]
+                            if not face_vert_tex_valid:
+                                del face_vert_tex_indices[:]
+                            face_vert_nor_valid = face_vert_tex_valid = False
+
+                            # Means we have finished a face, we have to do final check if ngon is suspected to be blender-invalid...
+                            if face_invalid_blenpoly:
+                                del face_invalid_blenpoly[:]
+                                face_items_usage.clear()
+                                prev_vidx = face_vert_loc_indices[-1]
+                                for vidx in face_vert_loc_indices:
+                                    edge_key = (prev_vidx, vidx) if (prev_vidx < vidx) else (vidx, prev_vidx)
+                                    if edge_key in face_items_usage:
+                                        face_invalid_blenpoly.append(True)
+                                        break
+                                    face_items_usage.add(edge_key)
+                                    prev_vidx = vidx
+
+                            faces.append(face_vert_loc_indices, face_vert_nor_indices, face_vert_tex_indices,
+                                         context_material, context_smooth_group, context_object,
+                                         FACE_INVALID if face_invalid_blenpoly else FACE)
+
+                    elif use_edges and (line_start == 'l' or context_multi_line == 'l'):
+                        # very similar to the face load function above with some parts removed
+                        if not context_multi_line:
+                            line_split = line_split[1:]
+                            # Instantiate a polyline
+                            face_vert_loc_indices = []
+                        # Else, use face_vert_loc_indices previously defined and used the obj_face
+
+                        context_multi_line = 'l' if strip_slash(line_split) else ''
+
+                        for v in line_split:
+                            obj_vert = v.split('/')
+                            idx = int(obj_vert[0]) - 1
+                            face_vert_loc_indices.append((idx + len(verts_loc) // 3 + 1) if (idx < 0) else idx)
+
+                        if not context_multi_line:
+                            faces.append(face_vert_loc_indices, [], [],
+                                         context_material, context_smooth_group, context_object, FACE_LINE)
+
+                    elif line_start == 's':
+                        if use_smooth_groups:
+                            context_smooth_group = line_value(line_split)
+                            if context_smooth_group == 'off':
+                                context_smooth_group = None
+                            elif context_smooth_group:  # is not None
+                                unique_smooth_groups[context_smooth_group] = None
+
+                    elif line_start == 'o':
+                        if use_split_objects:
+                            context_object = line_value(line_split)
+                            # unique_obects[context_object]= None
+
+                    elif line_start == 'g':
+                        if use_split_groups:
+                            context_object = line_value(line.split())
+                            # print 'context_object', context_object
+                            # unique_obects[context_object]= None
+                        elif use_groups_as_vgroups:
+                            context_vgroup = line_value(line.split())
+                            if context_vgroup and context_vgroup != '(null)':
+                                vertex_groups.setdefault(context_vgroup, array.array('i'))
+                            else:
+                                context_vgroup = None  # dont assign a vgroup
+
+                    elif line_start == 'usemtl':
+                        context_material = line_value(line.split())
+                        unique_materials[context_material] = None
+                    elif line_start == 'mtllib':  # usemap or usemat
+                        # can have multiple mtllib filenames per line, mtllib can appear more than once,
+                        # so make sure only occurrence of material exists
+                        material_libs = list(set(material_libs) | set(line.split()[1:]))
+
+                        # Nurbs support
+                    elif line_start == 'cstype':
+                        context_nurbs['cstype'] = line_value(line.split())  # 'rat bspline' / 'bspline'
+                    elif line_start == 'curv' or context_multi_line == 'curv':
+                        curv_idx = context_nurbs['curv_idx'] = context_nurbs.get('curv_idx', [])  # in case were multiline
+
+                        if not context_multi_line:
+                            context_nurbs['curv_range'] = float_func(line_split[1]), float_func(line_split[2])
+                            line_split[0:3] = []  # remove first 3 items
+
+                        if strip_slash(line_split):
+                            context_multi_line = 'curv'
                         else:
-                            context_vgroup = None  # dont assign a vgroup
-
-                elif line_start == 'usemtl':
-                    context_material = line_value(line.split())
-                    unique_materials[context_material] = None
-                elif line_start == 'mtllib':  # usemap or usemat
-                    # can have multiple mtllib filenames per line, mtllib can appear more than once,
-                    # so make sure only occurrence of material exists
-                    material_libs = list(set(material_libs) | set(line.split()[1:]))
-
-                    # Nurbs support
-                elif line_start == 'cstype':
-                    context_nurbs['cstype'] = line_value(line.split())  # 'rat bspline' / 'bspline'
-                elif line_start == 'curv' or context_multi_line == 'curv':
-                    curv_idx = context_nurbs['curv_idx'] = context_nurbs.get('curv_idx', [])  # in case were multiline
-
-                    if not context_multi_line:
-                        context_nurbs['curv_range'] = float_func(line_split[1]), float_func(line_split[2])
-                        line_split[0:3] = []  # remove first 3 items
-
-                    if strip_slash(line_split):
-                        context_multi_line = 'curv'
-                    else:
-                        context_multi_line = ''
+                            context_multi_line = ''
 
-                    for i in line_split:
-                        vert_loc_index = int(i) - 1
+                        for i in line_split:
+                            vert_loc_index = int(i) - 1
 
-                        if vert_loc_index < 0:
-                            vert_loc_index = len(verts_loc) + vert_loc_index + 1
+                            if vert_loc_index < 0:
+                                vert_loc_index = len(verts_loc) // 3 + vert_loc_index + 1
 
-                        curv_idx.append(vert_loc_index)
+                            curv_idx.append(vert_loc_index)
 
-                elif line_start == 'parm' or context_multi_line == 'parm':
-                    if context_multi_line:
-                        context_multi_line = ''
-                    else:
-                        context_parm = line_split[1]
-                        line_split[0:2] = []  # remove first 2
+                    elif line_start == 'parm' or context_multi_line == 'parm':
+                        if context_multi_line:
+                            context_multi_line = ''
+                        else:
+                            context_parm = line_split[1]
+                            line_split[0:2] = []  # remove first 2
 
-                    if strip_slash(line_split):
-                        context_multi_line = 'parm'
-                    else:
-                        context_multi_line = ''
-
-                    if context_parm.lower() == 'u':
-                        context_nurbs.setdefault('parm_u', []).extend([float_func(f) for f in line_split])
-                    elif context_parm.lower() == 'v':  # surfaces not supported yet
-                        context_nurbs.setdefault('parm_v', []).extend([float_func(f) for f in line_split])
-                    # else: # may want to support other parm's ?
-
-                elif line_start == 'deg':
-                    context_nurbs['deg'] = [int(i) for i in line.split()[1:]]
-                elif line_start == 'end':
-                    # Add the nurbs curve
-                    if context_object:
-                        context_nurbs['name'] = context_object
-                    nurbs.append(context_nurbs)
-                    context_nurbs = {}
-                    context_parm = ''
-
-                ''' # How to use usemap? depricated?
-                elif line_start == b'usema': # usemap or usemat
-                    context_image= line_value(line_split)
-                '''
+                        if strip_slash(line_split):
+                            context_multi_line = 'parm'
+                        else:
+                            context_multi_line = ''
+
+                        if context_parm.lower() == 'u':
+                            context_nurbs.setdefault('parm_u', []).extend([float_func(f) for f in line_split])
+                        elif context_parm.lower() == 'v':  # surfaces not supported yet
+                            context_nurbs.setdefault('parm_v', []).extend([float_func(f) for f in line_split])
+                        # else: # may want to support other parm's ?
+
+                    elif line_start == 'deg':
+                        context_nurbs['deg'] = [int(i) for i in line.split()[1:]]
+                    elif line_start == 'end':
+                        # Add the nurbs curve
+                        if context_object:
+                            context_nurbs['name'] = context_object
+                        nurbs.append(context_nurbs)
+                        context_nurbs = {}
+                        context_parm = ''
+
+                    ''' # How to use usemap? depricated?
+                    elif line_start == b'usema': # usemap or usemat
+                        context_image= line_value(line_split)
+                    '''
 
         progress.step("Done, loading materials and images...")
 
@@ -1129,7 +1256,7 @@ def load(operator, context, filepath,
                          unique_material_images, use_image_search, float_func)
 
         progress.step("Done, building geometries (verts:%i faces:%i materials: %i smoothgroups:%i) ..." %
-                      (len(verts_loc), len(faces), len(unique_materials), len(unique_smooth_groups)))
+                      (len(verts_loc) // 3, len(faces), len(unique_materials), len(unique_smooth_groups)))
 
         # deselect all
         if bpy.ops.object.select_all.poll():
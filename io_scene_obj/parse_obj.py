@@ -0,0 +1,548 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+"""
+Fast OBJ geometry parser.
+
+Instead of handling the file line by line, runs of consecutive vertex lines
+(v, vt and vn) or face lines are matched at once, and converted with a single
+split and conversion each, into flat arrays.
+
+The file can also be cut at line boundaries into chunks parsed by a pool of
+processes, then merged in order. Negative (relative) indices are resolved using
+the number of elements in the chunks before, counted in a first quick pass.
+
+Curves and surfaces (cstype, curv, parm...) are not supported, UnsupportedError
+is raised for them.
+"""
+
+from __future__ import division
+from __future__ import absolute_import
+import array
+import os
+import re
+from operator import eq
+from itertools import izip
+
+CHUNK_SIZE = 64 * 1024 * 1024  # bytes parsed at once
+
+# runs of lines of one kind, or any other single line
+_RUN_RE = re.compile(br"(?P<v>(?:[ \t]*v[tn]?[ \t][^\n]*\n)+)"
+                     br"|(?P<f>(?:[ \t]*f[ \t][^\n]*\n)+)"
+                     br"|[^\n]*\n")
+_CONTINUATION_RE = re.compile(br"\\[ \t\r]*\n")
+_FACE_TAG_RE = re.compile(br"^[ \t]*f(?=[ \t])", re.MULTILINE)
+_VEC_TAGS = (b'v', b'vt', b'vn')
+_VEC_LINE_RE = {tag: re.compile(br"^[ \t]*" + tag + br"[ \t]([^\n]*)", re.MULTILINE) for tag in _VEC_TAGS}
+_COUNT_RE = re.compile(br"^[ \t]*(v[tn]?)[ \t]", re.MULTILINE)
+
+
+def _face_run_re(corner):
+    return re.compile(br"(?:[ \t]*f(?:[ \t]+" + corner + br")+[ \t\r]*\n)*\Z")
+
+# runs of face lines whose corners all have the format (stride, separator) of the first one
+_INDEX = br"[^\s/]+"
+_FACE_RUN_RES = {
+    (1, None): _face_run_re(_INDEX),
+    (2, b"/"): _face_run_re(_INDEX + b"/" + _INDEX),
+    (2, b"//"): _face_run_re(_INDEX + b"//" + _INDEX),
+    (3, b"/"): _face_run_re(_INDEX + b"/" + _INDEX + b"/" + _INDEX),
+    }
+
+_UNSUPPORTED = set([b'cstype', b'curv', b'curv2', b'surf', b'parm', b'deg', b'end', b'trim', b'hole'])
+
+# context not known at the start of a chunk, taken from the chunk before when merging
+INHERIT = b"\0inherit"
+
+# context indices
+MATERIAL, SMOOTH, OBJECT, VGROUP = xrange(4)
+
+
+class UnsupportedError(Exception):
+    pass
+
+
+def _line_value(line_split):
+    # same as import_obj.line_value
+    if len(line_split) == 1:
+        return None
+    elif len(line_split) == 2:
+        return line_split[1]
+    return b' '.join(line_split[1:])
+
+
+def _resolve(values, count):
+    """
+    OBJ indices (1 based, negative ones relative to the count of elements so far)
+    to an array of 0 based indices.
+    """
+    if not values or min(values) > 0:
+        return array.array('i', map((-1).__add__, values))
+    return array.array('i', [(v - 1) if v > 0 else (v + count) for v in values])
+
+
+def _unique_extend(dst, items):
+    for item in items:
+        if item not in dst:
+            dst.append(item)
+
+
+class OBJGeometry(object):
+    """
+    Geometry of an OBJ file, in flat arrays.
+
+    - verts_loc, verts_nor, verts_tex: coordinates, 3, 3 and 2 per vertex.
+    - face_loc: vertex indices of all faces (and polylines), one after the other.
+    - face_nor, face_tex: normal and uv indices matching face_loc, -1 where missing,
+      or empty if there are none at all.
+    - face_start: index in face_loc of the first corner of each face, plus the total.
+    - face_invalid: indices of faces using an edge more than once (ngons with holes).
+    - runs: context of faces, [first face, is_line, material, smooth, object, vgroup],
+      each run applying until the next one.
+    """
+    __slots__ = (
+        "verts_loc", "verts_nor", "verts_tex",
+        "face_loc", "face_nor", "face_tex", "face_start", "face_invalid",
+        "runs", "context", "material_libs", "unique_materials", "unique_smooth_groups",
+        )
+
+    def __init__(self, context=None):
+        self.verts_loc = array.array('f')
+        self.verts_nor = array.array('f')
+        self.verts_tex = array.array('f')
+        self.face_loc = array.array('i')
+        self.face_nor = array.array('i')
+        self.face_tex = array.array('i')
+        self.face_start = array.array('i', [0])
+        self.face_invalid = array.array('i')
+        self.runs = []
+        # material, smooth group, object and vertex group after the last line
+        self.context = [None] * 4 if context is None else context
+        self.material_libs = []
+        self.unique_materials = []
+        self.unique_smooth_groups = []
+
+    def __len__(self):
+        return len(self.face_start) - 1
+
+    def counts(self):
+        return len(self.verts_loc) // 3, len(self.verts_tex) // 2, len(self.verts_nor) // 3
+
+    def pack(self):
+        # arrays are pickled as lists of numbers otherwise, very slow
+        state = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            state[name] = (value.typecode, value.tostring()) if isinstance(value, array.array) else value
+        return state
+
+    @classmethod
+    def unpack(cls, state):
+        geom = cls.__new__(cls)
+        for name, value in state.items():
+            if name in ("runs", "context", "material_libs", "unique_materials", "unique_smooth_groups"):
+                setattr(geom, name, value)
+            else:
+                data = array.array(value[0])
+                data.fromstring(value[1])
+                setattr(geom, name, data)
+        return geom
+
+    def _add_indices(self, name, values, corners_before):
+        # keep optional corner arrays either empty or aligned with face_loc (already extended)
+        data = getattr(self, name)
+        if values is None:
+            if len(data):
+                data.extend(array.array('i', [-1]) * (len(self.face_loc) - len(data)))
+            return
+        if len(data) < corners_before:
+            data.extend(array.array('i', [-1]) * (corners_before - len(data)))
+        data.extend(values)
+
+    def add_run(self, is_line):
+        run = self.runs[-1] if self.runs else None
+        context = self.context
+        if (run is None or run[1] != is_line or run[2] != context[MATERIAL] or run[3] != context[SMOOTH] or
+                run[4] != context[OBJECT] or run[5] != context[VGROUP]):
+            self.runs.append([len(self), is_line] + context)
+
+    def add_faces(self, loc, tex, nor, starts):
+        """Add faces, starts being the index of their first corner in loc, followed by len(loc)."""
+        corners_before = len(self.face_loc)
+        self.face_loc.extend(loc)
+        self._add_indices("face_tex", tex, corners_before)
+        self._add_indices("face_nor", nor, corners_before)
+        self.face_start.extend(array.array('i', map(corners_before.__add__, starts[1:])))
+
+    def extend(self, other):
+        """Append geometry parsed after this one."""
+        faces_before = len(self)
+        corners_before = len(self.face_loc)
+
+        self.verts_loc.extend(other.verts_loc)
+        self.verts_nor.extend(other.verts_nor)
+        self.verts_tex.extend(other.verts_tex)
+
+        self.face_loc.extend(other.face_loc)
+        self._add_indices("face_tex", other.face_tex if len(other.face_tex) else None, corners_before)
+        self._add_indices("face_nor", other.face_nor if len(other.face_nor) else None, corners_before)
+        self.face_start.extend(array.array('i', map(corners_before.__add__, other.face_start[1:])))
+        self.face_invalid.extend(array.array('i', map(faces_before.__add__, other.face_invalid)))
+
+        # context of the other chunk start is the one at the end of this one
+        context = self.context
+        for run in other.runs:
+            run[0] += faces_before
+            run[2:] = [context[i] if value == INHERIT else value for i, value in enumerate(run[2:])]
+            if not self.runs or self.runs[-1][1:] != run[1:]:
+                self.runs.append(run)
+        self.context = [context[i] if value == INHERIT else value for i, value in enumerate(other.context)]
+
+        _unique_extend(self.material_libs, other.material_libs)
+        _unique_extend(self.unique_materials, other.unique_materials)
+        _unique_extend(self.unique_smooth_groups, other.unique_smooth_groups)
+
+
+class _ChunkParser(object):
+    def __init__(self, counts, use_comma=False, use_smooth_groups=True, use_edges=True,
+                 use_split_objects=True, use_split_groups=True, use_groups_as_vgroups=False):
+        # counts of vertices, uvs and normals before this chunk
+        self.counts = counts
+        self.use_comma = use_comma
+        self.use_smooth_groups = use_smooth_groups
+        self.use_edges = use_edges
+        self.use_split_objects = use_split_objects
+        self.use_split_groups = use_split_groups
+        self.use_groups_as_vgroups = use_groups_as_vgroups and not (use_split_objects or use_split_groups)
+        self.geom = OBJGeometry([INHERIT] * 4)
+
+    def feed(self, data):
+        if b'\\' in data:
+            data = _CONTINUATION_RE.sub(b" ", data)
+        if not data.endswith(b"\n"):
+            data += b"\n"
+
+        for m in _RUN_RE.finditer(data):
+            kind = m.lastgroup
+            if kind == 'v':
+                self.parse_vectors(m.group())
+            elif kind == 'f':
+                self.parse_faces(m.group())
+            else:
+                self.parse_line(m.group())
+
+    def parse_vectors(self, run):
+        # v, vt and vn lines, often interleaved
+        if self.use_comma:
+            run = run.replace(b',', b'.')
+
+        tags = [tag for tag in _VEC_TAGS if (tag + b' ') in run or (tag + b'\t') in run]
+        if len(tags) == 1:
+            self.add_vectors(tags[0], run, run.count(b"\n"))
+        else:
+            for tag in tags:
+                lines = _VEC_LINE_RE[tag].findall(run)
+                if lines:
+                    self.add_vectors(tag, tag + b" " + (b"\n" + tag + b" ").join(lines) + b"\n", len(lines))
+
+    def add_vectors(self, tag, run, tot):
+        geom = self.geom
+        if tag == b'v':
+            vec_len, data = 3, geom.verts_loc
+        elif tag == b'vt':
+            vec_len, data = 2, geom.verts_tex
+        else:
+            vec_len, data = 3, geom.verts_nor
+
+        tokens = run.split()
+        stride = len(tokens) // tot
+
+        # tags all found at the same interval: same number of values on all lines
+        if stride > 1 and stride * tot == len(tokens) and tokens[::stride].count(tag) == tot:
+            vecs = array.array('f', [0.0]) * (tot * vec_len)
+            for i in xrange(min(vec_len, stride - 1)):
+                vecs[i::vec_len] = array.array('f', map(float, tokens[i + 1::stride]))
+            data.extend(vecs)
+        else:
+            for line in run.splitlines():
+                values = [float(v) for v in line.split()[1:vec_len + 1]]
+                data.extend(values + [0.0] * (vec_len - len(values)))
+
+    def parse_faces(self, run):
+        geom = self.geom
+        tot = run.count(b"\n")
+
+        first = run.split(None, 2)
+        if len(first) < 2:
+            first = b""
+        else:
+            first = first[1]
+
+        if b"//" in first:
+            stride, has_tex, has_nor = 2, False, True
+            sep = b"//"
+        elif b"/" in first:
+            stride, has_tex, has_nor = first.count(b"/") + 1, True, first.count(b"/") == 2
+            sep = b"/"
+        else:
+            stride, has_tex, has_nor = 1, False, False
+            sep = None
+
+        run_re = _FACE_RUN_RES.get((stride, sep))
+        if run_re is None or not run_re.match(run):
+            # corners of different formats in the run
+            self.parse_face_lines(run)
+            return
+
+        try:
+            tokens = (run.replace(sep, b" ") if sep else run).split()
+            length = len(tokens) // tot
+            if (length > 1 and length * tot == len(tokens) and (length - 1) % stride == 0 and
+                    tokens[::length].count(b'f') == tot):
+                # same number of corners in all faces
+                arity = (length - 1) // stride
+                del tokens[::length]
+                values = map(int, tokens)
+                starts = array.array('i', xrange(0, len(values) // stride + 1, arity))
+            else:
+                arity = 0
+                body = _FACE_TAG_RE.sub(b"", run)
+                values = map(int, (body.replace(sep, b" ") if sep else body).split())
+                starts = array.array('i', [0])
+                for line in body.splitlines():
+                    starts.append(starts[-1] + len(line.split()))
+
+            tot_corners = len(values) // stride
+            valid = len(values) == tot_corners * stride and starts[-1] == tot_corners
+        except ValueError:
+            valid = False
+
+        if not valid:
+            # invalid indices
+            self.parse_face_lines(run)
+            return
+
+        tot_v, tot_vt, tot_vn = self.counts
+        loc = _resolve(values[0::stride], tot_v + len(geom.verts_loc) // 3)
+        tex = _resolve(values[1::stride], tot_vt + len(geom.verts_tex) // 2) if has_tex else None
+        nor = _resolve(values[stride - 1::stride], tot_vn + len(geom.verts_nor) // 3) if has_nor else None
+
+        self.add_faces(loc, tex, nor, starts, arity)
+
+    def parse_face_lines(self, run):
+        for line in run.splitlines():
+            self.parse_face_line(line.split()[1:])
+
+    def parse_face_line(self, corners):
+        # any mix of corner formats, one face
+        if not corners:
+            return
+
+        tot_v, tot_vt, tot_vn = self.counts
+        geom = self.geom
+        tot_vt += len(geom.verts_tex) // 2
+        tot_vn += len(geom.verts_nor) // 3
+        loc = []
+        tex = []
+        nor = []
+        for corner in corners:
+            obj_vert = corner.split(b'/')
+            loc.append(int(obj_vert[0]))
+
+            vt = int(obj_vert[1]) if len(obj_vert) > 1 and obj_vert[1] else 0
+            tex.append(-1 if vt == 0 else (vt - 1) if vt > 0 else (vt + tot_vt))
+            vn = int(obj_vert[2]) if len(obj_vert) > 2 and obj_vert[2] else 0
+            nor.append(-1 if vn == 0 else (vn - 1) if vn > 0 else (vn + tot_vn))
+
+        self.add_faces(_resolve(loc, tot_v + len(geom.verts_loc) // 3),
+                       array.array('i', tex) if max(tex) != -1 else None,
+                       array.array('i', nor) if max(nor) != -1 else None,
+                       array.array('i', (0, len(loc))), 0)
+
+    def add_faces(self, loc, tex, nor, starts, arity):
+        geom = self.geom
+        faces_before = len(geom)
+        corners_before = len(geom.face_loc)
+        geom.add_run(False)
+        geom.add_faces(loc, tex, nor, starts)
+
+        # faces using a vertex more than once might be invalid ngons
+        if arity and arity <= 4:
+            suspects = []
+            for i in xrange(arity):
+                for j in xrange(i + 1, arity):
+                    same = map(eq, loc[i::arity], loc[j::arity])
+                    if any(same):
+                        suspects.extend(f for f, s in enumerate(same) if s)
+            suspects = sorted(set(suspects))
+        else:
+            suspects = [f for f in xrange(len(starts) - 1)
+                        if len(set(loc[starts[f]:starts[f + 1]])) != starts[f + 1] - starts[f]]
+
+        for f in suspects:
+            face = geom.face_loc[corners_before + starts[f]:corners_before + starts[f + 1]]
+            edges = set()
+            prev_vidx = face[-1]
+            for vidx in face:
+                edge_key = (prev_vidx, vidx) if (prev_vidx < vidx) else (vidx, prev_vidx)
+                if edge_key in edges:
+                    geom.face_invalid.append(faces_before + f)
+                    break
+                edges.add(edge_key)
+                prev_vidx = vidx
+
+    def parse_line(self, line):
+        line_split = line.split()
+        if not line_split:
+            return
+
+        geom = self.geom
+        context = geom.context
+        line_start = line_split[0]
+
+        if line_start == b'l':
+            if self.use_edges:
+                tot_v = self.counts[0] + len(geom.verts_loc) // 3
+                loc = _resolve([int(v.split(b'/')[0]) for v in line_split[1:]], tot_v)
+                geom.add_run(True)
+                geom.add_faces(loc, None, None, (0, len(loc)))
+
+        elif line_start == b's':
+            if self.use_smooth_groups:
+                context[SMOOTH] = _line_value(line_split)
+                if context[SMOOTH] == b'off':
+                    context[SMOOTH] = None
+                elif context[SMOOTH]:
+                    _unique_extend(geom.unique_smooth_groups, (context[SMOOTH],))
+
+        elif line_start == b'o':
+            if self.use_split_objects:
+                context[OBJECT] = _line_value(line_split)
+
+        elif line_start == b'g':
+            if self.use_split_groups:
+                context[OBJECT] = _line_value(line_split)
+            elif self.use_groups_as_vgroups:
+                context[VGROUP] = _line_value(line_split)
+                if context[VGROUP] == b'(null)':
+                    context[VGROUP] = None
+
+        elif line_start == b'usemtl':
+            context[MATERIAL] = _line_value(line_split)
+            _unique_extend(geom.unique_materials, (context[MATERIAL],))
+
+        elif line_start == b'mtllib':
+            _unique_extend(geom.material_libs, line_split[1:])
+
+        elif line_start in _UNSUPPORTED:
+            raise UnsupportedError("Curves and surfaces are not supported by the fast OBJ parser (%r)" % line_start)
+
+
+def _read(filepath, start, end):
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def chunk_bounds(filepath, chunk_size):
+    """
+    Offsets cutting the file into chunks of about chunk_size bytes,
+    at line ends, but not inside lines continued with '\\'.
+    """
+    size = os.path.getsize(filepath)
+    bounds = [0]
+    with open(filepath, 'rb') as f:
+        pos = chunk_size
+        while pos < size:
+            window_start = max(pos - 1024, 0)
+            f.seek(window_start)
+            window = f.read(pos - window_start + 1024 * 1024)
+            i = pos - window_start
+            while True:
+                i = window.find(b"\n", i)
+                if i == -1:
+                    break
+                j = i
+                while j > 0 and window[j - 1] in b" \t\r":
+                    j -= 1
+                if window[j - 1:j] != b"\\":
+                    break
+                i += 1
+            if i == -1:  # no usable line end close enough, keep going
+                pos = window_start + len(window)
+                continue
+            bounds.append(window_start + i + 1)
+            pos = bounds[-1] + chunk_size
+    if bounds[-1] != size:
+        bounds.append(size)
+    return bounds
+
+
+def count_chunk(args):
+    """Number of vertices, uvs and normals in a chunk."""
+    filepath, start, end = args
+    data = _read(filepath, start, end)
+    tags = _COUNT_RE.findall(data)
+    return tuple(tags.count(tag) for tag in _VEC_TAGS)
+
+
+def parse_chunk(args):
+    filepath, start, end, counts, options = args
+    parser = _ChunkParser(counts, **options)
+    parser.feed(_read(filepath, start, end))
+    return parser.geom.pack()
+
+
+def parse(filepath, processes=1, chunk_size=CHUNK_SIZE, **options):
+    """
+    Parse the geometry of an OBJ file, returns an OBJGeometry.
+    Options are those of _ChunkParser (use_comma, use_smooth_groups, use_edges,
+    use_split_objects, use_split_groups, use_groups_as_vgroups).
+    With several processes, the file is cut into chunks parsed in parallel.
+    """
+    geom = OBJGeometry()
+
+    if processes > 1:
+        bounds = chunk_bounds(filepath, min(chunk_size, max(os.path.getsize(filepath) // (processes * 4), 1)))
+    else:
+        bounds = chunk_bounds(filepath, chunk_size)
+    chunks = [(filepath, start, end) for start, end in izip(bounds[:-1], bounds[1:])]
+
+    if processes > 1 and len(chunks) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(processes)
+        try:
+            # numbers of elements before each chunk, for relative indices
+            counts = [(0, 0, 0)]
+            for chunk_counts in pool.map(count_chunk, chunks[:-1]):
+                counts.append(tuple(a + b for a, b in izip(counts[-1], chunk_counts)))
+
+            args = [chunk + (chunk_counts, options) for chunk, chunk_counts in izip(chunks, counts)]
+            for state in pool.imap(parse_chunk, args):
+                geom.extend(OBJGeometry.unpack(state))
+        finally:
+            pool.terminate()
+    else:
+        for filepath, start, end in chunks:
+            parser = _ChunkParser(geom.counts(), **options)
+            parser.feed(_read(filepath, start, end))
+            geom.extend(parser.geom)
+
+    return geom
@@ -22,6 +22,7 @@ DEBUG = False
 
 # This should work without a blender at all
 import os
+import re
 import shlex
 from io import open
 from itertools import izip
@@ -96,124 +97,90 @@ def vrml_split_fields(value):
     return field_list
 
 
-def vrmlFormat(data):
-    """
-    Keep this as a valid vrml file, but format in a way we can predict.
-    """
-    # Strip all commends - # not in strings - warning multiline strings are ignored.
-    def strip_comment(l):
-        #l = ' '.join(l.split())
-        l = l.strip()
-
-        if l.startswith('#'):
-            return ''
-
-        i = l.find('#')
-
-        if i == -1:
-            return l
-
-        # Most cases accounted for! if we have a comment at the end of the line do this...
-        #j = l.find('url "')
-        j = l.find('"')
-
-        if j == -1:  # simple no strings
-            return l[:i].strip()
-
-        q = False
-        for i, c in enumerate(l):
-            if c == '"':
-                q = not q  # invert
-
-            elif c == '#':
-                if q is False:
-                    return l[:i - 1]
-
-        return l
-
-    data = '\n'.join([strip_comment(l) for l in data.split('\n')])  # remove all whitespace
-
-    EXTRACT_STRINGS = True  # only needed when strings or filesnames containe ,[]{} chars :/
-
-    if EXTRACT_STRINGS:
-
-        # We need this so we can detect URL's
-        data = '\n'.join([' '.join(l.split()) for l in data.split('\n')])  # remove all whitespace
-
-        string_ls = []
+# tokens of vrml_tokenize(): strings, comments, brackets, commas, line ends, words
+vrml_token_re = re.compile(r'"(?:[^"\\]|\\[\s\S])*"|#[^\r\n]*|[{}\[\],]|\r\n?|\n|[^\s{}\[\],"#]+')
+# the end of an array of numbers, or what makes it something else
+vrml_array_end_re = re.compile(r'[{}\[\]"#]')
 
-        #search = 'url "'
-        search = '"'
 
-        ok = True
-        last_i = 0
-        while ok:
-            ok = False
-            i = data.find(search, last_i)
-            if i != -1:
-
-                start = i + len(search)  # first char after end of search
-                end = data.find('"', start)
-                if end != -1:
-                    item = data[start:end]
-                    string_ls.append(item)
-                    data = data[:start] + data[end:]
-                    ok = True  # keep looking
-
-                    last_i = (end - len(item)) + 1
-                    # print(last_i, item, '|' + data[last_i] + '|')
-
-    # done with messy extracting strings part
-
-    # Bad, dont take strings into account
-    '''
-    data = data.replace('#', '\n#')
-    data = '\n'.join([ll for l in data.split('\n') for ll in (l.strip(),) if not ll.startswith('#')]) # remove all whitespace
-    '''
-    data = data.replace('{', '\n{\n')
-    data = data.replace('}', '\n}\n')
-    data = data.replace('[', '\n[\n')
-    data = data.replace(']', '\n]\n')
-    data = data.replace(',', ' , ')  # make sure comma's separate
+def vrml_tokenize(data):
+    """
+    Yield the lines of vrmlFormat() in a single pass over data,
+    numbers of arrays ('[1 2 3, 4 5 6]') are yielded at once as a flat list.
+    """
+    search_token = vrml_token_re.search
+    search_array_end = vrml_array_end_re.search
+
+    words = []  # words of the current line
+    pos = 0
+    while True:
+        match = search_token(data, pos)
+        if match is None:
+            break
+        token = match.group()
+        pos = match.end()
+        c = token[0]
 
-    # We need to write one property (field) per line only, otherwise we fail later to detect correctly new nodes.
-    # See T45195 for details.
-    data = '\n'.join([' '.join(value) for l in data.split('\n') for value in vrml_split_fields(l.split())])
+        if c == '#':
+            continue  # comment
 
-    if EXTRACT_STRINGS:
-        # add strings back in
+        if c == '"':
+            parts = token.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+            words.append(parts[0])
+            if len(parts) == 1:
+                continue
+            # a multiline string, the parser puts its lines together again
+            for value in vrml_split_fields(words):
+                yield ' '.join(value)
+            for part in parts[1:-1]:
+                if part.strip():
+                    yield part.strip()
+            words = [parts[-1]]
+            continue
 
-        search = '"'  # fill in these empty strings
+        if c not in '{}[]\r\n':
+            words.append(token)
+            continue
 
-        ok = True
-        last_i = 0
-        while ok:
-            ok = False
-            i = data.find(search + '"', last_i)
-            # print(i)
-            if i != -1:
-                start = i + len(search)  # first char after end of search
-                item = string_ls.pop(0)
-                # print(item)
-                data = data[:start] + item + data[start:]
+        # one field per line, otherwise we fail later to detect new nodes correctly.
+        # See T45195 for details.
+        if words:
+            for value in vrml_split_fields(words):
+                yield ' '.join(value)
+            words = []
 
-                last_i = start + len(item) + 1
+        if c in '\r\n':
+            continue
 
-                ok = True
+        yield c
 
-    # More annoying obscure cases where USE or DEF are placed on a newline
-    # data = data.replace('\nDEF ', ' DEF ')
-    # data = data.replace('\nUSE ', ' USE ')
+        if c == '[':
+            end = search_array_end(data, pos)
+            if end is not None and end.group() == ']':
+                values = data[pos:end.start()].replace(',', ' ').split()
+                try:
+                    values = list(map(int, values))
+                except ValueError:
+                    try:
+                        values = list(map(float, values))
+                    except ValueError:
+                        values = None
+                if values is not None:
+                    if values:
+                        yield values
+                    yield ']'
+                    pos = end.end()
 
-    data = '\n'.join([' '.join(l.split()) for l in data.split('\n')])  # remove all whitespace
+    if words:
+        for value in vrml_split_fields(words):
+            yield ' '.join(value)
 
-    # Better to parse the file accounting for multiline arrays
-    '''
-    data = data.replace(',\n', ' , ') # remove line endings with commas
-    data = data.replace(']', '\n]\n') # very very annoying - but some comma's are at the end of the list, must run this again.
-    '''
 
-    return [l for l in data.split('\n') if l]
+def vrmlFormat(data):
+    """
+    Keep this as a valid vrml file, but format in a way we can predict.
+    """
+    return list(vrml_tokenize(data))
 
 NODE_NORMAL = 1  # {}
 NODE_ARRAY = 2  # []
@@ -238,6 +205,8 @@ def getNodePreText(i, words):
             # words.append(lines[i]) # no need
             # print("OK")
             return NODE_NORMAL, i + 1
+        elif type(lines[i]) is list:  # numbers of an array
+            break
         elif lines[i].count('"') % 2 != 0:  # odd number of quotes? - part of a string.
             # print('ISSTRING')
             break
@@ -1149,6 +1118,11 @@ class vrmlNode(object):
                 ### print("returning", i)
                 return i + 1
 
+            if type(l) is list:  # numbers of an array, see vrml_tokenize()
+                self.array_data.extend(l)
+                i += 1
+                continue
+
             node_type, new_i = is_nodeline(i, [])
             if node_type:  # check text\n{
                 child = vrmlNode(self, node_type, i)
@@ -1426,6 +1400,9 @@ for i, f in enumerate(files):
 from __future__ import division
 from __future__ import absolute_import
 import bpy
+import operator
+from functools import partial
+from itertools import chain, compress, count, repeat
 from bpy_extras import image_utils
 from mathutils import Vector, Matrix
 
@@ -1554,6 +1531,63 @@ def getFinalMatrix(node, mtx, ancestry, global_matrix):
     return mtx
 
 
+# flat arrays of nodes shared through DEF/USE, so they are converted once per import
+FLAT_ARRAYS = {}
+
+
+def getFlatArray(node, field, ancestry, cast=None):
+    """
+    The numbers of the field as a flat list, cast if a type is given.
+    """
+    node = node.getRealNode()
+    # fields inside a PROTO may depend on the instance
+    use_cache = not any(n.getRealNode().proto_node for n in ancestry)
+
+    key = node, field, cast
+    if use_cache and key in FLAT_ARRAYS:
+        return FLAT_ARRAYS[key]
+
+    values = node.getFieldAsArray(field, 0, ancestry)
+    if cast is not None:
+        try:
+            values = list(map(cast, values))
+        except (ValueError, TypeError):
+            print '\tWarning, could not convert "%s" values' % field
+            values = []
+
+    if use_cache:
+        FLAT_ARRAYS[key] = values
+    return values
+
+
+def gatherItems(values, indices, size, default):
+    """
+    Items of size values (a flat list) at each index, as a flat list,
+    indices out of range get the default item.
+    """
+    tot = len(values) // size
+    if indices and (min(indices) < 0 or max(indices) >= tot):
+        print '\tWarning: index out of range'
+        indices = [i if 0 <= i < tot else tot for i in indices]
+
+    columns = []
+    for j in xrange(size):
+        column = values[j:tot * size:size]
+        column.append(default[j])
+        columns.append(map(column.__getitem__, indices))
+    return list(chain.from_iterable(izip(*columns)))
+
+
+def accumulate_starts(sizes):
+    """
+    Start of each item of the given sizes, when they follow each other.
+    """
+    start = 0
+    for size in sizes:
+        yield start
+        start += size
+
+
 def importMesh_IndexedFaceSet(geom, bpyima, ancestry):
     # print(geom.lineno, geom.id, vrmlNode.DEF_NAMESPACE.keys())
 
@@ -1569,7 +1603,10 @@ def importMesh_IndexedFaceSet(geom, bpyima, ancestry):
     coord = geom.getChildBySpec('Coordinate')  # works for x3d and vrml
 
     if coord:
-        ifs_points = coord.getFieldAsArray('point', 3, ancestry)
+        ifs_points = getFlatArray(coord, 'point', ancestry, float)
+        if len(ifs_points) % 3:
+            print '\twarning, array was not aligned to requested grouping', 3
+            ifs_points = ifs_points[:len(ifs_points) - len(ifs_points) % 3]
     else:
         coord = []
 
@@ -1577,145 +1614,83 @@ def importMesh_IndexedFaceSet(geom, bpyima, ancestry):
         print '\tWarnint: IndexedFaceSet has no points'
         return None, ccw
 
-    ifs_faces = geom.getFieldAsArray('coordIndex', 0, ancestry)
-
-    coords_tex = None
-    if ifs_faces:  # In rare cases this causes problems - no faces but UVs???
-
-        # WORKS - VRML ONLY
-        # coords_tex = geom.getChildByName('texCoord')
-        coords_tex = geom.getChildBySpec('TextureCoordinate')
-
-        if coords_tex:
-            ifs_texpoints = [(0, 0)] # EEKADOODLE - vertex start at 1
-            ifs_texpoints.extend(coords_tex.getFieldAsArray('point', 2, ancestry))
-            ifs_texfaces = geom.getFieldAsArray('texCoordIndex', 0, ancestry)
-
-            if not ifs_texpoints:
-                # IF we have no coords, then dont bother
-                coords_tex = None
-
-    # WORKS - VRML ONLY
-    # vcolor = geom.getChildByName('color')
-    vcolor = geom.getChildBySpec('Color')
-    vcolor_spot = None  # spot color when we dont have an array of colors
-    if vcolor:
-        # float to char
-        ifs_vcol = [(0, 0, 0)]  # EEKADOODLE - vertex start at 1
-        ifs_vcol.extend([col for col in vcolor.getFieldAsArray('color', 3, ancestry)])
-        ifs_color_index = geom.getFieldAsArray('colorIndex', 0, ancestry)
-
-        if not ifs_vcol:
-            vcolor_spot = vcolor.getFieldAsFloatTuple('color', [], ancestry)
-
-    # Convert faces into somthing blender can use
-    edges = []
-
-    # All lists are aligned!
-    faces = []
-    faces_uv = []  # if ifs_texfaces is empty then the faces_uv will match faces exactly.
-    faces_orig_index = []  # for ngons, we need to know our original index
-
-    if coords_tex and ifs_texfaces:
-        do_uvmap = True
+    tot_points = len(ifs_points) // 3
+    ifs_faces = getFlatArray(geom, 'coordIndex', ancestry, int)  # in rare cases these are floats
+
+    # Faces end at -1 (the last one may not), faces with less than 3 verts are skipped
+    face_ends = list(compress(count(), map(partial(operator.eq, -1), ifs_faces)))
+    if ifs_faces and ifs_faces[-1] != -1:
+        face_ends.append(len(ifs_faces))
+    face_starts = [0] + [end + 1 for end in face_ends[:-1]]
+    face_sizes = list(map(operator.sub, face_ends, face_starts))
+
+    if face_sizes and min(face_sizes) < 3:
+        # faces with 1 or 2 verts? pfft! - still affect the index of the following faces
+        faces_orig_index = [i for i, size in enumerate(face_sizes) if size >= 3]
+        face_starts = [face_starts[i] for i in faces_orig_index]
+        face_sizes = [face_sizes[i] for i in faces_orig_index]
+        # position of each loop in the coordIndex
+        loop_index = list(chain.from_iterable(xrange(start, start + size)
+                                              for start, size in izip(face_starts, face_sizes)))
     else:
-        do_uvmap = False
-
-    # current_face = [0] # pointer anyone
-
-    def add_face(face, fuvs, orig_index):
-        l = len(face)
-        if l == 3 or l == 4:
-            faces.append(face)
-            # faces_orig_index.append(current_face[0])
-            if do_uvmap:
-                faces_uv.append(fuvs)
-
-            faces_orig_index.append(orig_index)
-        elif l == 2:
-            edges.append(face)
-        elif l > 4:
-            for i in xrange(2, len(face)):
-                faces.append([face[0], face[i - 1], face[i]])
-                if do_uvmap:
-                    faces_uv.append([fuvs[0], fuvs[i - 1], fuvs[i]])
-                faces_orig_index.append(orig_index)
-        else:
-            # faces with 1 verts? pfft!
-            # still will affect index ordering
-            pass
-
-    face = []
-    fuvs = []
-    orig_index = 0
-    for i, fi in enumerate(ifs_faces):
-        # ifs_texfaces and ifs_faces should be aligned
-        if fi != -1:
-            # face.append(int(fi)) # in rare cases this is a float
-            # EEKADOODLE!!!
-            # Annoyance where faces that have a zero index vert get rotated. This will then mess up UVs and VColors
-            face.append(int(fi) + 1)  # in rare cases this is a float, +1 because of stupid EEKADOODLE :/
-
-            if do_uvmap:
-                if i >= len(ifs_texfaces):
-                    print '\tWarning: UV Texface index out of range'
-                    fuvs.append(ifs_texfaces[0])
-                else:
-                    fuvs.append(ifs_texfaces[i])
-        else:
-            add_face(face, fuvs, orig_index)
-            face = []
-            if do_uvmap:
-                fuvs = []
-            orig_index += 1
+        faces_orig_index = list(xrange(len(face_sizes)))
+        loop_index = list(compress(count(), map(partial(operator.ne, -1), ifs_faces)))
 
-    add_face(face, fuvs, orig_index)
-    del add_face  # dont need this func anymore
+    tot_faces = len(face_sizes)
+    tot_loops = len(loop_index)
+    loop_verts = list(map(ifs_faces.__getitem__, loop_index))
+    loop_starts = list(accumulate_starts(face_sizes))
 
     bpymesh = bpy.data.meshes.new(name="XXX")
 
-    # EEKADOODLE
-    bpymesh.vertices.add(1 + (len(ifs_points)))
-    bpymesh.vertices.foreach_set("co", [0, 0, 0] + [a for v in ifs_points for a in v])  # XXX25 speed
-
-    # print(len(ifs_points), faces, edges, ngons)
+    bpymesh.vertices.add(tot_points)
+    bpymesh.vertices.foreach_set("co", ifs_points)
 
-    try:
-        bpymesh.tessfaces.add(len(faces))
-        bpymesh.tessfaces.foreach_set("vertices_raw", [a for f in faces for a in (f + [0] if len(f) == 3 else f)])  # XXX25 speed
-    except KeyError:
+    if loop_verts and (min(loop_verts) < 0 or max(loop_verts) >= tot_points):
         print "one or more vert indices out of range. corrupt file?"
-        #for f in faces:
-        #   bpymesh.tessfaces.extend(faces, smooth=True)
+        tot_faces = 0
+
+    if tot_faces:
+        bpymesh.loops.add(tot_loops)
+        bpymesh.loops.foreach_set("vertex_index", loop_verts)
+        bpymesh.polygons.add(tot_faces)
+        bpymesh.polygons.foreach_set("loop_start", loop_starts)
+        bpymesh.polygons.foreach_set("loop_total", face_sizes)
 
     bpymesh.validate()
-    # bpymesh.update()  # cant call now, because it would convert tessface
 
-    if len(bpymesh.tessfaces) != len(faces):
+    if len(bpymesh.polygons) != tot_faces:
         print '\tWarning: adding faces did not work! file is invalid, not adding UVs or vcolors'
         bpymesh.update()
         return bpymesh, ccw
 
-    # Apply UVs if we have them
-    if not do_uvmap:
-        faces_uv = faces  # fallback, we didnt need a uvmap in the first place, fallback to the face/vert mapping.
+    # UVs of each loop
+    loop_uvs = None
+
+    coords_tex = None
+    if tot_faces:  # In rare cases this causes problems - no faces but UVs???
+
+        # WORKS - VRML ONLY
+        # coords_tex = geom.getChildByName('texCoord')
+        coords_tex = geom.getChildBySpec('TextureCoordinate')
+
     if coords_tex:
-        #print(ifs_texpoints)
-        # print(geom)
-        uvlay = bpymesh.tessface_uv_textures.new()
-
-        for i, f in enumerate(uvlay.data):
-            f.image = bpyima
-            fuv = faces_uv[i]  # uv indices
-            for j, uv in enumerate(f.uv):
-                # print(fuv, j, len(ifs_texpoints))
-                try:
-                    f.uv[j] = ifs_texpoints[fuv[j] + 1]  # XXX25, speedup
-                except:
-                    print '\tWarning: UV Index out of range'
-                    f.uv[j] = ifs_texpoints[0]  # XXX25, speedup
+        ifs_texpoints = getFlatArray(coords_tex, 'point', ancestry, float)
+
+        if ifs_texpoints:
+            ifs_texfaces = getFlatArray(geom, 'texCoordIndex', ancestry, int)
+            if ifs_texfaces:
+                # ifs_texfaces and ifs_faces should be aligned
+                if len(ifs_texfaces) < len(ifs_faces):
+                    print '\tWarning: UV Texface index out of range'
+                    ifs_texfaces = ifs_texfaces + [ifs_texfaces[0]] * (len(ifs_faces) - len(ifs_texfaces))
+                loop_tex = list(map(ifs_texfaces.__getitem__, loop_index))
+            else:
+                loop_tex = loop_verts  # uv indices are the vert indices
 
-    elif bpyima and len(bpymesh.tessfaces):
+            loop_uvs = gatherItems(ifs_texpoints, loop_tex, 2, (0.0, 0.0))
+
+    elif bpyima and tot_faces:
         # Oh Bugger! - we cant really use blenders ORCO for for texture space since texspace dosnt rotate.
         # we have to create VRML's coords as UVs instead.
 
@@ -1731,30 +1706,9 @@ def importMesh_IndexedFaceSet(geom, bpyima, ancestry):
 
         # Note, S,T == U,V
         # U gets longest, V gets second longest
-        xmin, ymin, zmin = ifs_points[0]
-        xmax, ymax, zmax = ifs_points[0]
-        for co in ifs_points:
-            x, y, z = co
-            if x < xmin:
-                xmin = x
-            if y < ymin:
-                ymin = y
-            if z < zmin:
-                zmin = z
-
-            if x > xmax:
-                xmax = x
-            if y > ymax:
-                ymax = y
-            if z > zmax:
-                zmax = z
-
-        xlen = xmax - xmin
-        ylen = ymax - ymin
-        zlen = zmax - zmin
-
-        depth_min = xmin, ymin, zmin
-        depth_list = [xlen, ylen, zlen]
+        axes = [ifs_points[i::3] for i in xrange(3)]
+        depth_min = [min(axis) for axis in axes]
+        depth_list = [max(axis) - axis_min for axis, axis_min in izip(axes, depth_min)]
         depth_sort = depth_list[:]
         depth_sort.sort()
 
@@ -1766,87 +1720,65 @@ def importMesh_IndexedFaceSet(geom, bpyima, ancestry):
         # Hack, swap these !!! TODO - Why swap??? - it seems to work correctly but should not.
         # axis_u,axis_v = axis_v,axis_u
 
-        min_u = depth_min[axis_u]
-        min_v = depth_min[axis_v]
-        depth_u = depth_list[axis_u]
-        depth_v = depth_list[axis_v]
-
-        depth_list[axis_u]
-
         if axis_u == axis_v:
             # This should be safe because when 2 axies have the same length, the lower index will be used.
             axis_v += 1
 
-        uvlay = bpymesh.tessface_uv_textures.new()
+        min_u = depth_min[axis_u]
+        min_v = depth_min[axis_v]
 
         # HACK !!! - seems to be compatible with Cosmo though.
-        depth_v = depth_u = max(depth_v, depth_u)
-
-        bpymesh_vertices = bpymesh.vertices[:]
-        bpymesh_faces = bpymesh.tessfaces[:]
+        depth_v = depth_u = max(depth_list[axis_u], depth_list[axis_v])
 
-        for j, f in enumerate(uvlay.data):
-            f.image = bpyima
-            fuv = f.uv
-            f_v = bpymesh_faces[j].vertices[:]  # XXX25 speed
+        uvs = [0.0] * (tot_points * 2)
+        if depth_u:
+            uvs[0::2] = [(co - min_u) / depth_u for co in axes[axis_u]]
+            uvs[1::2] = [(co - min_v) / depth_v for co in axes[axis_v]]
+        loop_uvs = gatherItems(uvs, loop_verts, 2, (0.0, 0.0))
 
-            for i, v in enumerate(f_v):
-                co = bpymesh_vertices[v].co
-                fuv[i] = (co[axis_u] - min_u) / depth_u, (co[axis_v] - min_v) / depth_v
+    if loop_uvs is not None:
+        uvlay = bpymesh.uv_textures.new()
+        if bpyima:
+            for f in uvlay.data:
+                f.image = bpyima
+        bpymesh.uv_layers[uvlay.name].data.foreach_set("uv", loop_uvs)
 
     # Add vcote
-    if vcolor:
-        # print(ifs_vcol)
-        collay = bpymesh.tessface_vertex_colors.new()
-
-        for f_idx, f in enumerate(collay.data):
-            fv = bpymesh.tessfaces[f_idx].vertices[:]
-            if len(fv) == 3:  # XXX speed
-                fcol = f.color1, f.color2, f.color3
-            else:
-                fcol = f.color1, f.color2, f.color3, f.color4
-            if ifs_colorPerVertex:
-                for i, c in enumerate(fcol):
-                    color_index = fv[i]  # color index is vert index
-                    if ifs_color_index:
-                        try:
-                            color_index = ifs_color_index[color_index]
-                        except:
-                            print '\tWarning: per vertex color index out of range'
-                            continue
+    # WORKS - VRML ONLY
+    # vcolor = geom.getChildByName('color')
+    vcolor = geom.getChildBySpec('Color')
+    if vcolor and tot_faces:
+        ifs_vcol = getFlatArray(vcolor, 'color', ancestry, float)
+        ifs_color_index = getFlatArray(geom, 'colorIndex', ancestry, int)
 
-                    if color_index < len(ifs_vcol):
-                        c.r, c.g, c.b = ifs_vcol[color_index]
-                    else:
-                        #print('\tWarning: per face color index out of range')
-                        pass
+        if not ifs_vcol:
+            # spot color when we dont have an array of colors
+            vcolor_spot = vcolor.getFieldAsFloatTuple('color', [], ancestry)
+            loop_cols = list(vcolor_spot[:3]) * tot_loops if len(vcolor_spot) >= 3 else None
+        elif ifs_colorPerVertex:
+            if ifs_color_index:
+                # aligned with coordIndex
+                if len(ifs_color_index) < len(ifs_faces):
+                    print '\tWarning: per vertex color index out of range'
+                    ifs_color_index = ifs_color_index + [-1] * (len(ifs_faces) - len(ifs_color_index))
+                loop_colors = list(map(ifs_color_index.__getitem__, loop_index))
             else:
-                if vcolor_spot:  # use 1 color, when ifs_vcol is []
-                    for c in fcol:
-                        c.r, c.g, c.b = vcolor_spot
-                else:
-                    color_index = faces_orig_index[f_idx]  # color index is face index
-                    #print(color_index, ifs_color_index)
-                    if ifs_color_index:
-                        if color_index >= len(ifs_color_index):
-                            print '\tWarning: per face color index out of range'
-                            color_index = 0
-                        else:
-                            color_index = ifs_color_index[color_index]
-                    # skip eedadoodle vert
-                    color_index += 1
-                    try:
-                        col = ifs_vcol[color_index]
-                    except IndexError:
-                        # TODO, look
-                        col = (1.0, 1.0, 1.0)
-                    for i, c in enumerate(fcol):
-                        c.r, c.g, c.b = col
-
-    # XXX25
-    # bpymesh.vertices.delete([0, ])  # EEKADOODLE
-
-    bpymesh.update()
+                loop_colors = loop_verts  # color index is vert index
+            loop_cols = gatherItems(ifs_vcol, loop_colors, 3, (1.0, 1.0, 1.0))
+        else:
+            face_colors = faces_orig_index  # color index is face index
+            if ifs_color_index:
+                if len(ifs_color_index) < len(face_sizes):
+                    print '\tWarning: per face color index out of range'
+                face_colors = [ifs_color_index[i] if i < len(ifs_color_index) else 0 for i in face_colors]
+            loop_colors = list(chain.from_iterable(map(repeat, face_colors, face_sizes)))
+            loop_cols = gatherItems(ifs_vcol, loop_colors, 3, (1.0, 1.0, 1.0))
+
+        if loop_cols is not None:
+            collay = bpymesh.vertex_colors.new()
+            collay.data.foreach_set("color", loop_cols)
+
+    bpymesh.update(calc_edges=True)
     bpymesh.validate()
 
     return bpymesh, ccw
@@ -2621,6 +2553,9 @@ def load_web3d(path,
             translatePositionInterpolator(node, action)
             '''
 
+    # arrays shared by the geometry are not needed anymore
+    FLAT_ARRAYS.clear()
+
     # After we import all nodes, route events - anim paths
     for node, ancestry in all_nodes:
         importRoute(node, ancestry)
@@ -548,9 +548,15 @@ class OBJECT_OT_ConvertSamplesButton(bpy.types.Operator):
     """Convert active armature's sampled keyframed to beziers"""
     bl_idname = "mocap.samples"
     bl_label = "Convert Samples"
+    bl_options = set(['REGISTER', 'UNDO'])
+
+    processes = IntProperty(name="Processes",
+        default=1,
+        description="Number of processes fitting curves in parallel",
+        min=1, max=64)
 
     def execute(self, context):
-        mocap_tools.fcurves_simplify(context, context.active_object)
+        mocap_tools.fcurves_simplify(context, context.active_object, processes=self.processes)
         return set(['FINISHED'])
 
     @classmethod
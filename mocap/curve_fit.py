@@ -0,0 +1,194 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8 compliant>
+
+"""
+Batched cubic Bezier fitting for Simplify Curves (see mocap_tools.simplifyCurves).
+
+The sampled points of a curve (group) are one (N, D) array, the first column
+being the frame. Each range of points is fitted at once: Bernstein bases,
+errors and Newton-Raphson reparameterization are evaluated over the whole
+range. Ranges with too much error are split at the point of maximum error,
+using a stack instead of recursion.
+
+Fitting uses neither bpy nor mathutils, so independent curves can be fitted
+by a pool of processes.
+"""
+
+from __future__ import division
+from __future__ import absolute_import
+import numpy
+
+
+def bernstein_basis(u):
+    """Cubic Bernstein polynomials at the parameters u, an (len(u), 4) array."""
+    v = 1.0 - u
+    return numpy.column_stack((v * v * v, 3.0 * u * v * v, 3.0 * u * u * v, u * u * u))
+
+
+def unit_tangents(points):
+    """Unit tangent at each point, from the segments before and after it, zero where they cancel out."""
+    segments = numpy.diff(points, axis=0)
+    tangents = numpy.zeros_like(points)
+    tangents[1:] += segments
+    tangents[:-1] += segments
+    lengths = numpy.sqrt((tangents * tangents).sum(1))
+    lengths[lengths == 0.0] = 1.0
+    return tangents / lengths[:, None]
+
+
+def chord_parameters(points):
+    """Parameter of each point in [0, 1], via relative arc length (evenly spaced if all points are the same)."""
+    lengths = numpy.sqrt((numpy.diff(points, axis=0) ** 2).sum(1))
+    u = numpy.concatenate(((0.0,), numpy.cumsum(lengths)))
+    if u[-1] == 0.0:
+        return numpy.linspace(0.0, 1.0, len(u))
+    return u / u[-1]
+
+
+def fit_cubic(points, u, t1, t2):
+    """Least squares cubic between the first and last points, with handles along the tangents t1 and t2."""
+    v0 = points[0]
+    v3 = points[-1]
+    basis = bernstein_basis(u)
+    b1 = basis[:, 1]
+    b2 = basis[:, 2]
+
+    c11 = t1.dot(t1) * b1.dot(b1)
+    c12 = t1.dot(t2) * b1.dot(b2)
+    c22 = t2.dot(t2) * b2.dot(b2)
+
+    x = points - numpy.outer(basis[:, 0] + b1, v0) - numpy.outer(b2 + basis[:, 3], v3)
+    x1 = t1.dot(b1.dot(x))
+    x2 = t2.dot(b2.dot(x))
+
+    # calculate Determinate of the 3 matrices
+    det_cc = c11 * c22 - c12 * c12
+    det_cx = c11 * x2 - c12 * x1
+    det_xc = x1 * c22 - x2 * c12
+
+    # if matrix is not homogenous, fudge the data a bit
+    if det_cc == 0:
+        det_cc = 0.01
+
+    # alpha's are the correct offset for bezier handles
+    alpha0 = abs(det_xc / det_cc)
+    alpha1 = abs(det_cx / det_cc)
+    return numpy.array((v0, v0 + t1 * alpha0, v3 + t2 * alpha1, v3))
+
+
+def fit_cubic_2pts(points, t1, t2):
+    """Cubic between the first and last points, with handles a 3rd of the distance between them."""
+    v0 = points[0]
+    v3 = points[-1]
+    alpha = numpy.sqrt(((v0 - v3) ** 2).sum()) / 3.0
+    return numpy.array((v0, v0 + t1 * alpha, v3 + t2 * alpha, v3))
+
+
+def max_error(points, u, bez):
+    """Highest error, relative to the length of the points, and the (last) index where it occurs."""
+    if len(points) < 4:
+        return 0.0, None
+    norms = numpy.sqrt((points * points).sum(1))
+    norms[norms == 0.0] = 1.0
+    errors = numpy.sqrt(((points - bernstein_basis(u).dot(bez)) ** 2).sum(1)) / norms
+    # a diverged reparameterization never fits
+    errors[~numpy.isfinite(errors)] = numpy.inf
+    index = len(errors) - 1 - int(errors[::-1].argmax())
+    return float(errors[index]), index
+
+
+def newton_raphson(points, u, bez):
+    """Reparameterize the points by a step minimizing the distance between the bezier and the data."""
+    v = 1.0 - u
+    diff = bernstein_basis(u).dot(bez) - points
+    derivative = numpy.outer(v * v, bez[1] - bez[0]) + numpy.outer(2.0 * u * v, bez[2] - bez[1])
+    fu = (diff * diff).sum(1)
+    fud = 2.0 * diff[:, 0] * derivative[:, 0] - 2.0 * diff[:, 1] * derivative[:, 1]
+    steady = fud == 0.0
+    fu[steady] = 0.0
+    fud[steady] = 1.0
+    u = u - fu / fud
+    u[0] = 0.0
+    u[-1] = 1.0
+    return u
+
+
+def fit_curve(points, error, repara_error, max_iterations):
+    """
+    Cubic beziers, each a (4, D) array, fitted to the (N, D) array points, within
+    error (relative distance). Ranges with an error below repara_error are first
+    reparameterized, up to max_iterations times, before being split.
+    """
+    points = numpy.asarray(points, dtype=numpy.float64)
+    if len(points) < 2:
+        # nothing to simplify
+        return []
+
+    tangents = unit_tangents(points)
+    beziers = []
+    stack = [(0, len(points) - 1)]
+    while stack:
+        s, e = stack.pop()
+        pts = points[s:e + 1]
+        t1 = tangents[s]
+        t2 = tangents[e]
+
+        if e - s < 3:
+            u = None
+            bez = fit_cubic_2pts(pts, t1, t2)
+        else:
+            u = chord_parameters(pts)
+            bez = fit_cubic(pts, u, t1, t2)
+
+        err, split = max_error(pts, u, bez)
+        # if error is small enough, reparameterization might be enough
+        if error < err < repara_error:
+            # Newton-Raphson is not guaranteed to converge, parameters may overflow
+            with numpy.errstate(over='ignore', invalid='ignore', divide='ignore'):
+                for i in xrange(max_iterations):
+                    u = newton_raphson(pts, u, bez)
+                    bez = fit_cubic(pts, u, t1, t2)
+                err, split = max_error(pts, u, bez)
+
+        # split at the point of maximum error, the first part is fitted first
+        if err > error and 0 < split < e - s:
+            stack.append((s + split, e))
+            stack.append((s, s + split))
+        else:
+            beziers.append(bez)
+
+    return beziers
+
+
+def _fit_curve_args(args):
+    return fit_curve(*args)
+
+
+def fit_curves(curves_points, error, repara_error, max_iterations, processes=1):
+    """Fit each array of curves_points, with several processes the curves are fitted in parallel."""
+    args = [(points, error, repara_error, max_iterations) for points in curves_points]
+    if processes > 1 and len(args) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(min(processes, len(args)))
+        try:
+            return pool.map(_fit_curve_args, args)
+        finally:
+            pool.terminate()
+    return map(_fit_curve_args, args)
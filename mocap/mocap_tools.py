@@ -20,11 +20,18 @@
 
 from __future__ import division
 from __future__ import absolute_import
-from math import sqrt, radians, floor, ceil
+from math import sqrt, radians, floor, ceil, pi
+from itertools import izip
+import cmath
 import bpy
 import time
 from mathutils import Vector, Matrix
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 # A Python implementation of n sized Vectors.
 # Mathutils has a max size of 4, and we need at least 5 for Simplify Curves and even more for Cross Correlation.
@@ -117,83 +124,144 @@ def make_editable_fcurves(fcurves):
             fc.convert_to_keyframes(floor(fc.sampled_points[0].co[0]), ceil(fc.sampled_points[-1].co[0]) + 1)
 
 
+#Iterative radix-2 FFT of a list of complex values, whose length is a power of 2.
+#Used for Cross Correlation when numpy isn't available, the inverse transform isn't scaled.
+def fft(values, inverse=False):
+    values = list(values)
+    n = len(values)
+    j = 0
+    for i in xrange(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            values[i], values[j] = values[j], values[i]
+    sign = 2j * pi if inverse else -2j * pi
+    length = 2
+    while length <= n:
+        half = length >> 1
+        twiddles = [cmath.exp(sign * k / length) for k in xrange(half)]
+        for start in xrange(0, n, length):
+            for k in xrange(half):
+                u = values[start + k]
+                v = values[start + k + half] * twiddles[k]
+                values[start + k] = u + v
+                values[start + k + half] = u - v
+        length <<= 1
+    return values
+
+
+#Circular Cross Correlation of sampled curves, summed over all curves, via FFT.
+#IN:   samplesA, samplesB - samples of the matching curves, one list (or row of an array) per curve, all of length N
+#OUT:  Rxy - for each offset i, sum of dataA[j] * dataB[j - i] over all frames j (indices modulo N), divided by N
+def circularCorrelation(samplesA, samplesB):
+    N = len(samplesA[0])
+    if numpy is not None:
+        Fxy = numpy.fft.rfft(samplesA, axis=1) * numpy.fft.rfft(samplesB, axis=1).conj()
+        return numpy.fft.irfft(Fxy.sum(0), N) / N
+
+    #zero padding to a power of 2 gives the linear correlation, which is folded back to the circular one.
+    #Two real curves are transformed at once, as the real and imaginary parts of a complex one.
+    size = 1
+    while size < 2 * N - 1:
+        size <<= 1
+    padding = [0.0] * (size - N)
+    Fxy = [0j] * size
+    for a, b in zip(samplesA, samplesB):
+        Z = fft([complex(x, y) for x, y in izip(a, b)] + padding)
+        for k in xrange(size):
+            z = Z[k]
+            zc = Z[-k].conjugate()
+            Fxy[k] += (z + zc) * (z - zc).conjugate() * 0.25j
+    r = fft(Fxy, inverse=True)
+    return [(r[i].real + (r[i - N].real if i else 0.0)) / (size * N) for i in xrange(N)]
+
+
 #Cross Correlation Function
 #http://en.wikipedia.org/wiki/Cross_correlation
 #IN:   curvesA, curvesB - bpy_collection/list of fcurves to analyze. Auto-Correlation is when they are the same.
 #        margin - When searching for the best "start" frame, how large a neighborhood of frames should we inspect (similar to epsilon in Calculus)
-#OUT:   startFrame, length of new anim, and curvesA
+#OUT:   startFrame, length of new anim, and the sampled curvesA (list of NdVector, one per frame)
 def crossCorrelationMatch(curvesA, curvesB, margin):
-    dataA = []
-    dataB = []
-    start = int(max(curvesA[0].range()[0], curvesB[0].range()[0]))
     end = int(min(curvesA[0].range()[1], curvesB[0].range()[1]))
+    frames = xrange(1, end)
+
+    #sample all the fcurves found in both sets once, one row per fcurve.
+    pathsA = set(fcurve.data_path for fcurve in curvesA)
+    pathsB = set(fcurve.data_path for fcurve in curvesB)
+    samplesA = [map(fcurve.evaluate, frames) for fcurve in curvesA if fcurve.data_path in pathsB]
+    if curvesA is curvesB:
+        samplesB = samplesA
+    else:
+        samplesB = [map(fcurve.evaluate, frames) for fcurve in curvesB if fcurve.data_path in pathsA]
+    if numpy is not None:
+        samplesA = numpy.array(samplesA, dtype=numpy.float64)
+        samplesB = numpy.array(samplesB, dtype=numpy.float64)
 
-    #transfer all fcurves data on each frame to a single NdVector.
-    for i in xrange(1, end):
-        vec = []
-        for fcurve in curvesA:
-            if fcurve.data_path in [otherFcurve.data_path for otherFcurve in curvesB]:
-                vec.append(fcurve.evaluate(i))
-        dataA.append(NdVector(vec))
-        vec = []
-        for fcurve in curvesB:
-            if fcurve.data_path in [otherFcurve.data_path for otherFcurve in curvesA]:
-                vec.append(fcurve.evaluate(i))
-        dataB.append(NdVector(vec))
-
-    #Comparator for Cross Correlation. "Classic" implementation uses dot product, as do we.
-    def comp(a, b):
-        return a * b
-
-    #Create Rxy, which holds the Cross Correlation data.
-    N = len(dataA)
-    Rxy = [0.0] * N
-    for i in xrange(N):
-        for j in xrange(i, min(i + N, N)):
-            Rxy[i] += comp(dataA[j], dataB[j - i])
-        for j in xrange(i):
-            Rxy[i] += comp(dataA[j], dataB[j - i + N])
-        Rxy[i] /= float(N)
+    #Create Rxy, which holds the Cross Correlation data. "Classic" implementation uses dot product, as do we.
+    N = len(frames)
+    Rxy = circularCorrelation(samplesA, samplesB)
 
     #Find the Local maximums in the Cross Correlation data via numerical derivative.
+    #Rxy is rounded differently than a direct sum, flat parts may have tiny slopes: they count as flat.
     def LocalMaximums(Rxy):
-        Rxyd = [Rxy[i] - Rxy[i - 1] for i in xrange(1, len(Rxy))]
-        maxs = []
-        for i in xrange(1, len(Rxyd) - 1):
-            a = Rxyd[i - 1]
-            b = Rxyd[i]
+        if numpy is not None:
+            rising = numpy.diff(Rxy) >= -1e-9 * abs(Rxy).max()
             #sign change (zerocrossing) at point i, denoting max point (only)
-            if (a >= 0 and b < 0) or (a < 0 and b >= 0):
-                maxs.append((i, max(Rxy[i], Rxy[i - 1])))
-        return [x[0] for x in maxs]
-        #~ return max(maxs, key=lambda x: x[1])[0]
+            return (numpy.flatnonzero(rising[:-2] != rising[1:-1]) + 1).tolist()
+        tolerance = -1e-9 * max(map(abs, Rxy))
+        rising = [Rxy[i] - Rxy[i - 1] >= tolerance for i in xrange(1, len(Rxy))]
+        return [i for i in xrange(1, len(rising) - 1) if rising[i - 1] != rising[i]]
+
+    #error of each frame of A against the frame flm frames later in B.
+    def frameErrors(flm):
+        if numpy is not None:
+            return ((samplesA[:, :N - flm] - samplesB[:, flm:]) ** 2).sum(0)
+        diff = [0.0] * (N - flm)
+        for a, b in zip(samplesA, samplesB):
+            diff = [d + (x - y) ** 2 for d, x, y in izip(diff, a, b[flm:])]
+        return diff
+
+    #index, error at index of the frame whose neighborhood of e frames has the least error, from cumulative sums.
+    def lowerErrorSlice(diff, e, flm):
+        bestSlice = (0, 100000, flm)
+        count = len(diff) - 2 * e
+        if count <= 0:
+            return bestSlice
+        if numpy is not None:
+            cumulative = numpy.concatenate(([0.0], numpy.cumsum(diff)))
+            errorSlices = (cumulative[2 * e + 1:] - cumulative[:count]).tolist()
+            diff = diff.tolist()
+        else:
+            cumulative = [0.0]
+            total = 0.0
+            for d in diff:
+                total += d
+                cumulative.append(total)
+            errorSlices = [cumulative[i + 2 * e + 1] - cumulative[i] for i in xrange(count)]
+        #differences of cumulative sums are rounded differently than the sum of each neighborhood,
+        #the first least error is found among the neighborhoods close to the least one, by their sum.
+        tolerance = min(errorSlices) + 1e-9 * float(cumulative[-1])
+        errorSlice, i = min((sum(diff[i:i + 2 * e + 1]), i) for i in xrange(count) if errorSlices[i] <= tolerance)
+        if errorSlice < bestSlice[1]:
+            bestSlice = (i + e, errorSlice, flm)
+        return bestSlice
 
     #flms - the possible offsets of the first part of the animation. In Auto-Corr, this is the length of the loop.
-    flms = LocalMaximums(Rxy[0:int(len(Rxy))])
-    ss = []
+    flms = LocalMaximums(Rxy)
 
     #for every local maximum, find the best one - i.e. also has the best start frame.
-    for flm in flms:
-        diff = []
-
-        for i in xrange(len(dataA) - flm):
-            diff.append((dataA[i] - dataB[i + flm]).lengthSq)
-
-        def lowerErrorSlice(diff, e):
-            #index, error at index
-            bestSlice = (0, 100000)
-            for i in xrange(e, len(diff) - e):
-                errorSlice = sum(diff[i - e:i + e + 1])
-                if errorSlice < bestSlice[1]:
-                    bestSlice = (i, errorSlice, flm)
-            return bestSlice
-
-        s = lowerErrorSlice(diff, margin)
-        ss.append(s)
+    ss = [lowerErrorSlice(frameErrors(flm), margin, flm) for flm in flms]
 
     #Find the best result and return it.
     ss.sort(key=lambda x: x[1])
-    return ss[0][2], ss[0][0], dataA
+    if numpy is not None:
+        dataA = samplesA.T.tolist()
+    else:
+        dataA = [list(row) for row in izip(*samplesA)]
+    return ss[0][2], ss[0][0], map(NdVector, dataA)
 
 
 #Uses auto correlation (cross correlation of the same set of curves) and trims the active_object's fcurves
@@ -234,6 +302,51 @@ def autoloop_anim():
     context.scene.frame_end = flm
 
 
+#Samples of a curve group (or single fcurve) to fit beziers to, one tuple per keyframe:
+#the frame followed by the value of each curve, padded with zeros to 5 values.
+def sampleCurveGroup(curveGroup, group_mode):
+    make_editable_fcurves(curveGroup if group_mode else (curveGroup,))
+
+    if group_mode:
+        print [x.data_path for x in curveGroup]
+        comp_cos = (0,) * (4 - len(curveGroup))  # We need to add that number of null cos to get our 5D vector.
+        kframes = set()
+        for fc in curveGroup:
+            co = [0.0] * (len(fc.keyframe_points) * 2)
+            fc.keyframe_points.foreach_get("co", co)
+            kframes.update(co[0::2])
+        return [(fra,) + tuple(fc.evaluate(fra) for fc in curveGroup) + comp_cos for fra in sorted(kframes)]
+    else:
+        co = [0.0] * (len(curveGroup.keyframe_points) * 2)
+        curveGroup.keyframe_points.foreach_get("co", co)
+        return [(x, y, 0, 0, 0) for x, y in izip(co[0::2], co[1::2])]
+
+
+#Deletes the sampled points of a curve group (or single fcurve) and creates beziers.
+#beziers are 4 member sequences of points, whose first item is the frame.
+def replaceCurveGroup(curveGroup, beziers, group_mode):
+    fcurves = curveGroup if group_mode else (curveGroup,)
+
+    #remove all existing data points
+    for fcurve in fcurves:
+        for i in xrange(len(fcurve.keyframe_points) - 1, 0, -1):
+            fcurve.keyframe_points.remove(fcurve.keyframe_points[i], fast=True)
+
+    #insert the calculated beziers to blender data.
+    for fullbez in beziers:
+        for i, fcurve in enumerate(fcurves):
+            bez = [(vec[0], vec[i + 1]) for vec in fullbez]
+            newKey = fcurve.keyframe_points.insert(frame=bez[0][0], value=bez[0][1], options=set(['FAST']))
+            newKey.handle_right = bez[1]
+
+            newKey = fcurve.keyframe_points.insert(frame=bez[3][0], value=bez[3][1], options=set(['FAST']))
+            newKey.handle_left = bez[2]
+
+    # We used fast remove/insert, time to update the curves!
+    for fcurve in fcurves:
+        fcurve.update()
+
+
 #simplifyCurves: performes the bulk of the samples to bezier conversion.
 #IN:    curveGroup - which can be a collection of singleFcurves, or grouped (via nested lists) .
 #         error - threshold of permittable error (max distance) of the new beziers to the original data
@@ -424,18 +537,7 @@ def simplifyCurves(curveGroup, error, reparaError, maxIterations, group_mode):
 
     #Create data_pts, a list of dataPoint type, each is assigned index i, and an NdVector
     def createDataPts(curveGroup, group_mode):
-        make_editable_fcurves(curveGroup if group_mode else (curveGroup,))
-
-        if group_mode:
-            print [x.data_path for x in curveGroup]
-            comp_cos = (0,) * (4 - len(curveGroup))  # We need to add that number of null cos to get our 5D vector.
-            kframes = sorted(set(kf.co.x for fc in curveGroup for kf in fc.keyframe_points))
-            data_pts = [dataPoint(i, NdVector((fra,) + tuple(fc.evaluate(fra) for fc in curveGroup) + comp_cos))
-                        for i, fra in enumerate(kframes)]
-        else:
-            data_pts = [dataPoint(i, NdVector((kf.co.x, kf.co.y, 0, 0, 0)))
-                        for i, kf in enumerate(curveGroup.keyframe_points)]
-        return data_pts
+        return [dataPoint(i, NdVector(co)) for i, co in enumerate(sampleCurveGroup(curveGroup, group_mode))]
 
     #Recursively fit cubic beziers to the data_pts between s and e
     def fitCubic(data_pts, s, e):
@@ -472,42 +574,6 @@ def simplifyCurves(curveGroup, error, reparaError, maxIterations, group_mode):
             beziers.append(bez)
             return
 
-    # deletes the sampled points and creates beziers.
-    def createNewCurves(curveGroup, beziers, group_mode):
-        #remove all existing data points
-        if group_mode:
-            for fcurve in curveGroup:
-                for i in xrange(len(fcurve.keyframe_points) - 1, 0, -1):
-                    fcurve.keyframe_points.remove(fcurve.keyframe_points[i], fast=True)
-        else:
-            fcurve = curveGroup
-            for i in xrange(len(fcurve.keyframe_points) - 1, 0, -1):
-                fcurve.keyframe_points.remove(fcurve.keyframe_points[i], fast=True)
-
-        #insert the calculated beziers to blender data.
-        if group_mode:
-            for fullbez in beziers:
-                for i, fcurve in enumerate(curveGroup):
-                    bez = [Vector((vec[0], vec[i + 1])) for vec in fullbez]
-                    newKey = fcurve.keyframe_points.insert(frame=bez[0].x, value=bez[0].y, options=set(['FAST']))
-                    newKey.handle_right = (bez[1].x, bez[1].y)
-
-                    newKey = fcurve.keyframe_points.insert(frame=bez[3].x, value=bez[3].y, options=set(['FAST']))
-                    newKey.handle_left = (bez[2].x, bez[2].y)
-        else:
-            for bez in beziers:
-                for vec in bez:
-                    vec.resize_2d()
-                newKey = fcurve.keyframe_points.insert(frame=bez[0].x, value=bez[0].y, options=set(['FAST']))
-                newKey.handle_right = (bez[1].x, bez[1].y)
-
-                newKey = fcurve.keyframe_points.insert(frame=bez[3].x, value=bez[3].y, options=set(['FAST']))
-                newKey.handle_left = (bez[2].x, bez[2].y)
-
-        # We used fast remove/insert, time to update the curves!
-        for fcurve in (curveGroup if group_mode else (curveGroup,)):
-            fcurve.update()
-
     # indices are detached from data point's frame (x) value and
     # stored in the dataPoint object, represent a range
 
@@ -525,7 +591,7 @@ def simplifyCurves(curveGroup, error, reparaError, maxIterations, group_mode):
     fitCubic(data_pts, s, e)
 
     #remove old Fcurves and insert the new ones
-    createNewCurves(curveGroup, beziers, group_mode)
+    replaceCurveGroup(curveGroup, beziers, group_mode)
 
 
 #Main function of simplification, which called by Operator
@@ -535,7 +601,8 @@ def simplifyCurves(curveGroup, error, reparaError, maxIterations, group_mode):
 #       i.e. divide by 10000 from percentage wanted.
 #       group_mode- boolean, to analyze each curve seperately or in groups,
 #       where a group is all curves that effect the same property/RNA path
-def fcurves_simplify(context, obj, sel_opt="all", error=0.002, group_mode=True):
+#       processes- number of processes fitting curves in parallel (needs numpy)
+def fcurves_simplify(context, obj, sel_opt="all", error=0.002, group_mode=True, processes=1):
     # main vars
     fcurves = obj.animation_data.action.fcurves
 
@@ -562,7 +629,18 @@ def fcurves_simplify(context, obj, sel_opt="all", error=0.002, group_mode=True):
     else:
         fcurveGroups = sel_fcurves
 
-    if error > 0.00000:
+    if error > 0.00000 and numpy is not None:
+        #sample every selected curve, fit them all in batches (see curve_fit), then replace them.
+        from . import curve_fit
+        t = time.time()
+        samples = [sampleCurveGroup(fcurveGroup, group_mode) for fcurveGroup in fcurveGroups]
+        curvesBeziers = curve_fit.fit_curves(samples, error, reparaError, maxIterations, processes)
+        for fcurveGroup, beziers in izip(fcurveGroups, curvesBeziers):
+            if beziers:
+                replaceCurveGroup(fcurveGroup, beziers, group_mode)
+        t = time.time() - t
+        print str(t)[:5] + " seconds to process " + str(len(fcurveGroups)) + " curves"
+    elif error > 0.00000:
         #simplify every selected curve.
         totalt = 0
         for i, fcurveGroup in enumerate(fcurveGroups):
@@ -0,0 +1,51 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# <pep8-80 compliant>
+
+# Helpers for flat arrays of mesh data (as used with foreach_get/foreach_set),
+# shared by the importers and exporters.
+
+from __future__ import absolute_import
+import array
+from itertools import izip
+
+
+def gather(data, indices, size=1):
+    """Items of size values from the flat array data, at indices, in a new array."""
+    if size == 1:
+        return array.array(data.typecode, map(data.__getitem__, indices))
+
+    items = array.array(data.typecode, data[:1]) * (len(indices) * size)
+    if len(indices):
+        base = map(size.__mul__, indices)
+        for i in xrange(size):
+            items[i::size] = array.array(data.typecode, map(data.__getitem__, map(i.__add__, base) if i else base))
+    return items
+
+
+def unique_indices(keys):
+    """
+    Index of each key among the unique keys, numbered in order of first occurrence,
+    and the position of the first occurrence of each unique key.
+    """
+    # later items overwrite earlier ones, from the end the first occurrence remains
+    first = dict(izip(reversed(keys), xrange(len(keys) - 1, -1, -1)))
+    firsts = sorted(first.values())
+    index = dict(izip(map(keys.__getitem__, firsts), xrange(len(firsts))))
+    return map(index.__getitem__, keys), firsts
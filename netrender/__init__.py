@@ -43,8 +43,11 @@ else:
     from netrender import slave
     from netrender import master
     from netrender import master_html
+    from netrender import master_loop
     from netrender import utils
     from netrender import balancing
+    from netrender import cache
+    from netrender import journal
     from netrender import ui
     from netrender import repath
     from netrender import versioning
@@ -19,6 +19,9 @@
 from __future__ import division
 from __future__ import absolute_import
 import time
+import heapq
+import itertools
+import threading
 
 from netrender.utils import *
 import netrender.model
@@ -34,6 +37,10 @@ class RatingRule(object):
     def rate(self, job):
         return 0
 
+    def prepare(self, jobs):
+        # called before rating all jobs, to precompute data shared between jobs
+        pass
+
 class ExclusionRule(object):
     def __init__(self):
         self.enabled = True
@@ -82,6 +89,11 @@ class Balancer(object):
     def addException(self, exception):
         self.exceptions.append(exception)
 
+    def prepare(self, jobs):
+        for rule in self.rules:
+            if rule.enabled:
+                rule.prepare(jobs)
+
     def applyRules(self, job):
         return sum((rule.rate(job) for rule in self.rules if rule.enabled))
 
@@ -104,14 +116,102 @@ class Balancer(object):
                         0 if self.applyPriorities(job) else 1, # priorities first
                         self.applyRules(job))
 
+    def dispatchKey(self, job):
+        # same as sortKey, for jobs that passed exceptions
+        return (0 if self.applyPriorities(job) else 1, # priorities first
+                        self.applyRules(job))
+
     def balance(self, jobs):
         if jobs:
+            self.prepare(jobs)
             # use inline copy to make sure the list is still accessible while sorting
             jobs[:] = sorted(jobs, key=self.sortKey)
             return jobs[0]
         else:
             return None
 
+class JobQueue(object):
+    """
+    Dispatch order of jobs, as given by a Balancer.
+
+    Jobs that pass the balancer's exceptions are kept in priority heaps, one per
+    set of job tags, so that finding the job to dispatch to a slave only costs
+    O(log n). A job's position is updated incrementally (update()) when its
+    state changes, and all of them are recomputed on rebuild() (usage and time
+    based rules change for all jobs at once).
+    """
+    def __init__(self, balancer):
+        self.balancer = balancer
+        self.lock = threading.RLock()
+        self._heaps = {}   # frozenset(tags) -> heap of [key, seq, job]
+        self._entries = {} # job id -> heap entry, job is set to None in removed entries
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _push(self, job):
+        if self.balancer.applyExceptions(job):
+            return
+
+        entry = [self.balancer.dispatchKey(job), next(self._seq), job]
+        self._entries[job.id] = entry
+        heapq.heappush(self._heaps.setdefault(frozenset(job.tags), []), entry)
+
+    def remove(self, job):
+        with self.lock:
+            entry = self._entries.pop(job.id, None)
+            if entry is not None:
+                entry[-1] = None
+
+    def update(self, job):
+        with self.lock:
+            self.remove(job)
+            self._push(job)
+
+    def rebuild(self, jobs):
+        with self.lock:
+            self._heaps = {}
+            self._entries = {}
+            self.balancer.prepare(jobs)
+            for job in jobs:
+                self._push(job)
+
+    def first(self, slave):
+        """
+        Return the first job that can be dispatched to slave, or None.
+        """
+        with self.lock:
+            best = None
+            for tags, heap in list(self._heaps.items()):
+                if slave.tags and not tags.issubset(slave.tags): # slave uses tags and doesn't have all job tags
+                    continue
+
+                skipped = []
+                while heap:
+                    entry = heap[0]
+                    job = entry[-1]
+                    if job is None:
+                        heapq.heappop(heap) # removed or updated since
+                    elif self.balancer.applyExceptions(job):
+                        # excluded since last update (rules depending on other jobs and slaves)
+                        heapq.heappop(heap)
+                        del self._entries[job.id]
+                    elif slave.id in job.blacklist:
+                        skipped.append(heapq.heappop(heap))
+                    else:
+                        if best is None or entry[:2] < best[:2]:
+                            best = entry
+                        break
+
+                for entry in skipped:
+                    heapq.heappush(heap, entry)
+
+                if not heap:
+                    del self._heaps[tags]
+
+            return best[-1] if best is not None else None
+
 # ==========================
 
 class RatingUsage(RatingRule):
@@ -137,9 +237,23 @@ class RatingUsageByCategory(RatingRule):
     def __str__(self):
         return "Usage per category"
 
+    def prepare(self, jobs):
+        # total usage and maximum priority per category, instead of looking at all jobs for each one
+        categories = {}
+        for j in jobs:
+            total_category_usage, maximum_priority = categories.get(j.category, (0.0, None))
+            categories[j.category] = (total_category_usage + j.usage,
+                                      j.priority if maximum_priority is None else max(maximum_priority, j.priority))
+        self.categories = categories
+
     def rate(self, job):
-        total_category_usage = sum([j.usage for j in self.getJobs() if j.category == job.category])
-        maximum_priority = max([j.priority for j in self.getJobs() if j.category == job.category])
+        category = getattr(self, "categories", {}).get(job.category)
+        if category is None:
+            # not prepared for this job's category
+            total_category_usage = sum([j.usage for j in self.getJobs() if j.category == job.category])
+            maximum_priority = max([j.priority for j in self.getJobs() if j.category == job.category])
+        else:
+            total_category_usage, maximum_priority = category
 
         # less usage is better
         return total_category_usage / maximum_priority
@@ -0,0 +1,145 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+from __future__ import absolute_import
+import os, re, shutil, threading
+from collections import OrderedDict
+
+signature_pattern = re.compile("^[0-9a-fA-F]+$")
+
+def cacheable(rfile):
+    # point caches are rewritten in place when baking, never share them
+    name = rfile.original_path
+    return (rfile.signature is not None and signature_pattern.match(rfile.signature)
+            and not name.endswith(".bphys") and not name.endswith(".bobj.gz"))
+
+def placeFile(src, dst):
+    # hard link when possible, so jobs sharing a file don't duplicate it on disk
+    if os.path.exists(dst):
+        os.remove(dst)
+
+    try:
+        os.link(src, dst)
+    except (AttributeError, OSError): # no hard links on this platform or across devices
+        shutil.copyfile(src, dst)
+
+class FileCache(object):
+    """
+    Content addressed store of job files, kept by signature (hash of the content),
+    so a file is only transferred and stored once for all jobs using it.
+    Least recently used files are removed when the total goes over max_size bytes.
+    """
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict() # signature -> size, least recently used first
+        self.size = 0
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+        self._scan()
+
+    def _scan(self):
+        # last use is kept as modification time, restore the order from it
+        found = []
+        for directory in os.listdir(self.path):
+            directory_path = os.path.join(self.path, directory)
+            if not os.path.isdir(directory_path):
+                continue
+
+            for name in os.listdir(directory_path):
+                file_path = os.path.join(directory_path, name)
+                if signature_pattern.match(name):
+                    stat = os.stat(file_path)
+                    found.append((stat.st_mtime, name, stat.st_size))
+                else: # temporary file from an interrupted add
+                    os.remove(file_path)
+
+        found.sort()
+        for mtime, signature, size in found:
+            self.entries[signature] = size
+            self.size += size
+
+        self._evict()
+
+    def _objectPath(self, signature):
+        return os.path.join(self.path, signature[:2], signature)
+
+    def _evict(self):
+        while self.size > self.max_size and self.entries:
+            signature, size = self.entries.popitem(last = False)
+            self.size -= size
+            try:
+                os.remove(self._objectPath(signature))
+            except OSError:
+                pass
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, signature):
+        return signature in self.entries
+
+    def get(self, signature):
+        """Path of the stored file with that signature, None if not stored."""
+        with self.lock:
+            size = self.entries.pop(signature, None)
+            if size is None:
+                return None
+
+            self.entries[signature] = size # most recently used
+            object_path = self._objectPath(signature)
+            os.utime(object_path, None)
+
+            return object_path
+
+    def fetch(self, signature, file_path):
+        """Place the stored file with that signature at file_path, False if not stored."""
+        object_path = self.get(signature)
+        if object_path is None:
+            return False
+
+        try:
+            placeFile(object_path, file_path)
+        except (IOError, OSError): # evicted in the meantime
+            return False
+
+        return True
+
+    def add(self, signature, file_path):
+        """Store file_path, which must have been checked against its signature."""
+        if self.get(signature) is not None:
+            return
+
+        object_path = self._objectPath(signature)
+        directory = os.path.dirname(object_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        temp_path = object_path + ".temp"
+        placeFile(file_path, temp_path)
+        os.rename(temp_path, object_path)
+
+        with self.lock:
+            if signature not in self.entries:
+                size = os.path.getsize(object_path)
+                self.entries[signature] = size
+                self.size += size
+                self._evict()
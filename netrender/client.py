@@ -119,6 +119,14 @@ def fillCommonJobSettings(job, job_name, netsettings):
     elif netsettings.job_type == "JOB_VCS":
         job.type = netrender.model.JOB_VCS
 
+def missingFiles(response, job):
+    # servers without a file cache don't say which files are missing
+    missing = response.getheader("job-missing")
+    if missing is None:
+        return set((rfile.index for rfile in job.files))
+
+    return set((int(index) for index in missing.split(",") if index))
+
 def sendJob(conn, scene, anim = False, can_save = True):
     netsettings = scene.network_render
     if netsettings.job_type == "JOB_BLENDER":
@@ -244,9 +252,13 @@ def sendJobBaking(conn, scene, can_save = True):
 
     job_id = response.getheader("job-id")
 
-    # if not ACCEPTED (but not processed), send files
+    # if not ACCEPTED (but not processed), send files the server doesn't have
     if response.status == httplib.ACCEPTED:
+        missing = missingFiles(response, job)
         for rfile in job.files:
+            if rfile.index not in missing:
+                continue
+
             f = open(rfile.filepath, "rb")
             with ConnectionContext():
                 conn.request("PUT", fileURL(job_id, rfile.index), f)
@@ -334,9 +346,13 @@ def sendJobBlender(conn, scene, anim = False, can_save = True):
 
     job_id = response.getheader("job-id")
 
-    # if not ACCEPTED (but not processed), send files
+    # if not ACCEPTED (but not processed), send files the server doesn't have
     if response.status == httplib.ACCEPTED:
+        missing = missingFiles(response, job)
         for rfile in job.files:
+            if rfile.index not in missing:
+                continue
+
             f = open(rfile.filepath, "rb")
             with ConnectionContext():
                 conn.request("PUT", fileURL(job_id, rfile.index), f)
@@ -384,7 +400,8 @@ class NetworkRenderEngine(bpy.types.RenderEngine):
                          test_break = self.test_break,
                          use_ssl=netsettings.use_ssl,
                          cert_path=netsettings.cert_path,
-                         key_path=netsettings.key_path)
+                         key_path=netsettings.key_path,
+                         cache_size=netsettings.cache_size)
 
 
     def render_slave(self, scene):
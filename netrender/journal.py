@@ -0,0 +1,210 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Append only journal of the master state changes.
+#
+# The master state is the last snapshot (blender_master.data) plus the records
+# written to the journal since. Records are pickled one after the other:
+#
+#   ("master", path)                                    master directory, first record
+#   ("job", job)                                        job added or changed
+#   ("job_removed", job_id)
+#   ("frame", job_id, index, status, time, slave_id, results)
+#   ("slave", slave)                                    slave added
+#   ("slave_removed", slave_id)
+#   ("slave_seen", slave_id, last_seen)
+#
+# Slaves and jobs other than the recorded one are pickled as references, so a
+# record only holds what changed. Writing a snapshot resets the journal.
+
+from __future__ import absolute_import
+import os, threading
+import pickle
+from io import BytesIO, open
+from collections import OrderedDict
+
+import netrender.model
+
+JOURNAL_NAME = "blender_master.journal"
+COMPACT_RECORDS = 50000 # records written before the state is saved again as a snapshot
+SEEN_INTERVAL = 30      # seconds between two records of the same slave being seen
+
+class RecordPickler(pickle.Pickler):
+    def __init__(self, file, subject = None):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.subject = subject
+
+    def persistent_id(self, obj):
+        if obj is self.subject:
+            return None
+        elif isinstance(obj, netrender.model.RenderSlave):
+            return ("slave", obj.id)
+        elif isinstance(obj, netrender.model.RenderJob):
+            return ("job", obj.id)
+
+        return None
+
+class RecordUnpickler(pickle.Unpickler):
+    def __init__(self, file, jobs, slaves):
+        pickle.Unpickler.__init__(self, file)
+        self.jobs = jobs
+        self.slaves = slaves
+
+    def persistent_load(self, pid):
+        kind, obj_id = pid
+        if kind == "slave":
+            return self.slaves.get(obj_id)
+        else:
+            return self.jobs.get(obj_id)
+
+class Journal(object):
+    def __init__(self, path):
+        self.path = path # directory of the snapshot and journal
+        self.filepath = os.path.join(path, JOURNAL_NAME)
+        self.lock = threading.Lock()
+        self.records = 0
+        self.seen = {} # slave id -> time last seen was written
+        self.file = open(self.filepath, "ab")
+
+    def write(self, record, subject = None):
+        buf = BytesIO()
+        RecordPickler(buf, subject).dump(record)
+
+        with self.lock:
+            self.file.write(buf.getvalue())
+            self.file.flush()
+            self.records += 1
+
+    def jobChanged(self, job):
+        self.write(("job", job), job)
+
+    def jobRemoved(self, job):
+        self.write(("job_removed", job.id))
+
+    def frameChanged(self, job, frame):
+        slave_id = frame.slave.id if frame.slave else None
+        self.write(("frame", job.id, frame.index, frame.status, frame.time, slave_id, frame.results))
+
+    def slaveAdded(self, slave):
+        self.seen[slave.id] = slave.last_seen
+        self.write(("slave", slave), slave)
+
+    def slaveRemoved(self, slave):
+        self.seen.pop(slave.id, None)
+        self.write(("slave_removed", slave.id))
+
+    def slaveSeen(self, slave):
+        # only needed for timeouts, which are in minutes
+        if slave.last_seen - self.seen.get(slave.id, 0) >= SEEN_INTERVAL:
+            self.seen[slave.id] = slave.last_seen
+            self.write(("slave_seen", slave.id, slave.last_seen))
+
+    def needsCompaction(self):
+        return self.records >= COMPACT_RECORDS
+
+    def reset(self, master_path):
+        """Start over, everything before is in a snapshot."""
+        with self.lock:
+            self.file.close()
+            self.file = open(self.filepath, "wb")
+            self.records = 0
+
+        self.write(("master", master_path))
+
+    def close(self):
+        self.file.close()
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
+
+def replay(path, master_path, jobs, slaves):
+    """
+    Apply the journal in path to the state of the last snapshot (master_path, jobs and slaves),
+    return the resulting (master_path, jobs, slaves).
+    """
+    filepath = os.path.join(path, JOURNAL_NAME)
+
+    jobs_map = OrderedDict((job.id, job) for job in jobs)
+    slaves_map = OrderedDict((slave.id, slave) for slave in slaves)
+
+    if os.path.exists(filepath):
+        count = 0
+        valid = 0
+
+        with open(filepath, "rb") as f:
+            unpickler = RecordUnpickler(f, jobs_map, slaves_map)
+
+            while True:
+                try:
+                    record = unpickler.load()
+                except EOFError:
+                    break
+                except Exception, err: # record cut by a crash while it was written
+                    print "Journal truncated after %i records: %s" % (count, err)
+                    break
+
+                valid = f.tell()
+                count += 1
+
+                kind = record[0]
+                if kind == "master":
+                    master_path = record[1]
+                elif kind == "job":
+                    job = record[1]
+                    jobs_map[job.id] = job
+                elif kind == "job_removed":
+                    jobs_map.pop(record[1], None)
+                elif kind == "frame":
+                    job_id, index, status, frame_time, slave_id, results = record[1:]
+                    job = jobs_map.get(job_id)
+                    if job:
+                        frame = job.frames[index]
+                        frame._status = status # indices are rebuilt on restore
+                        frame.time = frame_time
+                        frame.slave = slaves_map.get(slave_id)
+                        frame.results = list(results)
+                elif kind == "slave":
+                    slave = record[1]
+                    slaves_map[slave.id] = slave
+                elif kind == "slave_removed":
+                    slaves_map.pop(record[1], None)
+                elif kind == "slave_seen":
+                    slave = slaves_map.get(record[1])
+                    if slave:
+                        slave.last_seen = record[2]
+
+        if valid < os.path.getsize(filepath):
+            with open(filepath, "r+b") as f:
+                f.truncate(valid)
+
+        print "Replayed %i journal records" % count
+
+    # assignments of slaves follow from the frames they were dispatched
+    for slave in slaves_map.values():
+        slave.job = None
+        slave.job_frames = []
+
+    for job in jobs_map.values():
+        for frame in job.frames:
+            if frame._status == netrender.model.FRAME_DISPATCHED and frame.slave is not None:
+                frame.slave.job = job
+                frame.slave.job_frames.append(frame.number)
+
+    return master_path, list(jobs_map.values()), list(slaves_map.values())
@@ -24,16 +24,21 @@ import http, httplib, socket, SocketServer
 from io import open
 import CGIHTTPServer, SimpleHTTPServer, BaseHTTPServer
 import shutil, time, hashlib
+import heapq
 import pickle
 import zipfile
 import select # for select.error
 import json
+from collections import OrderedDict
 
 
 from netrender.utils import *
 import netrender.model
 import netrender.balancing
+import netrender.cache
+import netrender.journal
 import netrender.master_html
+import netrender.master_loop
 import netrender.thumbnail as thumbnail
 
 class MRenderFile(netrender.model.RenderFile):
@@ -86,6 +91,8 @@ class MRenderSlave(netrender.model.RenderSlave):
 
 class MRenderJob(netrender.model.RenderJob):
     def __init__(self, job_id, job_info):
+        self._master = None # server indexing this job, notified of status changes
+        self._initIndex()
         super(MRenderJob, self).__init__(job_info)
         self.id = job_id
         self.last_dispatched = time.time()
@@ -102,7 +109,50 @@ class MRenderJob(netrender.model.RenderJob):
         self.last_update = 0
         self.save_path = ""
         self.files = [MRenderFile(rfile.filepath, rfile.index, rfile.start, rfile.end, rfile.signature) for rfile in job_info.files]
-        
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_master"] = None
+        return state
+
+    def _initIndex(self):
+        self._frames_map = {} # frame number -> frame
+        self._frames_status = dict((status, set()) for status in netrender.model.FRAME_STATUS_TEXT)
+        self._queued = [] # heap of indices of queued frames, lazily cleaned
+
+    def _indexFrame(self, index, frame):
+        frame.index = index
+        self._frames_map.setdefault(frame.number, frame)
+        self._frames_status[frame.status].add(frame)
+        if frame.status == netrender.model.FRAME_QUEUED:
+            heapq.heappush(self._queued, index)
+
+    def rebuildIndex(self):
+        self._initIndex()
+        for index, frame in enumerate(self.frames):
+            frame.job = self
+            self._indexFrame(index, frame)
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        old_status = self._status
+        netrender.model.RenderJob.status.fset(self, value)
+        if self._master is not None and old_status != value:
+            self._master.jobStatusChanged(self, old_status)
+
+    def frameStatusChanged(self, frame, old_status):
+        self._frames_status[old_status].discard(frame)
+        self._frames_status[frame.status].add(frame)
+        if frame.status == netrender.model.FRAME_QUEUED:
+            heapq.heappush(self._queued, frame.index)
+
+        if self._master is not None:
+            self._master.frameStatusChanged(self, frame)
+
     def setForceUpload(self, force):
         for rfile in self.files:
             rfile.force = force
@@ -127,6 +177,30 @@ class MRenderJob(netrender.model.RenderJob):
         if "chunks" in info_map:
             self.chunks = info_map["chunks"]
 
+    def localFilePath(self, rfile):
+        main_file = self.files[0].original_path # original path of the first file
+
+        main_path, main_name = os.path.split(main_file)
+
+        if rfile.index > 0:
+            return createLocalPath(rfile, self.save_path, main_path, True)
+        else:
+            return os.path.join(self.save_path, main_name)
+
+    def fetchCachedFiles(self, cache):
+        # use files already received for other jobs instead of having them uploaded again
+        for rfile in self.files:
+            if rfile.force or not netrender.cache.cacheable(rfile) or rfile.test():
+                continue
+
+            file_path = self.localFilePath(rfile)
+            if cache.fetch(rfile.signature, file_path):
+                rfile.filepath = file_path
+                rfile.found = True # checked when stored
+
+    def missingFiles(self):
+        return [rfile.index for rfile in self.files if not rfile.found]
+
     def testStart(self):
         # Don't test files for versionned jobs
         if not self.version_info:
@@ -174,8 +248,25 @@ class MRenderJob(netrender.model.RenderJob):
     def addFrame(self, frame_number, command):
         frame = MRenderFrame(frame_number, command)
         self.frames.append(frame)
+        self._indexFrame(len(self.frames) - 1, frame)
+        frame.job = self
         return frame
 
+    def countFrames(self, status=netrender.model.FRAME_QUEUED):
+        return len(self._frames_status[status])
+
+    def countSlaves(self):
+        return len(set((frame.slave for frame in self._frames_status[netrender.model.FRAME_DISPATCHED])))
+
+    def framesStatus(self):
+        return dict((status, len(frames)) for status, frames in self._frames_status.items())
+
+    def __contains__(self, frame_number):
+        return frame_number in self._frames_map
+
+    def __getitem__(self, frame_number):
+        return self._frames_map.get(frame_number)
+
     def reset(self, all):
         for f in self.frames:
             f.reset(all)
@@ -185,12 +276,20 @@ class MRenderJob(netrender.model.RenderJob):
 
     def getFrames(self):
         frames = []
-        for f in self.frames:
-            if f.status == netrender.model.FRAME_QUEUED:
-                self.last_dispatched = time.time()
+        queued = self._queued
+        while queued and (not frames or len(frames) < self.chunks):
+            index = heapq.heappop(queued)
+            f = self.frames[index]
+            # skip frames not queued anymore, and duplicate entries (adjacent in the heap)
+            if f.status == netrender.model.FRAME_QUEUED and (not frames or frames[-1] is not f):
                 frames.append(f)
-                if len(frames) >= self.chunks:
-                    break
+
+        # they stay queued until actually dispatched
+        for f in frames:
+            heapq.heappush(queued, f.index)
+
+        if frames:
+            self.last_dispatched = time.time()
 
         return frames
     
@@ -199,6 +298,9 @@ class MRenderJob(netrender.model.RenderJob):
 
 class MRenderFrame(netrender.model.RenderFrame):
     def __init__(self, frame, command):
+        self.job = None # job indexing this frame, notified of status changes
+        self.index = -1
+        self._status = None
         super(MRenderFrame, self).__init__()
         self.number = frame
         self.slave = None
@@ -208,6 +310,23 @@ class MRenderFrame(netrender.model.RenderFrame):
 
         self.log_path = None
 
+    def __setstate__(self, state):
+        # saved before status was a property
+        if "status" in state:
+            state["_status"] = state.pop("status")
+        self.__dict__.update(state)
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value):
+        old_status = self._status
+        self._status = value
+        if self.job is not None and old_status != value:
+            self.job.frameStatusChanged(self, old_status)
+
     def addDefaultRenderResult(self):
         self.results.append(self.getRenderFilename())
 
@@ -238,12 +357,18 @@ edit_pattern = re.compile("/edit_([a-zA-Z0-9]+)")
 
 class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
     def write_file(self, file_path, mode = 'wb'):
+        # body already spooled to disk by the master loop, move it in place
+        if mode == 'wb' and hasattr(self.rfile, "moveBody") and self.rfile.moveBody(file_path):
+            return
+
         length = int(self.headers['content-length'])
-        f = open(file_path, mode)
-        buf = self.rfile.read(length)
-        f.write(buf)
-        f.close()
-        del buf
+        with open(file_path, mode) as f:
+            while length > 0:
+                buf = self.rfile.read(min(length, netrender.master_loop.CHUNK_SIZE))
+                if not buf:
+                    break
+                f.write(buf)
+                length -= len(buf)
         
     def log_message(self, format, *args):
         # override because the original calls self.address_string(), which
@@ -481,8 +606,6 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
 
         # =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
         elif self.path == "/job":
-            self.server.balance()
-
             slave_id = self.headers['slave-id']
 
             slave = self.server.getSeenSlave(slave_id)
@@ -493,12 +616,14 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                 if job and frames:
                     for f in frames:
                         print "dispatch", f.number
-                        f.status = netrender.model.FRAME_DISPATCHED
                         f.slave = slave
+                        f.status = netrender.model.FRAME_DISPATCHED
 
                     slave.job = job
                     slave.job_frames = [f.number for f in frames]
 
+                    self.server.updateJob(job)
+
                     self.send_head(headers={"job-id": job.id})
 
                     message = job.serialize(frames)
@@ -590,13 +715,18 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
 
             self.server.addJob(job)
 
+            if self.server.cache:
+                job.fetchCachedFiles(self.server.cache)
+
             headers={"job-id": job_id}
 
             if job.testStart():
                 self.server.stats("", "New job, started")
                 self.send_head(headers=headers, content = None)
             else:
-                self.server.stats("", "New job, missing files (%i total)" % len(job.files))
+                missing = job.missingFiles()
+                self.server.stats("", "New job, missing files (%i of %i total)" % (len(missing), len(job.files)))
+                headers["job-missing"] = ",".join((str(index) for index in missing))
                 self.send_head(httplib.ACCEPTED, headers=headers)
         # =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
         elif self.path.startswith("/edit"):
@@ -611,6 +741,7 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                     info_map = self.getInfoMap()
 
                     job.edit(info_map)
+                    self.server.jobChanged(job)
                     self.send_head(content = None)
                 else:
                     # no such job id
@@ -629,6 +760,7 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                 except:
                     pass # invalid type
 
+            self.server.balance()
             self.send_head(content = None)
         # =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
         elif self.path == "/balance_enable":
@@ -638,6 +770,7 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                 if rule:
                     rule.enabled = enabled
 
+            self.server.balance()
             self.send_head(content = None)
         # =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-
         elif self.path.startswith("/cancel"):
@@ -785,14 +918,7 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                     rfile = job.files[file_index]
 
                     if rfile:
-                        main_file = job.files[0].original_path # original path of the first file
-
-                        main_path, main_name = os.path.split(main_file)
-
-                        if file_index > 0:
-                            file_path = createLocalPath(rfile, job.save_path, main_path, True)
-                        else:
-                            file_path = os.path.join(job.save_path, main_name)
+                        file_path = job.localFilePath(rfile)
 
                         # add same temp file + renames as slave
                         
@@ -800,6 +926,12 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                         
                         rfile.filepath = file_path # set the new path
                         found = rfile.updateStatus() # make sure we have the right file
+
+                        if found and self.server.cache and netrender.cache.cacheable(rfile):
+                            self.server.cache.add(rfile.signature, file_path)
+
+                        if found:
+                            self.server.jobChanged(job)
                         
                         if not found: # checksum mismatch
                             self.server.stats("", "File upload but checksum mismatch, this shouldn't happen")
@@ -852,11 +984,12 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                                 # slaves might already be in blacklist if errors on the whole chunk
                                 if not slave.id in job.blacklist:
                                     job.blacklist.append(slave.id)
+                                    self.server.jobChanged(job)
 
                         slave.finishedFrame(job_frame)
 
-                        frame.status = job_result
                         frame.time = job_time
+                        frame.status = job_result
 
                         job.testFinished()
 
@@ -900,8 +1033,8 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
                             job_time = float(self.headers['job-time'])
                             slave.finishedFrame(job_frame)
     
-                            frame.status = job_result
                             frame.time = job_time
+                            frame.status = job_result
 
                             job.testFinished()
                     else: # frame not found
@@ -970,12 +1103,17 @@ class RenderHandler(BaseHTTPServer.BaseHTTPRequestHandler):
             else: # invalid url
                 self.send_head(httplib.NO_CONTENT)
 
+class BufferedRenderHandler(netrender.master_loop.BufferedRequestMixin, RenderHandler):
+    pass
+
 class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
     def __init__(self, address, handler_class, path, force=False, subdir=True):
         self.jobs = []
         self.jobs_map = {}
+        self.jobs_status = dict((status, set()) for status in netrender.model.JOB_STATUS_TEXT)
         self.slaves = []
         self.slaves_map = {}
+        self.slaves_seen = OrderedDict() # slave id -> slave, least recently seen first
         self.job_id = 0
         self.force = force
 
@@ -988,6 +1126,9 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
 
         self.slave_timeout = 5 # 5 mins: need a parameter for that
 
+        self.cache = None # shared store of job files, see netrender.cache
+        self.journal = None # log of state changes since the last save, see netrender.journal
+
         self.balancer = netrender.balancing.Balancer()
         self.balancer.addRule(netrender.balancing.RatingUsageByCategory(self.getJobs))
         self.balancer.addRule(netrender.balancing.RatingUsage())
@@ -996,6 +1137,8 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
         self.balancer.addPriority(netrender.balancing.NewJobPriority())
         self.balancer.addPriority(netrender.balancing.MinimumTimeBetweenDispatchPriority(limit = 2))
 
+        self.queue = netrender.balancing.JobQueue(self.balancer)
+
         super(RenderMasterServer, self).__init__(address, handler_class)
 
     def restore(self, jobs, slaves, balancer = None):
@@ -1005,13 +1148,20 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
         for job in self.jobs:
             self.jobs_map[job.id] = job
             self.job_id = max(self.job_id, int(job.id))
+            self.jobs_status[job.status].add(job)
+            job.rebuildIndex()
+            job._master = self
 
         self.slaves = slaves
-        for slave in self.slaves:
+        for slave in sorted(self.slaves, key=lambda slave: slave.last_seen):
             self.slaves_map[slave.id] = slave
+            self.slaves_seen[slave.id] = slave
         
         if balancer:
             self.balancer = balancer
+            self.queue = netrender.balancing.JobQueue(self.balancer)
+
+        self.balance()
         
 
     def nextJobID(self):
@@ -1022,12 +1172,21 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
         slave = MRenderSlave(slave_info)
         self.slaves.append(slave)
         self.slaves_map[slave.id] = slave
+        self.slaves_seen.pop(slave.id, None)
+        self.slaves_seen[slave.id] = slave
+
+        if self.journal:
+            self.journal.slaveAdded(slave)
 
         return slave.id
 
     def removeSlave(self, slave):
         self.slaves.remove(slave)
         self.slaves_map.pop(slave.id)
+        self.slaves_seen.pop(slave.id, None)
+
+        if self.journal:
+            self.journal.slaveRemoved(slave)
 
     def getSlave(self, slave_id):
         return self.slaves_map.get(slave_id)
@@ -1036,6 +1195,12 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
         slave = self.getSlave(slave_id)
         if slave:
             slave.seen()
+            # move to the end (most recently seen)
+            self.slaves_seen.pop(slave.id, None)
+            self.slaves_seen[slave.id] = slave
+
+            if self.journal:
+                self.journal.slaveSeen(slave)
 
         return slave
 
@@ -1044,13 +1209,17 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
 
         t = time.time()
 
-        for slave in self.slaves:
+        # only look at the least recently seen slaves
+        for slave_id in self.slaves_seen:
+            slave = self.slaves_seen[slave_id]
             if (t - slave.last_seen) / 60 > self.slave_timeout:
                 removed.append(slave)
 
                 if slave.job:
                     for f in slave.job_frames:
                         slave.job[f].status = netrender.model.FRAME_ERROR
+            else:
+                break
 
         for slave in removed:
             self.removeSlave(slave)
@@ -1074,19 +1243,56 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
         for job in removed:
             self.removeJob(job, clear_files)
 
+    def handleBuffered(self, rfile, wfile, client_address):
+        # request read by the master loop
+        BufferedRenderHandler((rfile, wfile), client_address, self)
+
+    def useWorker(self, head):
+        # requests copying result files, zipping them or generating thumbnails
+        # are handled by worker threads of the master loop
+        method, _, path = head.partition(b" ")
+        return method == b"GET" and path.startswith((b"/render", b"/result", b"/thumb", b"/log"))
+
+    def housekeeping(self):
+        self.timeoutSlaves()
+        self.updateUsage()
+        self.balance()
+
+        if self.journal and self.journal.needsCompaction():
+            saveMaster(self.journal.path, self)
+
     def balance(self):
+        # keep jobs sorted for display, and recompute the dispatch order of all jobs
         self.balancer.balance(self.jobs)
+        self.queue.rebuild(self.jobs)
+
+    def updateJob(self, job):
+        # job state changed, update its place in the dispatch order
+        if job.id in self.jobs_map:
+            self.queue.update(job)
+
+    def jobChanged(self, job):
+        self.updateJob(job)
+
+        if self.journal and job.id in self.jobs_map:
+            self.journal.jobChanged(job)
+
+    def jobStatusChanged(self, job, old_status):
+        self.jobs_status[old_status].discard(job)
+        self.jobs_status[job.status].add(job)
+        self.jobChanged(job)
+
+    def frameStatusChanged(self, job, frame):
+        self.updateJob(job)
+
+        if self.journal and job.id in self.jobs_map:
+            self.journal.frameChanged(job, frame)
 
     def getJobs(self):
         return self.jobs
 
     def countJobs(self, status = netrender.model.JOB_QUEUED):
-        total = 0
-        for j in self.jobs:
-            if j.status == status:
-                total += 1
-
-        return total
+        return len(self.jobs_status[status])
 
     def countSlaves(self):
         return len(self.slaves)
@@ -1094,6 +1300,12 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
     def removeJob(self, job, clear_files = False):
         self.jobs.remove(job)
         self.jobs_map.pop(job.id)
+        self.jobs_status[job.status].discard(job)
+        self.queue.remove(job)
+        job._master = None
+
+        if self.journal:
+            self.journal.jobRemoved(job)
 
         if clear_files:
             shutil.rmtree(job.save_path)
@@ -1106,6 +1318,9 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
     def addJob(self, job):
         self.jobs.append(job)
         self.jobs_map[job.id] = job
+        self.jobs_status[job.status].add(job)
+        job._master = self
+        self.updateJob(job)
 
         # create job directory
         job.save_path = os.path.join(self.path, "job_" + job.id)
@@ -1113,6 +1328,9 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
 
         job.save()
 
+        if self.journal:
+            self.journal.jobChanged(job)
+
     def getJobID(self, id):
         return self.jobs_map.get(id)
 
@@ -1121,15 +1339,10 @@ class RenderMasterServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer)
             yield job
 
     def newDispatch(self, slave):
-        if self.jobs:
-            for job in self.jobs:
-                if (
-                    not self.balancer.applyExceptions(job)      # No exceptions
-                    and slave.id not in job.blacklist           # slave is not blacklisted
-                    and (not slave.tags or job.tags.issubset(slave.tags))  # slave doesn't use tags or slave has all job tags
-                         ):
-                    
-                    return job, job.getFrames()
+        # first job without exceptions, not blacklisting the slave and with tags matching the slave's ones
+        job = self.queue.first(slave)
+        if job:
+            return job, job.getFrames()
 
         return None, None
 
@@ -1138,29 +1351,60 @@ def clearMaster(path):
 
 def createMaster(address, clear, force, path):
     filepath = os.path.join(path, "blender_master.data")
+    journal_filepath = os.path.join(path, netrender.journal.JOURNAL_NAME)
 
-    if not clear and os.path.exists(filepath):
-        print "loading saved master:", filepath
-        with open(filepath, 'rb') as f:
-            path, jobs, slaves = pickle.load(f)
-            
-            httpd = RenderMasterServer(address, RenderHandler, path, force=force, subdir=False)
+    if not clear and (os.path.exists(filepath) or os.path.exists(journal_filepath)):
+        master_path, jobs, slaves = None, [], []
+
+        if os.path.exists(filepath):
+            print "loading saved master:", filepath
+            with open(filepath, 'rb') as f:
+                master_path, jobs, slaves = pickle.load(f)
+
+        # changes since the last save
+        master_path, jobs, slaves = netrender.journal.replay(path, master_path, jobs, slaves)
+
+        if master_path:
+            httpd = RenderMasterServer(address, RenderHandler, master_path, force=force, subdir=False)
             httpd.restore(jobs, slaves)
-            
+            httpd.journal = netrender.journal.Journal(path)
+
             return httpd
 
-    return RenderMasterServer(address, RenderHandler, path, force=force)
+    if clear and os.path.exists(filepath):
+        os.remove(filepath) # the journal restarts from an empty state
+
+    httpd = RenderMasterServer(address, RenderHandler, path, force=force)
+    httpd.journal = netrender.journal.Journal(path)
+    httpd.journal.reset(httpd.path)
+
+    return httpd
 
 def saveMaster(path, httpd):
     filepath = os.path.join(path, "blender_master.data")
+    temp_filepath = filepath + ".temp"
     
-    with open(filepath, 'wb') as f:
+    # the journal is only reset once the new state is safely on disk
+    with open(temp_filepath, 'wb') as f:
         pickle.dump((httpd.path, httpd.jobs, httpd.slaves), f, pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+
+    try:
+        os.rename(temp_filepath, filepath)
+    except OSError: # can't replace files on Windows
+        os.remove(filepath)
+        os.rename(temp_filepath, filepath)
 
-def runMaster(address, broadcast, clear, force, path, update_stats, test_break,use_ssl=False,cert_path="",key_path=""):
+    if httpd.journal:
+        httpd.journal.reset(httpd.path)
+
+def runMaster(address, broadcast, clear, force, path, update_stats, test_break,use_ssl=False,cert_path="",key_path="",cache_size=0):
     httpd = createMaster(address, clear, force, path)
     httpd.timeout = 1
     httpd.stats = update_stats
+    if cache_size > 0:
+        httpd.cache = netrender.cache.FileCache(os.path.join(path, "cache"), cache_size * 1024 * 1024)
     if use_ssl:
         import ssl
         httpd.socket = ssl.wrap_socket(
@@ -1173,27 +1417,42 @@ def runMaster(address, broadcast, clear, force, path, update_stats, test_break,u
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
-    start_time = time.time() - 2
+    def broadcastAddress():
+        print "broadcasting address"
+        s.sendto(str("%i" % address[1]).encode('utf8'), 0, ('<broadcast>', 8000))
 
-    while not test_break():
-        try:
-            httpd.handle_request()
-        except select.error:
-            pass
+    if use_ssl:
+        # TLS sockets can't be multiplexed by the master loop, serve one request at a time
+        start_time = time.time() - 2
+
+        while not test_break():
+            try:
+                httpd.handle_request()
+            except select.error:
+                pass
 
-        if time.time() - start_time >= 2: # need constant here
-            httpd.timeoutSlaves()
+            if time.time() - start_time >= 2: # need constant here
+                httpd.housekeeping()
 
-            httpd.updateUsage()
+                if broadcast:
+                    broadcastAddress()
 
-            if broadcast:
-                print "broadcasting address"
-                s.sendto(str("%i" % address[1]).encode('utf8'), 0, ('<broadcast>', 8000))
                 start_time = time.time()
+    else:
+        loop = netrender.master_loop.EventLoop(os.path.join(httpd.path, "spool"))
+        loop.listen(httpd.socket, httpd.handleBuffered, httpd.useWorker)
+        loop.addTimer(2, httpd.housekeeping, delay = 0) # need constant here
+
+        if broadcast:
+            loop.addTimer(2, broadcastAddress, delay = 0)
+
+        loop.run(test_break)
 
     httpd.server_close()
     if clear:
         clearMaster(httpd.path)
+        httpd.journal.remove()
     else:
         saveMaster(path, httpd)
+        httpd.journal.close()
 
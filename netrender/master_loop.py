@@ -0,0 +1,391 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Non blocking transport for the master server.
+#
+# One thread multiplexes all connections with select(). Requests are read as
+# data arrives, large bodies (render results, job files) being spooled to disk
+# chunk by chunk, and only complete requests are handed to the request handler,
+# which then never waits on the network. Responses are spooled the same way and
+# sent back as sockets become writable. Periodic work runs on timers.
+#
+# Requests doing file or process work (zipping results, generating thumbnails)
+# are handled by worker threads instead, their response is handed back to the
+# loop when it's ready, so they don't hold up other connections and timers.
+
+from __future__ import division
+from __future__ import absolute_import
+import os, time, errno, shutil
+import socket, select
+import heapq, itertools, tempfile
+import threading, Queue
+from io import BytesIO
+
+CHUNK_SIZE = 64 * 1024          # bytes read from or written to a socket at once
+SPOOL_SIZE = 256 * 1024         # bodies and responses bigger than this are kept on disk
+MAX_HEADER_SIZE = 64 * 1024
+IDLE_TIMEOUT = 120              # seconds before an idle connection is closed
+SELECT_TIMEOUT = 0.5            # maximum wait, so the stop function is tested often enough
+WORKER_THREADS = 2
+WORKER_POLL = 0.05              # maximum wait while worker threads are busy, to send their responses early
+
+class RequestFile(object):
+    """
+    Request read by the loop, used as rfile by the handler.
+    Headers are kept in memory, the body in memory or in a spool file.
+    """
+    def __init__(self, head, body, body_path = ""):
+        self.head = BytesIO(head)
+        self.body = body
+        self.body_path = body_path
+
+    def readline(self, size = -1):
+        return self.head.readline(size)
+
+    def read(self, size = -1):
+        return self.body.read(size)
+
+    def moveBody(self, file_path):
+        """Move the spooled body to file_path instead of copying it, False if it isn't on disk."""
+        if not self.body_path or self.body.tell() != 0:
+            return False
+
+        self.body.close()
+        shutil.move(self.body_path, file_path)
+        self.body_path = ""
+
+        return True
+
+    def close(self):
+        self.body.close()
+        if self.body_path and os.path.exists(self.body_path):
+            os.remove(self.body_path)
+
+class BufferedRequestMixin:
+    """
+    Mixin for StreamRequestHandler based handlers run by the loop,
+    the request is the (rfile, wfile) pair of buffered files.
+    Old style like SocketServer handlers, so they keep their __init__.
+    """
+    def setup(self):
+        self.connection = None
+        self.rfile, self.wfile = self.request
+
+    def finish(self):
+        pass
+
+def contentLength(head):
+    for line in head.split(b"\r\n"):
+        name, sep, value = line.partition(b":")
+        if sep and name.strip().lower() == b"content-length":
+            try:
+                return max(int(value.strip()), 0)
+            except ValueError:
+                return 0
+    return 0
+
+class Workers(object):
+    """
+    Threads running functions away from the loop. Callbacks of finished
+    functions are run by the loop thread, see runCallbacks.
+    """
+    def __init__(self, count):
+        self.tasks = Queue.Queue()
+        self.finished = Queue.Queue()
+        self.pending = 0
+        self.threads = []
+
+        for i in xrange(count):
+            thread = threading.Thread(target = self.work)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, function, callback):
+        """Call function in a worker thread, then callback in the loop thread."""
+        self.pending += 1
+        self.tasks.put((function, callback))
+
+    def work(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+
+            function, callback = task
+            try:
+                function()
+            except Exception:
+                import traceback
+                traceback.print_exc()
+            finally:
+                self.finished.put(callback)
+
+    def runCallbacks(self):
+        while True:
+            try:
+                callback = self.finished.get_nowait()
+            except Queue.Empty:
+                return
+
+            self.pending -= 1
+            callback()
+
+    def stop(self):
+        """Wait for the submitted functions, then for the threads to end."""
+        for thread in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.runCallbacks()
+
+class Connection(object):
+    def __init__(self, loop, sock, address, handle_request, use_worker):
+        self.loop = loop
+        self.sock = sock
+        self.address = address
+        self.handle_request = handle_request
+        self.use_worker = use_worker
+        self.last_activity = time.time()
+        self.busy = False # request handled by a worker thread
+        self.closed = False
+
+        self.head = b""
+        self.body = None
+        self.body_path = ""
+        self.remaining = 0
+
+        self.response = None
+        self.out = b""
+
+    @property
+    def reading(self):
+        return self.response is None and not self.busy
+
+    @property
+    def writing(self):
+        return self.response is not None
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def onReadable(self):
+        data = self.sock.recv(CHUNK_SIZE)
+        if not data: # closed by peer
+            self.close()
+            return
+
+        self.last_activity = time.time()
+
+        if self.body is None:
+            self.head += data
+            end = self.head.find(b"\r\n\r\n")
+            if end == -1:
+                if len(self.head) > MAX_HEADER_SIZE:
+                    self.close()
+                return
+
+            data = self.head[end + 4:]
+            self.head = self.head[:end + 4]
+            self.remaining = contentLength(self.head)
+
+            if self.remaining > SPOOL_SIZE:
+                fd, self.body_path = tempfile.mkstemp(prefix = "request_", dir = self.loop.spool_path)
+                self.body = os.fdopen(fd, "w+b")
+            else:
+                self.body = BytesIO()
+
+        if data:
+            data = data[:self.remaining] # no pipelining, anything after the body is dropped
+            self.body.write(data)
+            self.remaining -= len(data)
+
+        if self.remaining <= 0:
+            self.process()
+
+    def process(self):
+        self.body.seek(0)
+        request = RequestFile(self.head, self.body, self.body_path)
+        response = tempfile.SpooledTemporaryFile(SPOOL_SIZE, prefix = "response_", dir = self.loop.spool_path)
+
+        self.body = None
+        self.body_path = ""
+
+        if self.use_worker is not None and self.use_worker(self.head):
+            self.busy = True
+            self.loop.workers.submit(lambda: self.handle(request, response), lambda: self.respond(response))
+        else:
+            self.handle(request, response)
+            self.respond(response)
+
+    def handle(self, request, response):
+        try:
+            self.handle_request(request, response, self.address)
+        except Exception:
+            import traceback
+            traceback.print_exc()
+        finally:
+            request.close()
+
+    def respond(self, response):
+        self.busy = False
+        if self.closed:
+            response.close()
+            return
+
+        response.seek(0)
+        self.response = response
+        self.last_activity = time.time()
+
+    def onWritable(self):
+        if not self.out:
+            self.out = self.response.read(CHUNK_SIZE)
+            if not self.out: # all sent, responses are HTTP/1.0, close to end them
+                self.close()
+                return
+
+        sent = self.sock.send(self.out)
+        self.out = self.out[sent:]
+        self.last_activity = time.time()
+
+    def close(self):
+        self.closed = True
+        self.loop.removeConnection(self)
+
+        try:
+            self.sock.close()
+        except socket.error:
+            pass
+
+        if self.body is not None:
+            self.body.close()
+            if self.body_path and os.path.exists(self.body_path):
+                os.remove(self.body_path)
+            self.body = None
+
+        if self.response is not None:
+            self.response.close()
+            self.response = None
+
+class EventLoop(object):
+    def __init__(self, spool_path):
+        self.spool_path = spool_path
+        if not os.path.exists(spool_path):
+            os.makedirs(spool_path)
+
+        self.listeners = {}     # listening socket -> (request handling function, worker test function)
+        self.connections = {}   # socket -> Connection
+        self.timers = []        # heap of (deadline, seq, interval, function)
+        self._seq = itertools.count()
+        self.workers = Workers(WORKER_THREADS)
+
+        self.addTimer(IDLE_TIMEOUT / 4, self.closeIdle)
+
+    def listen(self, sock, handle_request, use_worker = None):
+        """
+        handle_request(rfile, wfile, client_address) is called for each complete request,
+        in a worker thread when use_worker(request_head) returns True.
+        """
+        sock.setblocking(0)
+        self.listeners[sock] = (handle_request, use_worker)
+
+    def addTimer(self, interval, function, delay = None):
+        """Call function every interval seconds, first after delay (interval by default)."""
+        if delay is None:
+            delay = interval
+        heapq.heappush(self.timers, (time.time() + delay, next(self._seq), interval, function))
+
+    def removeConnection(self, connection):
+        self.connections.pop(connection.sock, None)
+
+    def closeIdle(self):
+        t = time.time()
+        for connection in list(self.connections.values()):
+            if not connection.busy and t - connection.last_activity > IDLE_TIMEOUT:
+                connection.close()
+
+    def accept(self, sock):
+        try:
+            conn, address = sock.accept()
+        except socket.error, err:
+            if err.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return
+            raise
+
+        conn.setblocking(0)
+        handle_request, use_worker = self.listeners[sock]
+        self.connections[conn] = Connection(self, conn, address, handle_request, use_worker)
+
+    def runTimers(self):
+        t = time.time()
+        while self.timers and self.timers[0][0] <= t:
+            deadline, seq, interval, function = heapq.heappop(self.timers)
+            try:
+                function()
+            finally:
+                heapq.heappush(self.timers, (max(deadline + interval, t), seq, interval, function))
+
+    def runOnce(self, timeout = SELECT_TIMEOUT):
+        if self.workers.pending:
+            timeout = min(timeout, WORKER_POLL)
+        if self.timers:
+            timeout = max(min(timeout, self.timers[0][0] - time.time()), 0)
+
+        connections = list(self.connections.values())
+        readers = list(self.listeners) + [c.sock for c in connections if c.reading]
+        writers = [c.sock for c in connections if c.writing]
+
+        try:
+            readable, writable, _ = select.select(readers, writers, [], timeout)
+        except select.error, err:
+            if err.args[0] != errno.EINTR:
+                raise
+            readable, writable = [], []
+
+        for sock in readable:
+            if sock in self.listeners:
+                self.accept(sock)
+            else:
+                self.dispatch(sock, "onReadable")
+
+        for sock in writable:
+            self.dispatch(sock, "onWritable")
+
+        self.workers.runCallbacks()
+        self.runTimers()
+
+    def dispatch(self, sock, event):
+        connection = self.connections.get(sock)
+        if connection is None: # closed earlier in this iteration
+            return
+
+        try:
+            getattr(connection, event)()
+        except socket.error, err:
+            if err.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                connection.close()
+
+    def run(self, stop):
+        """Run until stop() returns True."""
+        try:
+            while not stop():
+                self.runOnce()
+        finally:
+            self.workers.stop()
+            for connection in list(self.connections.values()):
+                connection.close()
@@ -23,13 +23,14 @@ import sys, os, platform, shutil
 import http, httplib
 from io import open
 import CGIHTTPServer, SimpleHTTPServer, BaseHTTPServer
-import subprocess, time, threading
+import subprocess, time, threading, hashlib
 import json
 
 import bpy
 
 from netrender.utils import *
 import netrender.model
+import netrender.cache
 import netrender.repath
 import netrender.baking
 import netrender.thumbnail as thumbnail
@@ -69,7 +70,7 @@ def testCancel(conn, job_id, frame_number):
         else:
             return False
 
-def testFile(conn, job_id, slave_id, rfile, job_prefix, main_path=None):
+def testFile(conn, job_id, slave_id, rfile, job_prefix, main_path=None, cache=None):
     job_full_path = createLocalPath(rfile, job_prefix, main_path, rfile.force)
     
     found = os.path.exists(job_full_path)
@@ -82,6 +83,13 @@ def testFile(conn, job_id, slave_id, rfile, job_prefix, main_path=None):
             print "Found file %s at %s but signature mismatch!" % (rfile.filepath, job_full_path)
             os.remove(job_full_path)
 
+    use_cache = cache is not None and netrender.cache.cacheable(rfile)
+
+    if not found and use_cache:
+        # already downloaded for another job
+        job_full_path = createLocalPath(rfile, job_prefix, main_path, True)
+        found = cache.fetch(rfile.signature, job_full_path)
+
     if not found:
         # Force prefix path if not found
         job_full_path = createLocalPath(rfile, job_prefix, main_path, True)
@@ -94,16 +102,21 @@ def testFile(conn, job_id, slave_id, rfile, job_prefix, main_path=None):
         if response.status != httplib.OK:
             return None # file for job not returned by server, need to return an error code to server
 
+        m = hashlib.md5()
         f = open(temp_path, "wb")
-        buf = response.read(1024)
+        buf = response.read(HASH_CHUNK_SIZE)
 
         while buf:
             f.write(buf)
-            buf = response.read(1024)
+            m.update(buf)
+            buf = response.read(HASH_CHUNK_SIZE)
 
         f.close()
 
         os.renames(temp_path, job_full_path)
+
+        if use_cache and m.hexdigest() == rfile.signature:
+            cache.add(rfile.signature, job_full_path)
         
     rfile.filepath = job_full_path
 
@@ -129,6 +142,11 @@ def render_slave(engine, netsettings, threads):
     if not os.access(slave_path, os.W_OK):
         print "Slave working path ( %s ) is not writable" % netsettings.path
         return
+
+    # files kept between jobs and sessions, by signature
+    cache = None
+    if netsettings.cache_size > 0:
+        cache = netrender.cache.FileCache(os.path.join(slave_path, "cache"), netsettings.cache_size * 1024 * 1024)
     
     conn = clientConnection(netsettings)
     
@@ -182,12 +200,12 @@ def render_slave(engine, netsettings, threads):
                     job_path = job.files[0].original_path # original path of the first file
                     main_path, main_file = os.path.split(job_path)
 
-                    job_full_path = testFile(conn, job.id, slave_id, job.files[0], job_prefix)
+                    job_full_path = testFile(conn, job.id, slave_id, job.files[0], job_prefix, cache=cache)
                     print "Fullpath", job_full_path
                     print "File:", main_file, "and %i other files" % (len(job.files) - 1,)
 
                     for rfile in job.files[1:]:
-                        testFile(conn, job.id, slave_id, rfile, job_prefix, main_path)
+                        testFile(conn, job.id, slave_id, rfile, job_prefix, main_path, cache)
                         print "\t", rfile.filepath
                         
                     netrender.repath.update(job)
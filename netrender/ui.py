@@ -168,6 +168,7 @@ class RENDER_PT_network_slave_settings(NetRenderButtonsPanel, bpy.types.Panel):
         layout.prop(netsettings, "slave_render")
         layout.prop(netsettings, "slave_bake")
         layout.prop(netsettings, "use_slave_clear")
+        layout.prop(netsettings, "cache_size")
         layout.prop(netsettings, "use_slave_thumb")
         layout.prop(netsettings, "use_slave_output_log")
         layout.label(text="Threads:")
@@ -194,6 +195,7 @@ class RENDER_PT_network_master_settings(NetRenderButtonsPanel, bpy.types.Panel):
         layout.prop(netsettings, "use_master_broadcast")
         layout.prop(netsettings, "use_master_force_upload")
         layout.prop(netsettings, "use_master_clear")
+        layout.prop(netsettings, "cache_size")
 
 class RENDER_PT_network_job(NetRenderButtonsPanel, bpy.types.Panel):
     bl_label = "Job Settings"
@@ -474,6 +476,13 @@ class NetRenderSettings(bpy.types.PropertyGroup):
                         name="Force Dependency Upload",
                         description="Force client to upload dependency files to master",
                         default = False)
+
+        NetRenderSettings.cache_size = IntProperty(
+                        name="Cache Size",
+                        description="Size in MB of the store of dependency files kept between jobs (0 to disable)",
+                        default = 10240,
+                        min=0,
+                        max=1024 * 1024)
         
         default_path = os.environ.get("TEMP")
         
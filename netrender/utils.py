@@ -34,6 +34,8 @@ except:
 
 VERSION =str(".".join((str(n) for n in netrender.bl_info["version"]))).encode('utf8')
 
+HASH_CHUNK_SIZE = 1024 * 1024
+
 try:
     system = platform.system()
 except UnicodeDecodeError:
@@ -236,10 +238,14 @@ def cancelURL(job_id):
     return "/cancel_%s" % (job_id)
 
 def hashFile(path):
-    f = open(path, "rb")
-    value = hashData(f.read())
-    f.close()
-    return value
+    # read in chunks, dependencies can be bigger than the available memory
+    m = hashlib.md5()
+    with open(path, "rb") as f:
+        buf = f.read(HASH_CHUNK_SIZE)
+        while buf:
+            m.update(buf)
+            buf = f.read(HASH_CHUNK_SIZE)
+    return m.hexdigest()
     
 def hashData(data):
     m = hashlib.md5()
@@ -142,66 +142,118 @@ def bmesh_face_points_random(f, num_points=1, margin=0.05):
         yield vecs[0] + u1 * side1 + u2 * side2
 
 
-def bmesh_check_thick_object(obj, thickness):
+def face_sample_coords(num_points, margin=0.05):
+    """
+    Barycentric coordinates (u1, u2) of random points on a triangle,
+    the same for every call, so they can be shared by all faces.
+    """
+    import random
+    rand = random.Random(0)  # for pradictable results
+    uniform_args = 0.0 + margin, 1.0 - margin
 
-    import bpy
+    coords = []
+    for i in xrange(num_points):
+        u1 = rand.uniform(*uniform_args)
+        u2 = rand.uniform(*uniform_args)
+        if u1 + u2 > 1.0:
+            u1 = 1.0 - u1
+            u2 = 1.0 - u2
+        coords.append((u1, u2))
+    return coords
 
-    # Triangulate
-    bm = bmesh_copy_from_object(obj, transform=True, triangulate=False)
-    # map original faces to their index.
-    face_index_map_org = dict((f, i) for i, f in enumerate(bm.faces))
-    ret = bmesh.ops.triangulate(bm, faces=bm.faces)
-    face_map = ret["face_map"]
-    del ret
-    # old edge -> new mapping
 
-    # Convert new/old map to index dict.
+def bmesh_calc_thickness(bm, thickness, samples_max=6):
+    """
+    Measure the thickness of a triangulated mesh, up to the given thickness,
+    casting rays backwards from points on each face,
+    larger faces get more points (up to samples_max).
 
-    # Create a real mesh (lame!)
-    scene = bpy.context.scene
-    me_tmp = bpy.data.meshes.new(name="~temp~")
-    bm.to_mesh(me_tmp)
-    # bm.free()  # delay free
-    obj_tmp = bpy.data.objects.new(name=me_tmp.name, object_data=me_tmp)
-    scene.objects.link(obj_tmp)
-    scene.update()
-    ray_cast = obj_tmp.ray_cast
+    returns an array of the minimum thickness at each face,
+    infinity where the mesh is thicker.
+    """
+    import mathutils
+    from math import ceil
 
     EPS_BIAS = 0.0001
 
-    faces_error = set()
+    bm.faces.index_update()
+    faces = bm.faces[:]
+    faces_thick = [float("inf")] * len(faces)
+
+    distance = thickness - EPS_BIAS
+    if not faces or distance <= 0.0:
+        return array.array('f', faces_thick)
+
+    tree = mathutils.bvhtree.BVHTree.FromBMesh(bm)
+    ray_cast = tree.ray_cast
 
-    bm_faces_new = bm.faces[:]
+    # faces of twice the average area get all samples, the smallest just one
+    areas = [f.calc_area() for f in faces]
+    density = samples_max * len(faces) / ((2.0 * sum(areas)) or 1.0)
+    coords = face_sample_coords(samples_max)
 
-    for f in bm_faces_new:
+    for i, f in enumerate(faces):
         no = f.normal
-        no_sta = no * EPS_BIAS
-        no_end = no * thickness
-        for p in bmesh_face_points_random(f, num_points=6):
+        direction = -no
+        v0, v1, v2 = (v.co for v in f.verts)
+        side1 = v1 - v0
+        side2 = v2 - v0
+        v0 = v0 - no * EPS_BIAS
+
+        num_points = min(samples_max, max(1, int(ceil(areas[i] * density))))
+        for u1, u2 in coords[:num_points]:
             # Cast the ray backwards
-            p_a = p - no_sta
-            p_b = p - no_end
+            co, no_hit, index, dist = ray_cast(v0 + u1 * side1 + u2 * side2, direction, distance)
 
-            co, no, index = ray_cast(p_a, p_b)
+            if index is not None:
+                # thickness at both, the face and the face we hit
+                dist += EPS_BIAS
+                if dist < faces_thick[i]:
+                    faces_thick[i] = dist
+                if dist < faces_thick[index]:
+                    faces_thick[index] = dist
 
-            if index != -1:
-                # Add the face we hit
-                for f_iter in (f, bm_faces_new[index]):
-                    # if the face wasn't triangulated, just use existing
-                    f_org = face_map.get(f_iter, f_iter)
-                    f_org_index = face_index_map_org[f_org]
-                    faces_error.add(f_org_index)
+    return array.array('f', faces_thick)
+
+
+def bmesh_calc_thickness_object(obj, thickness):
+    """
+    Measure the thickness of the object, up to the given thickness.
+
+    returns an array of the minimum thickness at each face,
+    infinity where the object is thicker.
+    """
+
+    # Triangulate
+    bm = bmesh_copy_from_object(obj, transform=True, triangulate=False)
+    # map original faces to their index.
+    face_index_map_org = dict((f, i) for i, f in enumerate(bm.faces))
+    ret = bmesh.ops.triangulate(bm, faces=bm.faces)
+    face_map = ret["face_map"]
+    del ret
+
+    faces_thick = array.array('f', [float("inf")]) * len(face_index_map_org)
+
+    for f, thick in zip(bm.faces, bmesh_calc_thickness(bm, thickness)):
+        # if the face wasn't triangulated, just use existing
+        f_org_index = face_index_map_org[face_map.get(f, f)]
+        if thick < faces_thick[f_org_index]:
+            faces_thick[f_org_index] = thick
 
     # finished with bm
     bm.free()
 
-    scene.objects.unlink(obj_tmp)
-    bpy.data.objects.remove(obj_tmp)
-    bpy.data.meshes.remove(me_tmp)
+    return faces_thick
 
-    scene.update()
 
-    return array.array('i', faces_error)
+def bmesh_check_thick_object(obj, thickness):
+    """
+    Check if any faces are thinner than thickness
+
+    returns an array of face index values.
+    """
+    faces_thick = bmesh_calc_thickness_object(obj, thickness)
+    return array.array('i', [i for i, thick in enumerate(faces_thick) if thick < thickness])
 
 
 
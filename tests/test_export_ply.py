@@ -0,0 +1,134 @@
+"""
+Tests for io_mesh_ply.export_ply.save_mesh, run outside of Blender:
+
+    python2 -m unittest discover -s tests
+
+bpy is replaced by a minimal fake, its collections check the length of the
+foreach_get sequences as Blender does.
+"""
+
+from __future__ import absolute_import
+import os
+import sys
+import types
+import shutil
+import struct
+import tempfile
+import unittest
+from itertools import chain
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Collection(list):
+    def foreach_get(self, attr, seq):
+        values = list(chain.from_iterable(
+            v if isinstance(v, (tuple, list)) else (v,)
+            for v in (getattr(item, attr) for item in self)))
+        if len(values) != len(seq):
+            raise RuntimeError("internal error setting the array")
+        seq[:] = type(seq)(seq.typecode, values) if hasattr(seq, "typecode") else values
+
+
+class Item(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class Layers(list):
+    active = None
+
+
+def fake_bpy():
+    bpy = types.ModuleType("bpy")
+    bpy.app = Item(version_string="2.69")
+    bpy.data = Item(filepath="test.blend")
+    return bpy
+
+
+def make_mesh(smooth):
+    """Two triangles sharing an edge, folded along it."""
+    vertices = Collection([
+        Item(co=(0.0, 0.0, 0.0), normal=(0.0, -0.5, 0.5)),
+        Item(co=(1.0, 0.0, 0.0), normal=(0.0, -0.5, 0.5)),
+        Item(co=(0.0, 1.0, 0.0), normal=(0.0, 0.0, 1.0)),
+        Item(co=(0.0, 0.0, 1.0), normal=(0.0, -1.0, 0.0)),
+    ])
+    tessfaces = Collection([
+        Item(vertices_raw=(1, 2, 0, 0), normal=(0.0, 0.0, 1.0), use_smooth=smooth),
+        Item(vertices_raw=(1, 0, 3, 0), normal=(0.0, -1.0, 0.0), use_smooth=smooth),
+    ])
+    return Item(vertices=vertices, tessfaces=tessfaces, polygons=(),
+                tessface_uv_textures=Layers(), tessface_vertex_colors=Layers())
+
+
+class SaveMeshTest(unittest.TestCase):
+    def setUp(self):
+        self.modules = dict((name, sys.modules.get(name)) for name in ("bpy", "export_ply", "array_utils"))
+        self.path = list(sys.path)
+        sys.modules["bpy"] = fake_bpy()
+        sys.path[:0] = [os.path.join(ROOT, "io_mesh_ply"), os.path.join(ROOT, "modules")]
+        import export_ply
+        self.export_ply = export_ply
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        sys.path[:] = self.path
+        for name, module in self.modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+    def save(self, mesh, **kwargs):
+        """Vertices and faces of the mesh, saved as binary ply."""
+        filepath = os.path.join(self.tmpdir, "mesh.ply")
+        self.export_ply.save_mesh(filepath, mesh, use_ascii=False, **kwargs)
+        with open(filepath, "rb") as f:
+            data = f.read()
+        body = data.index(b"end_header\n") + len(b"end_header\n")
+        header = data[:body].decode("utf8").splitlines()
+        counts = dict(l.split()[1:] for l in header if l.startswith("element "))
+        props = [l for l in header if l.startswith("property float ")]
+
+        vertex_fmt = "<" + "f" * len(props)
+        vertex_size = struct.calcsize(vertex_fmt)
+        verts = [struct.unpack_from(vertex_fmt, data, body + i * vertex_size)
+                 for i in range(int(counts["vertex"]))]
+        offset = body + len(verts) * vertex_size
+        faces = []
+        for i in range(int(counts["face"])):
+            total = struct.unpack_from("<B", data, offset)[0]
+            faces.append(struct.unpack_from("<%dI" % total, data, offset + 1))
+            offset += 1 + 4 * total
+        self.assertEqual(offset, len(data))
+        return verts, faces
+
+    def test_flat_normals(self):
+        verts, faces = self.save(make_mesh(False), use_normals=True)
+        self.assertEqual(len(verts), 6)
+        self.assertEqual(len(faces), 2)
+        mesh = make_mesh(False)
+        for face, tessface in zip(faces, mesh.tessfaces):
+            for index, vidx in zip(face, tessface.vertices_raw):
+                self.assertEqual(verts[index][:3], mesh.vertices[vidx].co)
+                self.assertEqual(verts[index][3:6], tessface.normal)
+
+    def test_smooth_normals(self):
+        verts, faces = self.save(make_mesh(True), use_normals=True)
+        self.assertEqual(len(verts), 4)
+        mesh = make_mesh(True)
+        for face, tessface in zip(faces, mesh.tessfaces):
+            for index, vidx in zip(face, tessface.vertices_raw):
+                self.assertEqual(verts[index][:3], mesh.vertices[vidx].co)
+                self.assertEqual(verts[index][3:6], mesh.vertices[vidx].normal)
+
+    def test_no_normals(self):
+        verts, faces = self.save(make_mesh(False), use_normals=False)
+        self.assertEqual(len(verts), 4)
+        self.assertEqual([len(v) for v in verts], [3] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()